@@ -1,12 +1,28 @@
+import datetime
+import io
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib import admin, messages
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.db.models import Sum
+from django.http import HttpResponseRedirect, HttpResponseForbidden, HttpResponseNotAllowed, JsonResponse
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils import timezone
 from rangefilter.filters import DateRangeFilter
 
-from .choices import StatusAgendamento
-from .filtros import ValorRangeFilter
+from .cache import catalogo_servicos, pertence_ao_grupo, servicos_por_funcionario
+from .choices import OrigemFechamento, SituacaoEspera, StatusAgendamento
+from .filtros import (
+    ClienteFilter,
+    FuncionarioAgendamentoFilter,
+    FuncionarioFilter,
+    ServicoFilter,
+    ValorRangeFilter,
+    ValorVitalicioFilter,
+)
 from .models import (
     Pessoa,
     Cliente,
@@ -14,16 +30,63 @@ from .models import (
     Funcionario,
     DataHorario,
     ServicoFuncionarioHorario,
-    Agendamento
+    Agendamento,
+    AgendamentoArquivado,
+    DesempenhoDiario,
+    FechamentoAgendamentos,
+    TransicaoStatus,
+    ListaEspera
 )
 from .forms import (
     ClienteAdminForm,
     FuncionarioAdminForm,
     ServicoFuncionarioHorarioAdminForm,
-    AgendamentoAdminForm
+    AgendamentoAdminForm,
+    AgendamentoRecorrenteForm,
+    FechamentoAgendamentosForm,
+    ImportacaoClientesForm,
+    ListaEsperaAdminForm
+)
+from .desempenho import (
+    atualizar_desempenho,
+    dias_dos_agendamentos,
+    recalcular_dias,
+    serie_desempenho,
+    versao_desempenho,
+)
+from .importacao import importar_clientes_csv
+from .indicadores import atualizar_indicadores_clientes
+from .lista_espera import confirmar_ofertas, ofertar_vagas, recusar_ofertas, vagas_canceladas_sem_oferta
+from .replica import banco_para_leitura, ler_de
+from .reservas import reservar_recorrente
+from .transicoes import (
+    concluir_fechamento,
+    fim_do_dia,
+    iniciar_fechamento,
+    pendentes_de_fechamento,
+    registrar_lote,
+    transicionar_lote,
+    transicionar_status,
 )
 
 
+class ListagemReplicaMixin:
+    """
+    Lê da réplica, quando disponível, a listagem (GET) do admin, inclusive as colunas calculadas durante a renderização
+    do template (veja 'replica.banco_para_leitura'). Ações e demais requisições continuam no banco principal.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context=extra_context)
+
+        with ler_de(banco_para_leitura(request)):
+            response = super().changelist_view(request, extra_context=extra_context)
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+
 @admin.register(Pessoa)
 class PessoaAdmin(admin.ModelAdmin):
     """Define a interface de administração para o modelo Pessoa."""
@@ -69,7 +132,7 @@ class PessoaAdmin(admin.ModelAdmin):
                 'data_cadastro',
                 'data_atualizacao',
             )
-        elif request.user.groups.filter(name='Dono').exists():
+        elif pertence_ao_grupo(request.user, 'Dono'):
             list_display = (
                 'nome_completo',
                 'data_nascimento',
@@ -77,7 +140,7 @@ class PessoaAdmin(admin.ModelAdmin):
                 'email',
                 'celular',
             )
-        elif request.user.groups.filter(name='Recepcionista').exists():
+        elif pertence_ao_grupo(request.user, 'Recepcionista'):
             list_display = (
                 'nome_completo',
                 'data_nascimento',
@@ -97,7 +160,7 @@ class PessoaAdmin(admin.ModelAdmin):
     def get_list_filter(self, request):
         """Define os filtros disponíveis na barra lateral com base no perfil do usuário."""
 
-        if request.user.is_superuser or request.user.groups.filter(name='Recepcionista').exists():
+        if request.user.is_superuser or pertence_ao_grupo(request.user, 'Recepcionista'):
             list_filter = ('ativo',)
         else:
             list_filter = ()
@@ -106,7 +169,7 @@ class PessoaAdmin(admin.ModelAdmin):
 
 
 @admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
+class ClienteAdmin(ListagemReplicaMixin, admin.ModelAdmin):
     """Define a interface de administração para o modelo Cliente."""
 
     form = ClienteAdminForm
@@ -127,6 +190,67 @@ class ClienteAdmin(admin.ModelAdmin):
 
         return ('pessoa',)
 
+    def get_urls(self):
+        """Adiciona à interface de Clientes a página de importação em massa via CSV."""
+
+        urls = [
+            path(
+                'importar/',
+                self.admin_site.admin_view(self.importar_view),
+                name='agendamento_cliente_importar'
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        """
+        Recebe um arquivo CSV, na codificação escolhida, e importa os clientes em lotes, exibindo ao final o total
+        importado, a vazão e as primeiras linhas com erro, incluindo as de leitura do arquivo e as que conflitaram com o
+        banco. Para arquivos muito grandes, prefira o comando 'importar_clientes'.
+        """
+
+        if not self.has_add_permission(request):
+            return HttpResponseRedirect(reverse('admin:agendamento_cliente_changelist'))
+
+        form = ImportacaoClientesForm(request.POST or None, request.FILES or None)
+
+        if request.method == 'POST' and form.is_valid():
+            arquivo = io.TextIOWrapper(
+                form.cleaned_data['arquivo'].file,
+                encoding=form.cleaned_data['codificacao'],
+                newline=''
+            )
+            resultado = importar_clientes_csv(arquivo, delimitador=form.cleaned_data['delimitador'])
+
+            self.message_user(
+                request,
+                f'{resultado.criados} cliente(s) importados de {resultado.linhas_lidas} linha(s) em '
+                f'{resultado.tempo_decorrido:.1f}s ({resultado.linhas_por_segundo:.0f} linhas/s).',
+                messages.SUCCESS if resultado.criados else messages.WARNING
+            )
+
+            for linha, mensagem in resultado.erros[:20]:
+                self.message_user(request, f'Linha {linha}: {mensagem}', messages.ERROR)
+
+            if resultado.total_erros > 20:
+                self.message_user(
+                    request,
+                    f'... e mais {resultado.total_erros - 20} linha(s) com erro.',
+                    messages.ERROR
+                )
+
+            return HttpResponseRedirect(reverse('admin:agendamento_cliente_changelist'))
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importar Clientes',
+            'form': form,
+            'media': self.media + form.media,
+            'texto_botao': 'Importar',
+        }
+        return TemplateResponse(request, 'admin/agendamento/formulario.html', context)
+
     def get_list_display(self, request):
         """Customiza as colunas na lista de Clientes com base no perfil do usuário."""
 
@@ -135,20 +259,26 @@ class ClienteAdmin(admin.ModelAdmin):
                 'id',
                 'pessoa',
                 'get_ganho_previsto_mes',
-                'get_ganho_total',
+                'valor_agendado_futuro',
+                'valor_vitalicio',
+                'total_visitas',
+                'ultima_visita',
                 'ativo',
                 'data_cadastro',
                 'data_atualizacao',
             )
-        elif request.user.groups.filter(name='Dono').exists():
+        elif pertence_ao_grupo(request.user, 'Dono'):
             list_display = (
                 'id',
                 'pessoa',
                 'get_ganho_previsto_mes',
-                'get_ganho_total',
+                'valor_agendado_futuro',
+                'valor_vitalicio',
+                'total_visitas',
+                'ultima_visita',
             )
 
-        elif request.user.groups.filter(name='Recepcionista').exists():
+        elif pertence_ao_grupo(request.user, 'Recepcionista'):
             list_display = (
                 'id',
                 'pessoa',
@@ -166,7 +296,18 @@ class ClienteAdmin(admin.ModelAdmin):
     def get_list_filter(self, request):
         """Define os filtros disponíveis com base no perfil do usuário."""
 
-        if request.user.is_superuser or request.user.groups.filter(name='Recepcionista').exists():
+        if request.user.is_superuser:
+            list_filter = (
+                ValorVitalicioFilter,
+                'ativo',
+            )
+
+        elif pertence_ao_grupo(request.user, 'Dono'):
+            list_filter = (
+                ValorVitalicioFilter,
+            )
+
+        elif pertence_ao_grupo(request.user, 'Recepcionista'):
             list_filter = (
                 'ativo',
             )
@@ -176,36 +317,21 @@ class ClienteAdmin(admin.ModelAdmin):
 
         return list_filter
 
-    @admin.display(description='Ganho Total')
-    def get_ganho_total(self, obj):
-        """Calcula e exibe o valor total gasto pelo cliente em serviços concluídos."""
-
-        ganho_total = (Servico.objects.filter(
-            servicofuncionariohorario__agendamento__cliente=obj,
-            servicofuncionariohorario__agendamento__status='CONCLUIDO'
-        ).values(
-            'valor'
-        ).aggregate(
-            valor_total=Sum('valor')
-        )['valor_total'])
-
-        return f"R$ {ganho_total or 0:.2f}"
-
     @admin.display(description='Ganho Previsto (30 dias)')
     def get_ganho_previsto_mes(self, obj):
         """Calcula e exibe o valor de serviços agendados pelo cliente para os próximos 30 dias."""
 
         hoje = timezone.now()
         proximos_trinta_dias = hoje + timedelta(days=30)
-        ganho_previsto_mes = Servico.objects.filter(
-            servicofuncionariohorario__agendamento__cliente=obj,
-            servicofuncionariohorario__agendamento__status='AGENDADO',
-            servicofuncionariohorario__data_horario__data_horario__range=(
+        ganho_previsto_mes = Agendamento.ativos.filter(
+            cliente=obj,
+            status=StatusAgendamento.AGENDADO,
+            servico_funcionario_horario__data_horario__data_horario__range=(
                 hoje,
                 proximos_trinta_dias
             )
         ).aggregate(
-            valor_previsto=Sum('valor')
+            valor_previsto=Sum('valor_total')
         )['valor_previsto']
 
         return f"R$ {ganho_previsto_mes or 0:.2f}"
@@ -248,7 +374,7 @@ class ServicoAdmin(admin.ModelAdmin):
                 'data_cadastro',
                 'data_atualizacao',
             )
-        elif request.user.groups.filter(name='Recepcionista').exists():
+        elif pertence_ao_grupo(request.user, 'Recepcionista'):
             list_display = (
                 'id',
                 'nome_servico',
@@ -270,7 +396,7 @@ class ServicoAdmin(admin.ModelAdmin):
     def get_list_filter(self, request):
         """Define os filtros disponíveis com base no perfil do usuário."""
 
-        if request.user.is_superuser or request.user.groups.filter(name='Recepcionista').exists():
+        if request.user.is_superuser or pertence_ao_grupo(request.user, 'Recepcionista'):
             list_filter = (
                 'ativo',
                 ValorRangeFilter
@@ -283,7 +409,7 @@ class ServicoAdmin(admin.ModelAdmin):
 
 
 @admin.register(Funcionario)
-class FuncionarioAdmin(admin.ModelAdmin):
+class FuncionarioAdmin(ListagemReplicaMixin, admin.ModelAdmin):
     """Define a interface de administração para o modelo Funcionario."""
 
     form = FuncionarioAdminForm
@@ -323,7 +449,7 @@ class FuncionarioAdmin(admin.ModelAdmin):
                 'data_cadastro',
                 'data_atualizacao',
             )
-        elif request.user.groups.filter(name='Dono').exists():
+        elif pertence_ao_grupo(request.user, 'Dono'):
             list_display = (
                 'id',
                 'pessoa',
@@ -332,7 +458,7 @@ class FuncionarioAdmin(admin.ModelAdmin):
                 'get_servicos',
             )
 
-        elif request.user.groups.filter(name='Recepcionista').exists():
+        elif pertence_ao_grupo(request.user, 'Recepcionista'):
             list_display = (
                 'id',
                 'pessoa',
@@ -352,15 +478,15 @@ class FuncionarioAdmin(admin.ModelAdmin):
     def get_list_filter(self, request):
         """Define os filtros disponíveis com base no perfil do usuário."""
 
-        if request.user.is_superuser or request.user.groups.filter(name='Recepcionista').exists():
+        if request.user.is_superuser or pertence_ao_grupo(request.user, 'Recepcionista'):
             list_filter = (
                 'ativo',
-                'servico'
+                ServicoFilter
             )
 
-        elif request.user.groups.filter(name='Dono').exists():
+        elif pertence_ao_grupo(request.user, 'Dono'):
             list_filter = (
-                'servico',
+                ServicoFilter,
             )
 
         else:
@@ -370,24 +496,33 @@ class FuncionarioAdmin(admin.ModelAdmin):
 
     @admin.display(description='Serviço(s) que Executa')
     def get_servicos(self, obj):
-        """Retorna uma string com os nomes dos serviços associados ao funcionário."""
+        """
+        Retorna uma string com os nomes dos serviços associados ao funcionário, a partir do catálogo de serviços em
+        cache, sem uma consulta por linha da listagem.
+        """
 
-        return ", ".join([s.nome_servico for s in obj.servico.all()])
+        catalogo = catalogo_servicos()
+        return ", ".join(catalogo[pk][0] for pk in servicos_por_funcionario().get(obj.pk, []) if pk in catalogo)
 
     @admin.display(description='Ganho Total')
     def get_ganho_total(self, obj):
         """Calcula e exibe o valor total gerado pelo funcionário em serviços concluídos."""
 
-        ganho_total = (Servico.objects.filter(
-            servicofuncionariohorario__agendamento__servico_funcionario_horario__funcionario=obj,
-            servicofuncionariohorario__agendamento__status='CONCLUIDO'
-        ).values(
-            'valor'
+        ganho_total = Agendamento.ativos.filter(
+            servico_funcionario_horario__funcionario=obj,
+            status=StatusAgendamento.CONCLUIDO
+        ).aggregate(
+            valor_total=Sum('valor_total')
+        )['valor_total']
+
+        ganho_arquivado = AgendamentoArquivado.objects.filter(
+            funcionario=obj,
+            status=StatusAgendamento.CONCLUIDO
         ).aggregate(
-            valor_total=Sum('valor')
-        )['valor_total'])
+            valor_total=Sum('valor_total')
+        )['valor_total']
 
-        return f"R$ {ganho_total or 0:.2f}"
+        return f"R$ {(ganho_total or 0) + (ganho_arquivado or 0):.2f}"
 
     @admin.display(description='Ganho Previsto (30 dias)')
     def get_ganho_previsto_mes(self, obj):
@@ -395,15 +530,15 @@ class FuncionarioAdmin(admin.ModelAdmin):
 
         hoje = timezone.now()
         proximos_trinta_dias = hoje + timedelta(days=30)
-        ganho_previsto_mes = Servico.objects.filter(
-            servicofuncionariohorario__agendamento__servico_funcionario_horario__funcionario=obj,
-            servicofuncionariohorario__agendamento__status='AGENDADO',
-            servicofuncionariohorario__data_horario__data_horario__range=(
+        ganho_previsto_mes = Agendamento.ativos.filter(
+            servico_funcionario_horario__funcionario=obj,
+            status=StatusAgendamento.AGENDADO,
+            servico_funcionario_horario__data_horario__data_horario__range=(
                 hoje,
                 proximos_trinta_dias
             )
         ).aggregate(
-            valor_previsto=Sum('valor')
+            valor_previsto=Sum('valor_total')
         )['valor_previsto']
 
         return f"R$ {ganho_previsto_mes or 0:.2f}"
@@ -441,7 +576,7 @@ class DataHorarioAdmin(admin.ModelAdmin):
                 'data_atualizacao',
             )
 
-        elif request.user.groups.filter(name='Recepcionista').exists():
+        elif pertence_ao_grupo(request.user, 'Recepcionista'):
             list_display = (
                 'id',
                 'data_horario',
@@ -459,7 +594,7 @@ class DataHorarioAdmin(admin.ModelAdmin):
     def get_list_filter(self, request):
         """Define os filtros disponíveis com base no perfil do usuário."""
 
-        if request.user.is_superuser or request.user.groups.filter(name='Recepcionista').exists():
+        if request.user.is_superuser or pertence_ao_grupo(request.user, 'Recepcionista'):
             list_filter = (
                 'ativo',
                 ('data_horario', DateRangeFilter),
@@ -523,7 +658,7 @@ class ServicoFuncionarioHorarioAdmin(admin.ModelAdmin):
                 'data_cadastro',
                 'data_atualizacao',
             )
-        elif request.user.groups.filter(name='Recepcionista').exists():
+        elif pertence_ao_grupo(request.user, 'Recepcionista'):
             list_display = (
                 'id',
                 'funcionario',
@@ -545,19 +680,19 @@ class ServicoFuncionarioHorarioAdmin(admin.ModelAdmin):
     def get_list_filter(self, request):
         """Define os filtros disponíveis com base no perfil do usuário."""
 
-        if request.user.is_superuser or request.user.groups.filter(name='Recepcionista').exists():
+        if request.user.is_superuser or pertence_ao_grupo(request.user, 'Recepcionista'):
             list_filter = (
                 ('data_horario__data_horario', DateRangeFilter),
-                'funcionario',
-                'servico',
+                FuncionarioFilter,
+                ServicoFilter,
                 'ativo',
             )
 
         else:
             list_filter = (
                 ('data_horario__data_horario', DateRangeFilter),
-                'funcionario',
-                'servico',
+                FuncionarioFilter,
+                ServicoFilter,
             )
 
         return list_filter
@@ -580,6 +715,7 @@ class AgendamentoAdmin(admin.ModelAdmin):
         'servico_funcionario_horario',
     )
     list_per_page = 20
+    readonly_fields = ('valor_total',)
 
     def get_fields(self, request, obj=None):
         """Define os campos exibidos no formulário de edição/criação."""
@@ -589,6 +725,7 @@ class AgendamentoAdmin(admin.ModelAdmin):
                 'cliente',
                 'servico_funcionario_horario',
                 'status',
+                'valor_total',
                 'ativo',
             )
 
@@ -608,18 +745,20 @@ class AgendamentoAdmin(admin.ModelAdmin):
                 'get_data_horario',
                 'get_funcionario',
                 'get_servicos',
+                'valor_total',
                 'status',
                 'ativo',
                 'data_cadastro',
                 'data_atualizacao',
             )
-        elif request.user.groups.filter(name='Recepcionista').exists():
+        elif pertence_ao_grupo(request.user, 'Recepcionista'):
             list_display = (
                 'id',
                 'cliente',
                 'get_data_horario',
                 'get_funcionario',
                 'get_servicos',
+                'valor_total',
                 'status',
                 'ativo',
             )
@@ -630,6 +769,7 @@ class AgendamentoAdmin(admin.ModelAdmin):
                 'get_data_horario',
                 'get_funcionario',
                 'get_servicos',
+                'valor_total',
                 'status',
             )
 
@@ -638,34 +778,41 @@ class AgendamentoAdmin(admin.ModelAdmin):
     def get_list_filter(self, request):
         """Define os filtros disponíveis com base no perfil do usuário."""
 
-        if request.user.is_superuser or request.user.groups.filter(name='Recepcionista').exists():
+        if request.user.is_superuser or pertence_ao_grupo(request.user, 'Recepcionista'):
             list_filter = (
                 ('servico_funcionario_horario__data_horario__data_horario', DateRangeFilter),
                 'status',
-                'servico_funcionario_horario__funcionario',
+                FuncionarioAgendamentoFilter,
+                ClienteFilter,
                 'ativo',
             )
         else:
             list_filter = (
                 ('servico_funcionario_horario__data_horario__data_horario', DateRangeFilter),
                 'status',
-                'servico_funcionario_horario__funcionario',
+                FuncionarioAgendamentoFilter,
+                ClienteFilter,
             )
 
         return list_filter
 
+    @staticmethod
+    def _pode_alterar_status_em_massa(request):
+        return request.user.is_superuser or pertence_ao_grupo(request.user, 'Recepcionista')
+
     def get_actions(self, request):
         """Define quais ações em massa estão disponíveis com base no perfil do usuário."""
 
         actions = super().get_actions(request)
-        if request.user.is_superuser or request.user.groups.filter(name='Recepcionista').exists():
+        if self._pode_alterar_status_em_massa(request):
+            # O admin chama a ação como func(model_admin, request, queryset), por isso a função não vinculada
             actions['marcar_como_concluido'] = (
-                self.marcar_como_concluido,
+                type(self).marcar_como_concluido,
                 'marcar_como_concluido',
                 self.marcar_como_concluido.short_description,
             )
             actions['marcar_como_cancelado'] = (
-                self.marcar_como_cancelado,
+                type(self).marcar_como_cancelado,
                 'marcar_como_cancelado',
                 self.marcar_como_cancelado.short_description,
             )
@@ -679,6 +826,29 @@ class AgendamentoAdmin(admin.ModelAdmin):
 
         return form
 
+    def delete_model(self, request, obj):
+        """
+        Exclui o agendamento e atualiza os indicadores do cliente e o desempenho do dia, já que a exclusão não passa
+        pelo save() e não é vista pela atualização incremental do desempenho.
+        """
+
+        dias = dias_dos_agendamentos(Agendamento.objects.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+        atualizar_indicadores_clientes([obj.cliente_id])
+        recalcular_dias(dias)
+
+    def delete_queryset(self, request, queryset):
+        """
+        Exclui os agendamentos selecionados e atualiza, de uma só vez, os indicadores dos clientes e o desempenho dos
+        dias afetados.
+        """
+
+        cliente_ids = list(queryset.values_list('cliente_id', flat=True).distinct())
+        dias = dias_dos_agendamentos(queryset)
+        super().delete_queryset(request, queryset)
+        atualizar_indicadores_clientes(cliente_ids)
+        recalcular_dias(dias)
+
     @admin.display(description='Serviço(s) Agendados')
     def get_servicos(self, obj):
         """Exibe os serviços de uma vaga de atendimento na lista de agendamentos."""
@@ -708,20 +878,479 @@ class AgendamentoAdmin(admin.ModelAdmin):
         extra_context = extra_context or {}
         extra_context['user_can_generate_report'] = (
                 request.user.is_superuser or
-                request.user.groups.filter(name='Dono').exists()
+                pertence_ao_grupo(request.user, 'Dono')
         )
+        extra_context['pode_fechar_agendamentos'] = self._pode_alterar_status_em_massa(request)
         return super().changelist_view(request, extra_context=extra_context)
 
+    def get_urls(self):
+        """Adiciona à interface de Agendamentos a página de criação de agendamentos recorrentes."""
+
+        urls = [
+            path(
+                'recorrente/',
+                self.admin_site.admin_view(self.agendamento_recorrente_view),
+                name='agendamento_agendamento_recorrente'
+            ),
+            path(
+                'fechar/',
+                self.admin_site.admin_view(self.fechar_agendamentos_view),
+                name='agendamento_agendamento_fechar'
+            ),
+            path(
+                'fechar/lote/',
+                self.admin_site.admin_view(self.fechar_agendamentos_lote_view),
+                name='agendamento_agendamento_fechar_lote'
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def agendamento_recorrente_view(self, request):
+        """
+        Exibe e processa o formulário de agendamento recorrente, reservando de uma só vez todas as ocorrências
+        disponíveis e informando ao usuário as datas em que não havia vaga.
+        """
+
+        if not self.has_add_permission(request):
+            return HttpResponseRedirect(reverse('admin:agendamento_agendamento_changelist'))
+
+        form = AgendamentoRecorrenteForm(request.POST or None)
+
+        if request.method == 'POST' and form.is_valid():
+            dados = form.cleaned_data
+            try:
+                agendamentos, conflitos = reservar_recorrente(
+                    cliente=dados['cliente'],
+                    funcionario=dados['funcionario'],
+                    servico=dados['servico'],
+                    primeiro_horario=dados['primeiro_horario'].data_horario,
+                    ocorrencias=dados['ocorrencias'],
+                    intervalo_dias=dados['intervalo_dias'],
+                    exigir_todas=dados['exigir_todas'],
+                )
+            except IntegrityError:
+                self.message_user(
+                    request,
+                    'Uma das vagas foi reservada por outro usuário durante a operação. Tente novamente.',
+                    messages.ERROR
+                )
+            else:
+                if agendamentos:
+                    self.message_user(
+                        request,
+                        f'{len(agendamentos)} agendamento(s) recorrente(s) criados com sucesso.',
+                        messages.SUCCESS
+                    )
+                if conflitos:
+                    datas = ", ".join(timezone.localtime(c).strftime("%d/%m/%Y %H:%M") for c in conflitos)
+                    self.message_user(request, f'Sem vaga disponível em: {datas}.', messages.WARNING)
+
+                return HttpResponseRedirect(reverse('admin:agendamento_agendamento_changelist'))
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Agendamento Recorrente',
+            'form': form,
+            'media': self.media + form.media,
+            'texto_botao': 'Reservar',
+        }
+        return TemplateResponse(request, 'admin/agendamento/formulario.html', context)
+
+    def fechar_agendamentos_view(self, request):
+        """
+        Exibe a página de fechamento dos dias encerrados. O fechamento é feito pelo navegador, que chama
+        'fechar_agendamentos_lote_view' até não restarem agendamentos pendentes e exibe o progresso a cada lote.
+        """
+
+        if not self._pode_alterar_status_em_massa(request):
+            return HttpResponseForbidden("Acesso Negado")
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Fechar Agendamentos',
+            'form': FechamentoAgendamentosForm(),
+            'url_lote': reverse('admin:agendamento_agendamento_fechar_lote'),
+        }
+        return TemplateResponse(request, 'admin/agendamento/agendamento/fechar.html', context)
+
+    def fechar_agendamentos_lote_view(self, request):
+        """
+        Altera o status de um lote dos agendamentos pendentes até a data informada e retorna em JSON o registro do
+        fechamento (criado no primeiro lote), a quantidade alterada, os pendentes restantes e o último id do lote, a
+        partir do qual o próximo lote continua. O último lote encerra o registro e atualiza o agregado de desempenho.
+        """
+
+        if not self._pode_alterar_status_em_massa(request):
+            return HttpResponseForbidden("Acesso Negado")
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+
+        form = FechamentoAgendamentosForm(request.POST)
+        if not form.is_valid():
+            return JsonResponse({'erros': form.errors}, status=400)
+
+        try:
+            apos = int(request.POST.get('apos') or 0)
+            fechamento_id = int(request.POST.get('fechamento') or 0)
+        except ValueError:
+            return JsonResponse({'erros': {'apos': ['Valor inválido.']}}, status=400)
+
+        limite = fim_do_dia(form.cleaned_data['ate'])
+        status = form.cleaned_data['status']
+        if fechamento_id:
+            fechamento = FechamentoAgendamentos.objects.filter(
+                pk=fechamento_id,
+                origem=OrigemFechamento.ADMIN,
+                data_fim__isnull=True
+            ).first()
+            if fechamento is None:
+                return JsonResponse({'erros': {'fechamento': ['Fechamento inexistente ou já encerrado.']}}, status=400)
+        else:
+            fechamento = iniciar_fechamento(limite, status, OrigemFechamento.ADMIN, request.user)
+
+        pendentes = pendentes_de_fechamento(fechamento.limite)
+        ultimo_id, alterados, _ = transicionar_lote(pendentes, fechamento.status, apos)
+        restantes = pendentes.filter(pk__gt=ultimo_id).count() if ultimo_id is not None else 0
+
+        if ultimo_id is not None:
+            registrar_lote(fechamento, alterados)
+        if not restantes:
+            concluir_fechamento(fechamento)
+
+        return JsonResponse({
+            'fechamento': fechamento.pk,
+            'alterados': alterados,
+            'restantes': restantes,
+            'apos': ultimo_id,
+        })
+
     @admin.action(description='Marcar como Concluído')
     def marcar_como_concluido(self, request, queryset):
         """Ação em massa para alterar o status de agendamentos para 'Concluído'."""
 
-        updated = queryset.update(status=StatusAgendamento.CONCLUIDO)
-        self.message_user(request, f'{updated} agendamento(s) foram marcados como "Concluído".', messages.SUCCESS)
+        self._marcar_status(request, queryset, StatusAgendamento.CONCLUIDO)
 
     @admin.action(description='Marcar como Cancelado')
     def marcar_como_cancelado(self, request, queryset):
         """Ação em massa para alterar o status de agendamentos para 'Cancelado'."""
 
-        updated = queryset.update(status=StatusAgendamento.CANCELADO)
-        self.message_user(request, f'{updated} agendamento(s) foram marcados como "Cancelado".', messages.SUCCESS)
\ No newline at end of file
+        self._marcar_status(request, queryset, StatusAgendamento.CANCELADO)
+
+    def _marcar_status(self, request, queryset, status):
+        """
+        Altera o status dos agendamentos em lotes (veja 'transicoes'). Com "Selecionar todos", o queryset é o resultado
+        filtrado inteiro, que assim é percorrido sem ser carregado na memória.
+        """
+
+        alterados, ofertadas = transicionar_status(queryset, status)
+        self.message_user(
+            request,
+            f'{alterados} agendamento(s) foram marcados como "{StatusAgendamento(status).label}".',
+            messages.SUCCESS
+        )
+
+        if ofertadas:
+            self.message_user(request, f'{ofertadas} vaga(s) liberada(s) foram ofertadas à lista de espera.')
+
+
+@admin.register(AgendamentoArquivado)
+class AgendamentoArquivadoAdmin(admin.ModelAdmin):
+    """
+    Define uma interface somente leitura para os agendamentos arquivados pelo comando 'arquivar_agendamentos'.
+    """
+
+    search_fields = (
+        'cliente__pessoa__nome_completo',
+        'funcionario__pessoa__nome_completo',
+        'servicos',
+    )
+    list_display = (
+        'id_original',
+        'cliente',
+        'funcionario',
+        'data_horario',
+        'servicos',
+        'valor_total',
+        'status',
+        'data_arquivamento',
+    )
+    list_select_related = (
+        'cliente__pessoa',
+        'funcionario__pessoa',
+    )
+    list_filter = (
+        ('data_horario', DateRangeFilter),
+        'status',
+    )
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DesempenhoDiario)
+class DesempenhoDiarioAdmin(admin.ModelAdmin):
+    """
+    Define uma interface somente leitura para o agregado diário de desempenho e o painel de desempenho por
+    funcionário, cujos gráficos são carregados de um endpoint JSON.
+    """
+
+    list_display = (
+        'data',
+        'funcionario',
+        'agendados',
+        'concluidos',
+        'cancelados',
+        'get_taxa_conclusao',
+        'receita',
+    )
+    list_select_related = ('funcionario__pessoa',)
+    list_filter = (
+        ('data', DateRangeFilter),
+    )
+    search_fields = ('funcionario__pessoa__nome_completo',)
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Taxa de Conclusão')
+    def get_taxa_conclusao(self, obj):
+        """Exibe o percentual de concluídos entre os agendamentos encerrados do dia."""
+
+        return f"{obj.taxa_conclusao}%" if obj.taxa_conclusao is not None else "-"
+
+    def get_urls(self):
+        """Adiciona a página do painel de desempenho e o endpoint JSON com as séries."""
+
+        urls = [
+            path(
+                'painel/',
+                self.admin_site.admin_view(self.painel_view),
+                name='agendamento_desempenhodiario_painel'
+            ),
+            path(
+                'painel/dados/',
+                self.admin_site.admin_view(self.painel_dados_view),
+                name='agendamento_desempenhodiario_painel_dados'
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @staticmethod
+    def _pode_ver_painel(request):
+        return request.user.is_superuser or pertence_ao_grupo(request.user, 'Dono')
+
+    def painel_view(self, request):
+        """Exibe o painel com os filtros de período, funcionário e agrupamento. Restrito a superusuários e Donos."""
+
+        if not self._pode_ver_painel(request):
+            return HttpResponseForbidden("Acesso Negado")
+
+        hoje = timezone.localdate()
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Painel de Desempenho',
+            'funcionarios': Funcionario.ativos.select_related('pessoa').order_by('pessoa__nome_completo'),
+            'inicio': hoje - timedelta(days=90),
+            'fim': hoje,
+            'url_dados': reverse('admin:agendamento_desempenhodiario_painel_dados'),
+        }
+        return TemplateResponse(request, 'admin/agendamento/desempenhodiario/painel.html', context)
+
+    def painel_dados_view(self, request):
+        """
+        Retorna em JSON as séries de desempenho do período. O agregado é atualizado, de forma incremental, no máximo
+        uma vez a cada DESEMPENHO_INTERVALO_ATUALIZACAO segundos, e as respostas ficam em cache até a próxima
+        atualização que alterar algum dia.
+        """
+
+        if not self._pode_ver_painel(request):
+            return HttpResponseForbidden("Acesso Negado")
+
+        try:
+            inicio = datetime.date.fromisoformat(request.GET['inicio'])
+            fim = datetime.date.fromisoformat(request.GET['fim'])
+            funcionario_id = int(request.GET.get('funcionario') or 0) or None
+        except (KeyError, ValueError):
+            return JsonResponse({'erro': 'Informe as datas de início e fim no formato AAAA-MM-DD.'}, status=400)
+
+        agrupamento = 'semana' if request.GET.get('agrupamento') == 'semana' else 'dia'
+
+        if cache.add('desempenho:atualizando', True, settings.DESEMPENHO_INTERVALO_ATUALIZACAO):
+            atualizar_desempenho()
+
+        chave = f"desempenho:{versao_desempenho()}:{inicio}:{fim}:{funcionario_id}:{agrupamento}"
+        dados = cache.get(chave)
+        if dados is None:
+            with ler_de(banco_para_leitura(request)):
+                dados = serie_desempenho(inicio, fim, funcionario_id, agrupamento)
+            cache.set(chave, dados, settings.DESEMPENHO_CACHE_SEGUNDOS)
+
+        return JsonResponse(dados)
+
+
+@admin.register(FechamentoAgendamentos)
+class FechamentoAgendamentosAdmin(admin.ModelAdmin):
+    """
+    Define uma interface somente leitura para o registro das execuções do fechamento de agendamentos, feitas pelo
+    comando 'fechar_agendamentos' ou pela página "Fechar Agendamentos".
+    """
+
+    list_display = (
+        'data_inicio',
+        'origem',
+        'usuario',
+        'limite',
+        'status',
+        'alterados',
+        'lotes',
+        'dias_recalculados',
+        'data_fim',
+    )
+    list_select_related = ('usuario',)
+    list_filter = (
+        ('data_inicio', DateRangeFilter),
+        'origem',
+        'status',
+    )
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TransicaoStatus)
+class TransicaoStatusAdmin(admin.ModelAdmin):
+    """
+    Define uma interface somente leitura para o histórico de status dos agendamentos, que só recebe inserções. A busca
+    é pelo id exato do agendamento, que usa o índice (agendamento, momento).
+    """
+
+    list_display = (
+        'momento',
+        'agendamento_id',
+        'de',
+        'para',
+        'usuario',
+    )
+    list_select_related = ('usuario',)
+    list_filter = (
+        ('momento', DateRangeFilter),
+        'para',
+    )
+    search_fields = ('=agendamento_id',)
+    search_help_text = 'Informe o ID do agendamento.'
+    ordering = ('-momento',)
+    # O histórico cresce com cada alteração; a contagem total da tabela a cada página não compensa
+    show_full_result_count = False
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ListaEspera)
+class ListaEsperaAdmin(admin.ModelAdmin):
+    """
+    Define a interface de administração da lista de espera. As vagas liberadas por cancelamentos são ofertadas
+    automaticamente; a recepção confirma com o cliente e usa as ações para agendá-lo ou registrar a recusa.
+    """
+
+    form = ListaEsperaAdminForm
+    list_display = (
+        'cliente',
+        'servico',
+        'funcionario',
+        'inicio',
+        'fim',
+        'prioridade',
+        'situacao',
+        'oferta',
+        'oferta_expira_em',
+    )
+    list_select_related = (
+        'cliente__pessoa',
+        'servico',
+        'funcionario__pessoa',
+        'vaga_ofertada__funcionario__pessoa',
+        'vaga_ofertada__data_horario',
+    )
+    list_filter = (
+        'situacao',
+        ServicoFilter,
+        ('inicio', DateRangeFilter),
+    )
+    search_fields = (
+        'cliente__pessoa__nome_completo',
+        'cliente__pessoa__cpf',
+    )
+    ordering = ('-prioridade', 'data_cadastro')
+    actions = ('agendar_ofertados', 'registrar_recusa')
+    list_per_page = 20
+
+    @admin.display(description='Vaga Ofertada')
+    def oferta(self, obj):
+        # O __str__ da vaga lista os serviços, o que faria uma consulta por linha
+        vaga = obj.vaga_ofertada
+        if vaga is None:
+            return '-'
+        return f'{vaga.funcionario} - {vaga.data_horario}'
+
+    def save_model(self, request, obj, form, change):
+        """
+        Salva o pedido e, se ele estiver aguardando, oferece as vagas já canceladas dentro da sua janela, que seguem a
+        mesma ordem de prioridade da fila.
+        """
+
+        super().save_model(request, obj, form, change)
+        if obj.situacao != SituacaoEspera.AGUARDANDO:
+            return
+
+        ofertadas = ofertar_vagas(vagas_canceladas_sem_oferta().filter(
+            servico=obj.servico_id,
+            data_horario__data_horario__range=(obj.inicio, obj.fim)
+        ).values('pk'))
+        if ofertadas:
+            self.message_user(request, f'{ofertadas} vaga(s) cancelada(s) foram ofertadas à lista de espera.')
+
+    @admin.action(description='Confirmar vaga ofertada (agendar)')
+    def agendar_ofertados(self, request, queryset):
+        """Agenda os clientes dos pedidos selecionados nas vagas que lhes foram ofertadas, em uma única transação."""
+
+        agendamentos = confirmar_ofertas(queryset.values('pk'))
+        self.message_user(request, f'{len(agendamentos)} agendamento(s) criados a partir da lista de espera.')
+
+    @admin.action(description='Registrar recusa da vaga ofertada')
+    def registrar_recusa(self, request, queryset):
+        """Encerra as ofertas selecionadas e oferece as vagas ao próximo pedido da fila."""
+
+        recusados, ofertadas = recusar_ofertas(queryset.values('pk'))
+        self.message_user(
+            request,
+            f'{recusados} oferta(s) recusada(s); {ofertadas} vaga(s) ofertadas ao próximo da fila.'
+        )
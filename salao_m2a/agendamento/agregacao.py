@@ -0,0 +1,63 @@
+"""
+Funções puras de redução usadas pelo relatório de desempenho. Este módulo não importa modelos do Django para que possa
+ser carregado pelos processos de um ProcessPoolExecutor em qualquer método de inicialização (fork ou spawn).
+
+Cada linha é uma tupla (funcionario_id, nome_funcionario, agendamento_id, valor). Normalmente há uma linha por
+agendamento, com o seu valor total, mas um mesmo agendamento pode aparecer em várias linhas (uma por serviço), pois a
+contagem considera IDs distintos e os valores são somados.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+
+def particionar_por_funcionario(linhas, quantidade):
+    """
+    Divide as linhas em 'quantidade' partições, mantendo todas as linhas de um mesmo funcionário na mesma partição,
+    para que a contagem de agendamentos distintos possa ser feita localmente em cada uma.
+    """
+    particoes = [[] for _ in range(quantidade)]
+    for linha in linhas:
+        particoes[linha[0] % quantidade].append(linha)
+    return [particao for particao in particoes if particao]
+
+
+def reduzir_linhas(linhas):
+    """
+    Agrega as linhas pelo id do funcionário, retornando um dicionário id -> {'nome', 'concluidos', 'ganhos'} em que
+    'concluidos' conta agendamentos distintos e 'ganhos' soma os valores dos serviços. Funcionários homônimos ficam
+    separados.
+    """
+    nomes = {}
+    agendamentos = defaultdict(set)
+    ganhos = defaultdict(Decimal)
+
+    for funcionario_id, nome, agendamento_id, valor in linhas:
+        nomes[funcionario_id] = nome
+        agendamentos[funcionario_id].add(agendamento_id)
+        if valor is not None:
+            ganhos[funcionario_id] += valor
+
+    return {
+        funcionario_id: {'nome': nomes[funcionario_id], 'concluidos': len(ids), 'ganhos': ganhos[funcionario_id]}
+        for funcionario_id, ids in agendamentos.items()
+    }
+
+
+def combinar_parciais(parciais):
+    """
+    Soma os resultados parciais de várias partições em um único dicionário, ordenado pelo nome do funcionário e, entre
+    homônimos, pelo id.
+    """
+
+    combinado = {}
+    for parcial in parciais:
+        for funcionario_id, dados in parcial.items():
+            atual = combinado.setdefault(
+                funcionario_id,
+                {'nome': dados['nome'], 'concluidos': 0, 'ganhos': Decimal('0')}
+            )
+            atual['concluidos'] += dados['concluidos']
+            atual['ganhos'] += dados['ganhos']
+
+    return dict(sorted(combinado.items(), key=lambda item: (item[1]['nome'], item[0])))
@@ -0,0 +1,328 @@
+"""
+Interpretação dos termos digitados nas buscas de horários (autocompletes de vagas e de datas).
+
+Reconhece datas (DD/MM, DD/MM/AA, DD/MM/AAAA, "hoje", "amanhã"), horários ("14h", "14h30", "14:30"), dias da semana
+("segunda", "terça-feira", "sáb") e intervalos de qualquer um deles ("25/12 a 31/12", "14h até 16h", "seg-qua"). O
+resultado é uma lista de intervalos semiabertos [início, fim) de datetimes, aplicada diretamente sobre a coluna do
+horário; assim o banco usa o índice, ao contrário de 'data_horario__date', que converte a coluna em cada linha.
+
+As abreviações dos dias da semana ("ter", "qua", "sex") também são começos de nomes ("Teresa", "Quaresma"). Fora de
+um intervalo ("seg-qua"), são ambíguas: 'interpretacoes_da_busca' retorna as duas leituras, para que as views busquem
+o dia da semana ou o texto.
+
+As palavras que não são temporais formam o texto restante, usado pelas views na busca por nome. Quando o termo é
+inteiramente temporal, o texto restante é vazio e a busca textual pode ser dispensada.
+"""
+
+import datetime
+import re
+import unicodedata
+
+from django.db.models import Q
+from django.utils import timezone
+
+# Sem data explícita, horários e dias da semana são procurados nesta quantidade de dias a partir de hoje (o mesmo
+# padrão com que o comando 'gerador_de_horario' mantém a agenda aberta)
+HORIZONTE_DIAS = 180
+
+# Intervalos de datas mais longos que isto não são tratados como busca temporal
+MAXIMO_DIAS_INTERVALO = 366
+
+# Cada intervalo vira dois parâmetros na consulta. Quando dias e horários juntos passariam deste limite, os intervalos
+# passam a cobrir dias inteiros e os horários são conferidos na hora de cada linha, sem descartar nenhum dia
+MAXIMO_INTERVALOS = 300
+
+DIAS_DA_SEMANA = {
+    'segunda': 0,
+    'terca': 1,
+    'quarta': 2,
+    'quinta': 3,
+    'sexta': 4,
+    'sabado': 5,
+    'domingo': 6,
+}
+
+ABREVIACOES_DIAS_DA_SEMANA = {'seg': 0, 'ter': 1, 'qua': 2, 'qui': 3, 'sex': 4, 'sab': 5, 'dom': 6}
+
+CONECTORES_INTERVALO = {'a', 'ate', '-'}
+
+# Palavras ignoradas quando todo o restante do termo é temporal ("sexta às 14h", "de 25/12 a 31/12")
+PALAVRAS_NEUTRAS = {'as', 'a', 'de', 'das', 'do', 'dia', 'em', 'no', 'na', 'e', 'entre'}
+
+PADRAO_DATA = re.compile(r'^(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?$')
+PADRAO_HORA = re.compile(r'^(\d{1,2})(?::(\d{2})|h(\d{2})?)$')
+PADRAO_DIA_SEMANA = re.compile(r'^([a-z]+?)(?:-?feira)?\.?$')
+
+# Separa o hífen de intervalos escritos sem espaços ("25/12-31/12", "14h-16h"), sem afetar nomes compostos
+PADRAO_HIFEN = re.compile(r'(?<=[\dh])\s*-\s*(?=\d)|(?<=[a-z])-(?=(?:seg|ter|qua|qui|sex|sab|dom))', re.IGNORECASE)
+
+
+def _normalizar(palavra):
+    """Converte para minúsculas e remove acentos."""
+
+    decomposta = unicodedata.normalize('NFKD', palavra.lower())
+    return ''.join(caractere for caractere in decomposta if not unicodedata.combining(caractere))
+
+
+def _ler_data(texto, hoje):
+    """
+    Retorna (data, ano_informado) para DD/MM[/AAAA], ou None quando o texto não é uma data válida. Sem ano, usa o ano
+    de 'hoje'.
+    """
+
+    correspondencia = PADRAO_DATA.match(texto)
+    if not correspondencia:
+        return None
+
+    dia, mes, ano = correspondencia.groups()
+    ano_informado = ano is not None
+    if ano is None:
+        ano = hoje.year
+    elif len(ano) == 2:
+        ano = 2000 + int(ano)
+
+    try:
+        return datetime.date(int(ano), int(mes), int(dia)), ano_informado
+    except ValueError:
+        return None
+
+
+def _ler_hora(texto):
+    """
+    Retorna a janela (início, fim) em minutos do dia que o horário representa: "14h" cobre a hora inteira e "14:30" o
+    minuto exato. Retorna None quando o texto não é um horário válido.
+    """
+
+    correspondencia = PADRAO_HORA.match(texto)
+    if not correspondencia:
+        return None
+
+    hora, minuto_dois_pontos, minuto_h = correspondencia.groups()
+    minuto = minuto_dois_pontos or minuto_h
+    if int(hora) > 23 or (minuto is not None and int(minuto) > 59):
+        return None
+
+    inicio = int(hora) * 60 + int(minuto or 0)
+    return inicio, inicio + (1 if minuto is not None else 60)
+
+
+def _ler_dia_semana(texto):
+    correspondencia = PADRAO_DIA_SEMANA.match(texto)
+    return DIAS_DA_SEMANA.get(correspondencia.group(1)) if correspondencia else None
+
+
+def _ler_abreviacao(texto):
+    correspondencia = PADRAO_DIA_SEMANA.match(texto)
+    return ABREVIACOES_DIAS_DA_SEMANA.get(correspondencia.group(1)) if correspondencia else None
+
+
+def _classificar(palavra, hoje):
+    """
+    Classifica uma palavra já normalizada como ('data', ...), ('hora', ...), ('semana', ...), ('abreviacao', ...) ou
+    None.
+    """
+
+    if palavra == 'hoje':
+        return 'data', (hoje, True)
+    if palavra == 'amanha':
+        return 'data', (hoje + datetime.timedelta(days=1), True)
+
+    leitores = (
+        ('data', lambda texto: _ler_data(texto, hoje)),
+        ('hora', _ler_hora),
+        ('semana', _ler_dia_semana),
+        ('abreviacao', _ler_abreviacao),
+    )
+    for tipo, leitor in leitores:
+        valor = leitor(palavra)
+        if valor is not None:
+            return tipo, valor
+
+    return None
+
+
+def _ajustar_ano(data, ano_informado, hoje):
+    """Datas sem ano que já passaram referem-se ao próximo ano, já que as buscas são sempre de horários futuros."""
+
+    if ano_informado or data >= hoje:
+        return data
+    try:
+        return data.replace(year=data.year + 1)
+    except ValueError:
+        return data
+
+
+def _intervalo_datas(inicio, fim, hoje):
+    """Resolve um intervalo de datas (cada uma como (data, ano_informado)) em (primeiro_dia, último_dia)."""
+
+    (data_inicio, ano_inicio), (data_fim, ano_fim) = inicio, fim
+
+    if not ano_inicio and not ano_fim and data_fim < hoje:
+        data_inicio, data_fim = (_ajustar_ano(data, False, hoje) for data in (data_inicio, data_fim))
+    if not ano_fim and data_fim < data_inicio:
+        try:
+            data_fim = data_fim.replace(year=data_fim.year + 1)
+        except ValueError:
+            pass
+
+    return data_inicio, data_fim
+
+
+def _tipo(classificacao):
+    """Retorna o tipo da classificação, tratando as abreviações como dias da semana."""
+
+    return 'semana' if classificacao[0] == 'abreviacao' else classificacao[0]
+
+
+def _juntar_intervalos(elementos, hoje, abreviacoes):
+    """
+    Junta "X a Y" em um único elemento quando X e Y são do mesmo tipo. Retorna a lista de elementos temporais e a
+    lista das palavras não temporais (na forma original). Sem 'abreviacoes', as abreviações de dias da semana fora de
+    um intervalo são tratadas como palavras.
+    """
+
+    temporais = []
+    restantes = []
+    posicao = 0
+
+    while posicao < len(elementos):
+        original, normalizada, classificacao = elementos[posicao]
+
+        if classificacao and posicao + 2 < len(elementos):
+            _, conector, _ = elementos[posicao + 1]
+            _, _, classificacao_fim = elementos[posicao + 2]
+            mesmo_tipo = classificacao_fim and _tipo(classificacao_fim) == _tipo(classificacao)
+            if conector in CONECTORES_INTERVALO and mesmo_tipo:
+                tipo, inicio = _tipo(classificacao), classificacao[1]
+                fim = classificacao_fim[1]
+                if tipo == 'data':
+                    temporais.append(('datas', _intervalo_datas(inicio, fim, hoje)))
+                elif tipo == 'hora':
+                    temporais.append(('hora', (inicio[0], fim[1])))
+                else:
+                    dias = range((fim - inicio) % 7 + 1)
+                    temporais.append(('semana', {(inicio + deslocamento) % 7 for deslocamento in dias}))
+                posicao += 3
+                continue
+
+        if classificacao is None or (classificacao[0] == 'abreviacao' and not abreviacoes):
+            restantes.append((original, normalizada))
+        else:
+            tipo, valor = _tipo(classificacao), classificacao[1]
+            if tipo == 'data':
+                dia = _ajustar_ano(*valor, hoje)
+                temporais.append(('datas', (dia, dia)))
+            elif tipo == 'semana':
+                temporais.append(('semana', {valor}))
+            else:
+                temporais.append(('hora', valor))
+        posicao += 1
+
+    return temporais, restantes
+
+
+def interpretar_busca(termo, hoje=None, abreviacoes=True):
+    """
+    Interpreta o termo de busca e retorna uma tupla (intervalos, texto): 'intervalos' é a lista ordenada de intervalos
+    semiabertos (início, fim, horas) de datetimes com fuso, vazia quando o termo não tem partes temporais; 'texto' é o
+    que sobra do termo, vazio quando o termo é inteiramente temporal. 'horas' é None, ou, quando o intervalo cobre dias
+    inteiros por ter passado de MAXIMO_INTERVALOS, as janelas (início, fim) em minutos do dia a conferir em cada linha.
+    Sem 'abreviacoes', as abreviações de dias da semana fora de intervalos ficam no texto.
+    """
+
+    termo = (termo or '').strip()
+    if not termo:
+        return [], ''
+
+    hoje = hoje or timezone.localdate()
+    palavras = PADRAO_HIFEN.sub(' - ', termo).split()
+    elementos = []
+    for palavra in palavras:
+        normalizada = _normalizar(palavra).rstrip(',')
+        elementos.append((palavra, normalizada, _classificar(normalizada, hoje)))
+
+    temporais, restantes = _juntar_intervalos(elementos, hoje, abreviacoes)
+    if not temporais:
+        return [], termo
+
+    periodos = [valor for tipo, valor in temporais if tipo == 'datas']
+    if any(inicio > fim or (fim - inicio).days >= MAXIMO_DIAS_INTERVALO for inicio, fim in periodos):
+        return [], termo
+
+    dias_semana = set().union(*(valor for tipo, valor in temporais if tipo == 'semana'))
+    janelas = sorted(valor for tipo, valor in temporais if tipo == 'hora')
+    # Como os intervalos de datas invertidos, um intervalo de horários que termina antes de começar não é temporal
+    if any(fim <= inicio for inicio, fim in janelas):
+        return [], termo
+
+    if not periodos:
+        periodos = [(hoje, hoje + datetime.timedelta(days=HORIZONTE_DIAS))]
+
+    dias = sorted({
+        inicio + datetime.timedelta(days=deslocamento)
+        for inicio, fim in periodos
+        for deslocamento in range((fim - inicio).days + 1)
+        if not dias_semana or (inicio + datetime.timedelta(days=deslocamento)).weekday() in dias_semana
+    })
+
+    def momento(dia, minutos):
+        meia_noite = datetime.datetime.combine(dia, datetime.time.min)
+        return timezone.make_aware(meia_noite + datetime.timedelta(minutes=minutos))
+
+    horas = None
+    if len(dias) * len(janelas) > MAXIMO_INTERVALOS:
+        horas, janelas = tuple(janelas), []
+
+    intervalos = []
+    for dia in dias:
+        for inicio, fim in janelas or [(0, 24 * 60)]:
+            intervalo = [momento(dia, inicio), momento(dia, fim)]
+            # Dias consecutivos sem horário formam um único intervalo
+            if intervalos and intervalos[-1][1] == intervalo[0]:
+                intervalos[-1][1] = intervalo[1]
+            else:
+                intervalos.append(intervalo)
+
+    texto = ' '.join(original for original, normalizada in restantes)
+    if all(normalizada in PALAVRAS_NEUTRAS or normalizada in CONECTORES_INTERVALO for _, normalizada in restantes):
+        texto = ''
+
+    return [(inicio, fim, horas) for inicio, fim in intervalos], texto
+
+
+def interpretacoes_da_busca(termo, hoje=None):
+    """
+    Retorna as leituras possíveis do termo, como tuplas (intervalos, texto) de interpretar_busca: uma só, ou duas
+    quando o termo tem uma abreviação de dia da semana fora de um intervalo ("Ter" é terça-feira ou o começo de
+    "Teresa"). As views combinam as leituras com OR.
+    """
+
+    hoje = hoje or timezone.localdate()
+    leitura = interpretar_busca(termo, hoje)
+    literal = interpretar_busca(termo, hoje, abreviacoes=False)
+    return [leitura] if literal == leitura else [leitura, literal]
+
+
+def _hora(minutos):
+    return datetime.time(minutos // 60, minutos % 60)
+
+
+def filtro_intervalos(campo, intervalos):
+    """
+    Monta o filtro (OR de 'campo >= início AND campo < fim') para os intervalos retornados por interpretar_busca,
+    conferindo também a hora do dia nos intervalos que trazem janelas de horário.
+    """
+
+    filtro = Q()
+    for inicio, fim, horas in intervalos:
+        intervalo = Q(**{f'{campo}__gte': inicio, f'{campo}__lt': fim})
+        if horas:
+            janelas = Q()
+            for hora_inicio, hora_fim in horas:
+                janela = Q(**{f'{campo}__time__gte': _hora(hora_inicio)})
+                if hora_fim < 24 * 60:
+                    janela &= Q(**{f'{campo}__time__lt': _hora(hora_fim)})
+                janelas |= janela
+            intervalo &= janelas
+        filtro |= intervalo
+    return filtro
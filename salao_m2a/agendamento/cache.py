@@ -0,0 +1,92 @@
+"""
+Consultas frequentes e raramente alteradas, guardadas no cache (veja CACHES no settings.py): catálogo de serviços,
+serviços de cada funcionário e opções dos filtros do admin.
+
+Cada consulta é refeita por inteiro quando o item expira (CACHE_CONSULTAS_SEGUNDOS) ou é invalidado pelos sinais
+registrados em 'signals' quando é confirmada a transação de uma alteração dos modelos envolvidos.
+
+Os grupos de cada usuário, usados nas verificações de permissão, não vão para o cache: com o cache em memória, a
+invalidação só alcançaria o processo que fez a alteração, e um usuário removido de um grupo manteria o acesso nos
+demais. Eles são consultados uma vez por requisição e guardados no próprio objeto do usuário.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Funcionario, Servico
+
+CHAVE_CATALOGO_SERVICOS = 'consultas:catalogo_servicos'
+CHAVE_SERVICOS_POR_FUNCIONARIO = 'consultas:servicos_por_funcionario'
+CHAVE_OPCOES_FUNCIONARIOS = 'consultas:opcoes_funcionarios'
+
+CHAVES_CATALOGO = (CHAVE_CATALOGO_SERVICOS, CHAVE_SERVICOS_POR_FUNCIONARIO, CHAVE_OPCOES_FUNCIONARIOS)
+
+
+def _obter(chave, consulta):
+    return cache.get_or_set(chave, consulta, settings.CACHE_CONSULTAS_SEGUNDOS)
+
+
+def catalogo_servicos():
+    """Retorna {id do serviço: (nome, valor, ativo)} para todos os serviços, ordenados pelo nome."""
+
+    return _obter(CHAVE_CATALOGO_SERVICOS, lambda: {
+        pk: (nome, valor, ativo)
+        for pk, nome, valor, ativo in Servico.objects.order_by('nome_servico').values_list(
+            'pk', 'nome_servico', 'valor', 'ativo'
+        )
+    })
+
+
+def servicos_por_funcionario():
+    """Retorna {id do funcionário: [ids dos serviços que executa]} para todos os funcionários."""
+
+    def consultar():
+        mapa = {}
+        for funcionario_id, servico_id in Funcionario.servico.through.objects.values_list(
+            'funcionario_id', 'servico_id'
+        ).order_by('pk'):
+            mapa.setdefault(funcionario_id, []).append(servico_id)
+        return mapa
+
+    return _obter(CHAVE_SERVICOS_POR_FUNCIONARIO, consultar)
+
+
+def opcoes_servicos():
+    """Retorna os pares (id, nome) dos serviços ativos, ordenados pelo nome, para listas de escolha."""
+
+    return [(pk, nome) for pk, (nome, _, ativo) in catalogo_servicos().items() if ativo]
+
+
+def opcoes_funcionarios():
+    """Retorna os pares (id, nome) dos funcionários ativos, ordenados pelo nome, para listas de escolha."""
+
+    return _obter(CHAVE_OPCOES_FUNCIONARIOS, lambda: list(
+        Funcionario.ativos.order_by('pessoa__nome_completo').values_list('pk', 'pessoa__nome_completo')
+    ))
+
+
+def invalidar_catalogo():
+    cache.delete_many(CHAVES_CATALOGO)
+
+
+def grupos_do_usuario(usuario):
+    """
+    Retorna o conjunto com os nomes dos grupos do usuário. O resultado fica guardado no próprio objeto do usuário, que
+    dura uma requisição, para que as várias verificações de perfil de uma página façam uma única consulta.
+    """
+
+    if not usuario.is_authenticated:
+        return frozenset()
+
+    grupos = getattr(usuario, '_grupos_da_requisicao', None)
+    if grupos is None:
+        grupos = frozenset(usuario.groups.values_list('name', flat=True))
+        usuario._grupos_da_requisicao = grupos
+
+    return grupos
+
+
+def pertence_ao_grupo(usuario, nome):
+    """Equivale a 'usuario.groups.filter(name=nome).exists()', com uma única consulta por requisição."""
+
+    return nome in grupos_do_usuario(usuario)
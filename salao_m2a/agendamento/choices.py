@@ -7,4 +7,30 @@ class StatusAgendamento(models.TextChoices):
     """
     AGENDADO = 'AGENDADO', 'Agendado'
     CONCLUIDO = 'CONCLUIDO', 'Concluído'
-    CANCELADO = 'CANCELADO', 'Cancelado'
\ No newline at end of file
+    CANCELADO = 'CANCELADO', 'Cancelado'
+
+
+class CodigoStatus(models.IntegerChoices):
+    """
+    Códigos compactos dos status de agendamento, usados no histórico de transições. Os nomes são iguais aos valores de
+    StatusAgendamento, de modo que 'CodigoStatus[status]' converte o status em código.
+    """
+    AGENDADO = 1, 'Agendado'
+    CONCLUIDO = 2, 'Concluído'
+    CANCELADO = 3, 'Cancelado'
+
+
+class OrigemFechamento(models.TextChoices):
+    """Indica quem disparou uma execução do fechamento de agendamentos."""
+    COMANDO = 'COMANDO', 'Comando'
+    AGENDADO = 'AGENDADO', 'Execução Agendada'
+    ADMIN = 'ADMIN', 'Admin'
+
+
+class SituacaoEspera(models.TextChoices):
+    """Situação de um pedido da lista de espera."""
+    AGUARDANDO = 'AGUARDANDO', 'Aguardando'
+    OFERTADO = 'OFERTADO', 'Vaga Ofertada'
+    ATENDIDO = 'ATENDIDO', 'Atendido'
+    RECUSADO = 'RECUSADO', 'Recusado'
+    EXPIRADO = 'EXPIRADO', 'Expirado'
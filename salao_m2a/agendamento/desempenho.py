@@ -0,0 +1,240 @@
+"""
+Manutenção e consulta do agregado diário de desempenho por funcionário (DesempenhoDiario).
+
+A atualização é incremental: a partir da última data de cálculo, localiza os agendamentos alterados (pelo campo
+'data_atualizacao'), descobre os dias afetados e recalcula apenas esses dias, para todos os funcionários. Por isso,
+toda alteração em massa de agendamentos (QuerySet.update) deve também atualizar 'data_atualizacao'. Exclusões e trocas
+de vaga não deixam rastro nos dias antigos: quem exclui agendamentos ou os troca de vaga obtém os dias afetados com
+'dias_dos_agendamentos' antes da alteração e os recalcula depois com 'recalcular_dias'.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from .choices import StatusAgendamento
+from .models import Agendamento, AgendamentoArquivado, DesempenhoDiario
+
+# Transações longas podem gravar um agendamento com 'data_atualizacao' anterior à última atualização do agregado;
+# a busca sempre recua esta margem, e recalcular um dia a mais não altera o resultado
+MARGEM_SEGURANCA = timedelta(minutes=5)
+
+CAMPO_HORARIO = 'servico_funcionario_horario__data_horario__data_horario'
+
+# Muda a cada atualização do agregado e compõe as chaves de cache das séries, invalidando-as de uma só vez
+CHAVE_VERSAO = 'desempenho:versao'
+
+
+def versao_desempenho():
+    return cache.get_or_set(CHAVE_VERSAO, lambda: timezone.now().timestamp(), None)
+
+
+def _inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _agregar_periodo(inicio, fim):
+    """
+    Agrega os agendamentos ativos e arquivados com horário entre as datas 'inicio' (inclusive) e 'fim' (exclusive),
+    retornando um dicionário {(funcionario_id, dia): [agendados, concluidos, cancelados, receita]}.
+    """
+
+    concluido = Q(status=StatusAgendamento.CONCLUIDO)
+    cancelado = Q(status=StatusAgendamento.CANCELADO)
+    totais = {}
+
+    ativos = Agendamento.ativos.filter(**{
+        f'{CAMPO_HORARIO}__gte': _inicio_do_dia(inicio),
+        f'{CAMPO_HORARIO}__lt': _inicio_do_dia(fim),
+    }).annotate(
+        id_funcionario=F('servico_funcionario_horario__funcionario_id'),
+        dia=TruncDate(CAMPO_HORARIO)
+    ).values('id_funcionario', 'dia')
+
+    arquivados = AgendamentoArquivado.objects.filter(
+        data_horario__gte=_inicio_do_dia(inicio),
+        data_horario__lt=_inicio_do_dia(fim)
+    ).annotate(
+        id_funcionario=F('funcionario_id'),
+        dia=TruncDate('data_horario')
+    ).values('id_funcionario', 'dia')
+
+    for consulta in (ativos, arquivados):
+        linhas = consulta.annotate(
+            total=Count('id'),
+            total_concluidos=Count('id', filter=concluido),
+            total_cancelados=Count('id', filter=cancelado),
+            total_receita=Sum('valor_total', filter=concluido)
+        ).order_by()
+
+        for linha in linhas:
+            atual = totais.setdefault((linha['id_funcionario'], linha['dia']), [0, 0, 0, 0])
+            atual[0] += linha['total']
+            atual[1] += linha['total_concluidos']
+            atual[2] += linha['total_cancelados']
+            atual[3] += linha['total_receita'] or 0
+
+    return totais
+
+
+def _recalcular_periodo(inicio, fim, data_calculo):
+    """Substitui, em uma transação, as linhas do agregado entre 'inicio' (inclusive) e 'fim' (exclusive)."""
+
+    totais = _agregar_periodo(inicio, fim)
+
+    with transaction.atomic():
+        DesempenhoDiario.objects.filter(data__gte=inicio, data__lt=fim).delete()
+        DesempenhoDiario.objects.bulk_create([
+            DesempenhoDiario(
+                funcionario_id=funcionario_id,
+                data=dia,
+                agendados=agendados,
+                concluidos=concluidos,
+                cancelados=cancelados,
+                receita=receita,
+                data_calculo=data_calculo
+            )
+            for (funcionario_id, dia), (agendados, concluidos, cancelados, receita) in totais.items()
+        ], batch_size=1000)
+
+
+def _periodos_contiguos(dias):
+    """Agrupa um conjunto de datas em intervalos [inicio, fim) de dias consecutivos."""
+
+    periodos = []
+    for dia in sorted(dias):
+        if periodos and periodos[-1][1] == dia:
+            periodos[-1][1] = dia + timedelta(days=1)
+        else:
+            periodos.append([dia, dia + timedelta(days=1)])
+    return periodos
+
+
+def dias_dos_agendamentos(agendamentos):
+    """Retorna o conjunto das datas locais dos horários dos agendamentos do queryset informado."""
+
+    horarios = agendamentos.values_list(CAMPO_HORARIO, flat=True)
+    return {timezone.localdate(horario) for horario in horarios if horario}
+
+
+def recalcular_dias(dias):
+    """
+    Recalcula o agregado nos dias informados e retorna a quantidade de dias recalculados. As linhas recebem a data de
+    cálculo da última atualização, e não o momento atual, para que a atualização incremental seguinte ainda encontre
+    os agendamentos alterados desde então. Sem agregado calculado, nada é feito: a primeira atualização é completa.
+    """
+
+    ultima_atualizacao = DesempenhoDiario.objects.aggregate(ultima=Max('data_calculo'))['ultima']
+    if ultima_atualizacao is None or not dias:
+        return 0
+
+    for inicio, fim in _periodos_contiguos(dias):
+        _recalcular_periodo(inicio, fim, ultima_atualizacao)
+
+    cache.set(CHAVE_VERSAO, timezone.now().timestamp(), None)
+    return len(dias)
+
+
+def atualizar_desempenho(completo=False):
+    """
+    Atualiza o agregado de desempenho e retorna a quantidade de dias recalculados. Sem dados anteriores, ou com
+    'completo', recalcula todo o histórico.
+    """
+
+    agora = timezone.now()
+    ultima_atualizacao = DesempenhoDiario.objects.aggregate(ultima=Max('data_calculo'))['ultima']
+
+    if completo or ultima_atualizacao is None:
+        limites = [
+            Agendamento.objects.aggregate(inicio=Min(CAMPO_HORARIO), fim=Max(CAMPO_HORARIO)),
+            AgendamentoArquivado.objects.aggregate(inicio=Min('data_horario'), fim=Max('data_horario')),
+        ]
+        inicios = [timezone.localdate(limite['inicio']) for limite in limites if limite['inicio']]
+        fins = [timezone.localdate(limite['fim']) for limite in limites if limite['fim']]
+
+        DesempenhoDiario.objects.all().delete()
+        if not inicios:
+            return 0
+
+        inicio, fim = min(inicios), max(fins) + timedelta(days=1)
+        _recalcular_periodo(inicio, fim, agora)
+        cache.set(CHAVE_VERSAO, agora.timestamp(), None)
+        return (fim - inicio).days
+
+    horarios = Agendamento.objects.filter(
+        data_atualizacao__gte=ultima_atualizacao - MARGEM_SEGURANCA
+    ).values_list(CAMPO_HORARIO, flat=True)
+    dias = {timezone.localdate(horario) for horario in horarios if horario}
+
+    for inicio, fim in _periodos_contiguos(dias):
+        _recalcular_periodo(inicio, fim, agora)
+
+    if dias:
+        cache.set(CHAVE_VERSAO, agora.timestamp(), None)
+
+    return len(dias)
+
+
+def serie_desempenho(inicio, fim, funcionario_id=None, agrupamento='dia'):
+    """
+    Monta, a partir do agregado, as séries de receita, agendamentos e taxa de conclusão entre as datas informadas
+    (inclusive), por dia ou por semana, para cada funcionário e para o salão como um todo.
+    """
+
+    linhas = DesempenhoDiario.objects.filter(data__gte=inicio, data__lte=fim)
+    if funcionario_id:
+        linhas = linhas.filter(funcionario_id=funcionario_id)
+
+    linhas = linhas.annotate(
+        periodo=TruncWeek('data') if agrupamento == 'semana' else F('data')
+    ).values(
+        'funcionario_id',
+        'funcionario__pessoa__nome_completo',
+        'periodo'
+    ).annotate(
+        agendados=Sum('agendados'),
+        concluidos=Sum('concluidos'),
+        cancelados=Sum('cancelados'),
+        receita=Sum('receita')
+    ).order_by('funcionario__pessoa__nome_completo', 'periodo')
+
+    def ponto(periodo, agendados, concluidos, cancelados, receita):
+        encerrados = concluidos + cancelados
+        return {
+            'periodo': periodo.isoformat(),
+            'agendados': agendados,
+            'concluidos': concluidos,
+            'cancelados': cancelados,
+            'receita': float(receita),
+            'taxa_conclusao': round(100 * concluidos / encerrados, 1) if encerrados else None,
+        }
+
+    funcionarios = {}
+    total = {}
+    for linha in linhas:
+        valores = (linha['agendados'], linha['concluidos'], linha['cancelados'], linha['receita'] or 0)
+        funcionario = funcionarios.setdefault(linha['funcionario_id'], {
+            'id': linha['funcionario_id'],
+            'nome': linha['funcionario__pessoa__nome_completo'],
+            'serie': [],
+            'totais': [0, 0, 0, 0],
+        })
+        funcionario['serie'].append(ponto(linha['periodo'], *valores))
+        funcionario['totais'] = [a + b for a, b in zip(funcionario['totais'], valores)]
+        total[linha['periodo']] = [a + b for a, b in zip(total.get(linha['periodo'], [0, 0, 0, 0]), valores)]
+
+    for funcionario in funcionarios.values():
+        funcionario['resumo'] = ponto(inicio, *funcionario.pop('totais'))
+        del funcionario['resumo']['periodo']
+
+    return {
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'agrupamento': agrupamento,
+        'total': [ponto(periodo, *valores) for periodo, valores in sorted(total.items())],
+        'funcionarios': list(funcionarios.values()),
+    }
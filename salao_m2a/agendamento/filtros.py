@@ -1,4 +1,11 @@
+from django.conf import settings
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.translation import gettext as _
+
+from .cache import opcoes_funcionarios, opcoes_servicos
+from .models import Cliente
+
 
 class ValorRangeFilter(admin.SimpleListFilter):
     """
@@ -28,3 +35,132 @@ class ValorRangeFilter(admin.SimpleListFilter):
         if self.value() == 'maisde200':
             return queryset.filter(valor__gt=200)
         return queryset
+
+
+class ValorVitalicioFilter(admin.SimpleListFilter):
+    """
+    Filtra os clientes por faixas de valor vitalício (total gasto em serviços concluídos), usando o índice da coluna.
+    """
+    title = 'Valor Vitalício'
+    parameter_name = 'valor_vitalicio'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('sem', 'Sem visitas concluídas'),
+            ('ate500', 'Até R$ 500'),
+            ('500a2000', 'Entre R$ 500 e R$ 2.000'),
+            ('2000a5000', 'Entre R$ 2.000 e R$ 5.000'),
+            ('maisde5000', 'Acima de R$ 5.000'),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'sem':
+            return queryset.filter(valor_vitalicio=0)
+        if self.value() == 'ate500':
+            return queryset.filter(valor_vitalicio__gt=0, valor_vitalicio__lte=500)
+        if self.value() == '500a2000':
+            return queryset.filter(valor_vitalicio__gt=500, valor_vitalicio__lte=2000)
+        if self.value() == '2000a5000':
+            return queryset.filter(valor_vitalicio__gt=2000, valor_vitalicio__lte=5000)
+        if self.value() == 'maisde5000':
+            return queryset.filter(valor_vitalicio__gt=5000)
+        return queryset
+
+
+class FiltroOpcoesCache(admin.SimpleListFilter):
+    """
+    Base dos filtros por chave estrangeira cujas opções são pares (id, nome) lidos do cache, em vez de carregar cada
+    objeto relacionado a cada exibição da listagem. Quando há mais de FILTRO_MAXIMO_OPCOES opções, o filtro é exibido
+    como um campo de busca que consulta o autocomplete em 'url_autocomplete', em vez de uma lista com todas elas.
+    """
+    campo = None
+    url_autocomplete = None
+    sempre_autocomplete = False
+    template_autocomplete = 'admin/agendamento/filtro_autocomplete.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        if self.url_autocomplete and (
+            self.sempre_autocomplete or len(self.lookup_choices) > settings.FILTRO_MAXIMO_OPCOES
+        ):
+            self.template = self.template_autocomplete
+
+    def opcoes(self):
+        raise NotImplementedError('As subclasses de FiltroOpcoesCache devem implementar opcoes().')
+
+    def lookups(self, request, model_admin):
+        return self.opcoes()
+
+    def has_output(self):
+        return self.template == self.template_autocomplete or super().has_output()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            try:
+                return queryset.filter(**{self.campo: int(self.value())})
+            except ValueError:
+                return queryset.none()
+        return queryset
+
+    def choices(self, changelist):
+        if self.template != self.template_autocomplete:
+            yield from super().choices(changelist)
+            return
+
+        sem_filtro = changelist.get_query_string(remove=[self.parameter_name])
+        yield {
+            'selected': self.value() is None,
+            'query_string': sem_filtro,
+            'display': _('All'),
+        }
+        yield {
+            'autocomplete': True,
+            'url': reverse(self.url_autocomplete),
+            'query_string': sem_filtro,
+            'parametro': self.parameter_name,
+            'selecionado': dict((str(pk), nome) for pk, nome in self.lookup_choices).get(self.value(), ''),
+        }
+
+
+class FuncionarioFilter(FiltroOpcoesCache):
+    """Filtra pelo funcionário da vaga, com as opções (funcionários ativos) lidas do cache."""
+    title = 'Funcionário'
+    parameter_name = 'funcionario'
+    campo = 'funcionario_id'
+    url_autocomplete = 'agendamento:funcionario-autocomplete'
+
+    def opcoes(self):
+        return opcoes_funcionarios()
+
+
+class FuncionarioAgendamentoFilter(FuncionarioFilter):
+    """Filtra os agendamentos pelo funcionário da vaga reservada."""
+    campo = 'servico_funcionario_horario__funcionario_id'
+
+
+class ServicoFilter(FiltroOpcoesCache):
+    """Filtra pelos serviços da vaga ou do funcionário, com as opções (serviços ativos) lidas do cache."""
+    title = 'Serviço'
+    parameter_name = 'servico'
+    campo = 'servico'
+    url_autocomplete = 'agendamento:servico-autocomplete'
+
+    def opcoes(self):
+        return opcoes_servicos()
+
+
+class ClienteFilter(FiltroOpcoesCache):
+    """
+    Filtra os agendamentos pelo cliente. Como os clientes são milhares, o filtro é sempre um campo de busca e a única
+    opção carregada é o nome do cliente selecionado.
+    """
+    title = 'Cliente'
+    parameter_name = 'cliente'
+    campo = 'cliente_id'
+    url_autocomplete = 'agendamento:cliente-autocomplete'
+    sempre_autocomplete = True
+
+    def opcoes(self):
+        if not self.value() or not self.value().isdigit():
+            return []
+        return Cliente.objects.filter(pk=self.value()).values_list('pk', 'pessoa__nome_completo')
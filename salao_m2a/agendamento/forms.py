@@ -1,14 +1,46 @@
+import datetime
 from dal import autocomplete
 from django import forms
+from django.conf import settings
 from django.urls import reverse_lazy
-from django_select2.forms import Select2MultipleWidget
-from .models import Pessoa, Cliente, Funcionario, Servico, ServicoFuncionarioHorario, Agendamento, DataHorario
+from django.utils import timezone
+from .choices import StatusAgendamento
+from .cache import servicos_por_funcionario
+from .models import (
+    Pessoa,
+    Cliente,
+    Funcionario,
+    Servico,
+    ServicoFuncionarioHorario,
+    Agendamento,
+    DataHorario,
+    ListaEspera
+)
+
+VIEWS_COM_VERSAO_ASSINCRONA = (
+    'pessoa-disponivel-autocomplete',
+    'vaga-disponivel-ordenada-autocomplete',
+    'data-ordenada-autocomplete',
+)
+
+
+def url_autocomplete(nome):
+    """
+    Retorna a URL da view de autocomplete informada, usando a versão assíncrona quando AUTOCOMPLETE_ASSINCRONO estiver
+    habilitado e a view possuir essa variante.
+    """
+    if settings.AUTOCOMPLETE_ASSINCRONO and nome in VIEWS_COM_VERSAO_ASSINCRONA:
+        nome = f'{nome}-async'
+    return reverse_lazy(f'agendamento:{nome}')
+
 
 pessoa_autocomplete_widget = autocomplete.ModelSelect2(
-    url=reverse_lazy('agendamento:pessoa-disponivel-autocomplete'),
+    url=url_autocomplete('pessoa-disponivel-autocomplete'),
     attrs={'data-placeholder': 'Busque pelo nome ou CPF'}
 )
 
+# Os formulários de edição validam com 'objects', e não 'ativos': o valor atual de um registro pode ter sido desativado
+# depois e deve continuar válido. As views de autocomplete é que oferecem apenas os registros ativos.
 class ClienteAdminForm(forms.ModelForm):
     """
     Formulário para o admin do modelo Cliente. Substitui o campo de seleção padrão de 'pessoa' por um widget de
@@ -27,7 +59,7 @@ class ClienteAdminForm(forms.ModelForm):
 class FuncionarioAdminForm(forms.ModelForm):
     """
     Formulário para o admin do modelo Funcionario. Customiza o campo 'pessoa' com um widget de autocomplete e o campo
-    'servico' com um widget de seleção múltipla aprimorado.
+    'servico' com um autocomplete paginado, que carrega os serviços sob demanda.
     """
     pessoa = forms.ModelChoiceField(
         queryset=Pessoa.objects.all(),
@@ -36,7 +68,10 @@ class FuncionarioAdminForm(forms.ModelForm):
 
     servico = forms.ModelMultipleChoiceField(
         queryset=Servico.objects.all(),
-        widget=Select2MultipleWidget,
+        widget=autocomplete.ModelSelect2Multiple(
+            url=reverse_lazy('agendamento:servico-autocomplete'),
+            attrs={'data-placeholder': 'Busque pelo nome do serviço'}
+        ),
         label='Serviços que Executa',
     )
 
@@ -52,7 +87,11 @@ class ServicoFuncionarioHorarioAdminForm(forms.ModelForm):
     """
     servico = forms.ModelMultipleChoiceField(
         queryset=Servico.objects.all(),
-        widget=Select2MultipleWidget,
+        widget=autocomplete.ModelSelect2Multiple(
+            url=reverse_lazy('agendamento:servico-autocomplete'),
+            forward=['funcionario'],
+            attrs={'data-placeholder': 'Busque pelo nome do serviço'}
+        ),
         label='Serviços que Executa',
     )
 
@@ -60,7 +99,7 @@ class ServicoFuncionarioHorarioAdminForm(forms.ModelForm):
         queryset=DataHorario.objects.all(),
         label='Data',
         widget=autocomplete.ModelSelect2(
-            url=reverse_lazy('agendamento:data-ordenada-autocomplete'),
+            url=url_autocomplete('data-ordenada-autocomplete'),
             attrs={'data-placeholder': 'Busque pela data (ex: 25/12/2025)'}
         )
     )
@@ -79,10 +118,185 @@ class AgendamentoAdminForm(forms.ModelForm):
         queryset=ServicoFuncionarioHorario.objects.all(),
         help_text= 'Busque por data, funcionário ou serviço',
         widget=autocomplete.ModelSelect2(
-            url=reverse_lazy('agendamento:vaga-disponivel-ordenada-autocomplete'),
+            url=url_autocomplete('vaga-disponivel-ordenada-autocomplete'),
 )
     )
 
     class Meta:
         model = Agendamento
         fields = '__all__'
+
+
+class AgendamentoRecorrenteForm(forms.Form):
+    """
+    Formulário para a criação de agendamentos recorrentes. A partir do primeiro horário, repete a reserva do mesmo
+    serviço com o mesmo funcionário a cada intervalo de dias informado.
+    """
+    INTERVALOS = (
+        (7, 'Semanal'),
+        (14, 'Quinzenal'),
+        (28, 'A cada 4 semanas'),
+    )
+
+    cliente = forms.ModelChoiceField(
+        queryset=Cliente.ativos.all(),
+        widget=autocomplete.ModelSelect2(
+            url=reverse_lazy('agendamento:cliente-autocomplete'),
+            attrs={'data-placeholder': 'Busque pelo nome ou CPF'}
+        )
+    )
+
+    funcionario = forms.ModelChoiceField(
+        queryset=Funcionario.ativos.select_related('pessoa').order_by('pessoa__nome_completo'),
+        label='Funcionário'
+    )
+
+    servico = forms.ModelChoiceField(
+        queryset=Servico.ativos.all(),
+        label='Serviço',
+        widget=autocomplete.ModelSelect2(
+            url=reverse_lazy('agendamento:servico-autocomplete'),
+            forward=['funcionario'],
+            attrs={'data-placeholder': 'Busque pelo nome do serviço'}
+        )
+    )
+
+    primeiro_horario = forms.ModelChoiceField(
+        queryset=DataHorario.ativos.all(),
+        label='Primeiro Horário',
+        widget=autocomplete.ModelSelect2(
+            url=url_autocomplete('data-ordenada-autocomplete'),
+            attrs={'data-placeholder': 'Busque pela data (ex: 25/12/2025)'}
+        )
+    )
+
+    intervalo_dias = forms.TypedChoiceField(
+        choices=INTERVALOS,
+        coerce=int,
+        initial=7,
+        label='Repetição'
+    )
+
+    ocorrencias = forms.IntegerField(
+        min_value=1,
+        max_value=52,
+        initial=12,
+        label='Quantidade de Agendamentos'
+    )
+
+    exigir_todas = forms.BooleanField(
+        required=False,
+        label='Reservar somente se todas as datas estiverem disponíveis'
+    )
+
+
+class ImportacaoClientesForm(forms.Form):
+    """
+    Formulário para o envio de um arquivo CSV de clientes a ser importado em lotes.
+    """
+    DELIMITADORES = (
+        (',', 'Vírgula (,)'),
+        (';', 'Ponto e vírgula (;)'),
+    )
+    CODIFICACOES = (
+        ('utf-8-sig', 'UTF-8'),
+        ('cp1252', 'Windows (ANSI / Latin-1)'),
+    )
+
+    arquivo = forms.FileField(
+        label='Arquivo CSV',
+        help_text='Colunas: nome_completo, cpf, email, celular e data_nascimento (opcional).'
+    )
+
+    delimitador = forms.ChoiceField(
+        choices=DELIMITADORES,
+        initial=',',
+        label='Separador'
+    )
+
+    codificacao = forms.ChoiceField(
+        choices=CODIFICACOES,
+        initial='utf-8-sig',
+        label='Codificação',
+        help_text='Planilhas salvas como CSV pelo Excel no Windows costumam usar a codificação Windows.'
+    )
+
+
+class FechamentoAgendamentosForm(forms.Form):
+    """
+    Formulário para o fechamento dos dias encerrados: altera o status de todos os agendamentos que ainda estão como
+    'Agendado' até a data informada.
+    """
+    STATUS = (
+        (StatusAgendamento.CONCLUIDO, StatusAgendamento.CONCLUIDO.label),
+        (StatusAgendamento.CANCELADO, StatusAgendamento.CANCELADO.label),
+    )
+
+    ate = forms.DateField(
+        label='Fechar até o dia',
+        widget=forms.DateInput(attrs={'type': 'date'}, format='%Y-%m-%d')
+    )
+
+    status = forms.ChoiceField(
+        choices=STATUS,
+        initial=StatusAgendamento.CONCLUIDO,
+        label='Marcar como'
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['ate'].initial = timezone.localdate() - datetime.timedelta(days=1)
+
+    def clean_ate(self):
+        ate = self.cleaned_data['ate']
+        if ate >= timezone.localdate():
+            raise forms.ValidationError('Só é possível fechar dias anteriores a hoje.')
+        return ate
+
+
+class ListaEsperaAdminForm(forms.ModelForm):
+    """
+    Formulário para o admin da lista de espera. Usa autocomplete para o cliente e para o serviço e confere a janela de
+    horários e, quando um funcionário é escolhido, se ele realiza o serviço.
+    """
+    cliente = forms.ModelChoiceField(
+        queryset=Cliente.objects.all(),
+        widget=autocomplete.ModelSelect2(
+            url=reverse_lazy('agendamento:cliente-autocomplete'),
+            attrs={'data-placeholder': 'Busque pelo nome ou CPF'}
+        )
+    )
+
+    servico = forms.ModelChoiceField(
+        queryset=Servico.objects.all(),
+        label='Serviço',
+        widget=autocomplete.ModelSelect2(
+            url=reverse_lazy('agendamento:servico-autocomplete'),
+            forward=['funcionario'],
+            attrs={'data-placeholder': 'Busque pelo nome do serviço'}
+        )
+    )
+
+    funcionario = forms.ModelChoiceField(
+        queryset=Funcionario.objects.select_related('pessoa').order_by('pessoa__nome_completo'),
+        label='Funcionário',
+        required=False,
+        help_text='Deixe em branco para aceitar qualquer funcionário que realize o serviço.'
+    )
+
+    class Meta:
+        model = ListaEspera
+        fields = ('cliente', 'servico', 'funcionario', 'inicio', 'fim', 'prioridade')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        inicio, fim = cleaned_data.get('inicio'), cleaned_data.get('fim')
+        if inicio and fim and fim <= inicio:
+            self.add_error('fim', 'O fim da janela deve ser posterior ao início.')
+        if fim and fim <= timezone.now():
+            self.add_error('fim', 'A janela deve terminar no futuro.')
+
+        funcionario, servico = cleaned_data.get('funcionario'), cleaned_data.get('servico')
+        if funcionario and servico and servico.pk not in servicos_por_funcionario().get(funcionario.pk, ()):
+            self.add_error('funcionario', 'Este funcionário não realiza o serviço escolhido.')
+        return cleaned_data
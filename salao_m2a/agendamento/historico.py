@@ -0,0 +1,133 @@
+"""
+Histórico das mudanças de status dos agendamentos (TransicaoStatus).
+
+O agendamento guarda apenas o status atual. O histórico só recebe inserções: cada mudança gera uma linha com o id do
+agendamento, o status anterior e o novo (como códigos de CodigoStatus), o usuário e o momento. As linhas são gravadas
+em massa, na mesma transação da mudança:
+
+- no save() de um Agendamento, pelo sinal registrado em 'signals';
+- nas alterações em massa ('transicoes.transicionar_lote', usado pelas ações do admin e pelo fechamento) e nas
+  reservas recorrentes ('reservas.reservar_recorrente'), que chamam 'registrar_transicoes'. Outras operações em massa
+  que alterem o status devem fazer o mesmo.
+
+O usuário é o da requisição em andamento, informado pelo middleware 'identificar_usuario'; comandos gravam sem
+usuário. Com o histórico é possível saber o status de cada agendamento em qualquer momento passado
+('ids_com_status_em', usado pelo relatório "na posição de" uma data) e refazer os derivados a partir dele
+('reproduzir_historico' e o comando 'reproduzir_historico_status').
+
+A última transição de cada agendamento até um momento é a de maior id: as transições de um mesmo agendamento são
+gravadas em ordem, já que cada mudança trava a linha do agendamento até o fim da transação.
+"""
+
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+from .choices import CodigoStatus, StatusAgendamento
+from .models import TransicaoStatus
+
+_usuario_atual = ContextVar('usuario_atual', default=None)
+
+
+def codigo_status(status):
+    return None if status is None else CodigoStatus[status].value
+
+
+def status_do_codigo(codigo):
+    return StatusAgendamento(CodigoStatus(codigo).name)
+
+
+def usuario_atual_id():
+    """Retorna o id do usuário autenticado da requisição em andamento, ou None fora de uma requisição."""
+
+    usuario = _usuario_atual.get()
+    if usuario is None or not usuario.is_authenticated:
+        return None
+    return usuario.pk
+
+
+def registrar_transicoes(transicoes, momento=None):
+    """
+    Grava no histórico as transições informadas, como tuplas (id do agendamento, status anterior, novo status); o
+    status anterior é None na criação. Retorna a quantidade gravada.
+    """
+
+    momento = momento or timezone.now()
+    usuario_id = usuario_atual_id()
+    linhas = [
+        TransicaoStatus(
+            agendamento_id=agendamento_id,
+            de=codigo_status(anterior),
+            para=codigo_status(novo),
+            usuario_id=usuario_id,
+            momento=momento
+        )
+        for agendamento_id, anterior, novo in transicoes
+    ]
+    TransicaoStatus.objects.bulk_create(linhas, batch_size=1000)
+    return len(linhas)
+
+
+def ultimas_transicoes(momento):
+    """Retorna os ids da última transição de cada agendamento até o momento informado (inclusive), como subconsulta."""
+
+    return TransicaoStatus.objects.filter(
+        momento__lte=momento
+    ).values('agendamento_id').annotate(ultima=Max('pk')).values('ultima')
+
+
+def ids_com_status_em(momento, status):
+    """
+    Retorna, como subconsulta, os ids dos agendamentos (inclusive os já arquivados ou excluídos) cujo status no momento
+    informado era 'status'.
+    """
+
+    return TransicaoStatus.objects.filter(
+        pk__in=ultimas_transicoes(momento),
+        para=codigo_status(status)
+    ).values('agendamento_id')
+
+
+def reproduzir_historico(ate=None, tamanho_lote=5000):
+    """
+    Percorre o histórico em ordem, até o momento 'ate' (inclusive) quando informado, e retorna {id do agendamento:
+    status} com o status de cada agendamento ao final.
+    """
+
+    transicoes = TransicaoStatus.objects.order_by('pk')
+    if ate is not None:
+        transicoes = transicoes.filter(momento__lte=ate)
+
+    estado = {}
+    for agendamento_id, para in transicoes.values_list('agendamento_id', 'para').iterator(chunk_size=tamanho_lote):
+        estado[agendamento_id] = para
+
+    return {agendamento_id: status_do_codigo(para) for agendamento_id, para in estado.items()}
+
+
+@sync_and_async_middleware
+def identificar_usuario(get_response):
+    """
+    Middleware que torna o usuário da requisição disponível para o histórico de status durante a requisição. O
+    usuário só é carregado se alguma transição for gravada.
+    """
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _usuario_atual.set(request.user)
+            try:
+                return await get_response(request)
+            finally:
+                _usuario_atual.reset(token)
+    else:
+        def middleware(request):
+            token = _usuario_atual.set(request.user)
+            try:
+                return get_response(request)
+            finally:
+                _usuario_atual.reset(token)
+
+    return middleware
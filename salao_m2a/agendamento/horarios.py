@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import DataHorario
+
+
+def horarios_do_dia(dia):
+    """
+    Retorna os horários de atendimento de um dia, em intervalos de 30 minutos: das 8h às 19h de segunda a sábado e
+    das 9h às 15h aos domingos.
+    """
+
+    if dia.weekday() < 6:  # Segunda a Sábado (0-5)
+        start_hour, end_hour = 8, 19
+    else:  # Domingo (6)
+        start_hour, end_hour = 9, 15
+
+    return [
+        timezone.make_aware(datetime(dia.year, dia.month, dia.day, hour, minute))
+        for hour in range(start_hour, end_hour)
+        for minute in [0, 30]
+    ]
+
+
+def garantir_horarios(data_inicial, data_final, tamanho_lote=1000):
+    """
+    Cria os horários de atendimento que estiverem faltando entre as duas datas (inclusive) e retorna quantos foram
+    criados. Os horários já cadastrados, ativos ou não, são lidos em uma única consulta e nunca são reescritos; a
+    restrição de unicidade em 'data_horario' torna a operação segura mesmo com duas execuções simultâneas.
+    """
+
+    inicio = timezone.make_aware(datetime.combine(data_inicial, datetime.min.time()))
+    fim = timezone.make_aware(datetime.combine(data_final + timedelta(days=1), datetime.min.time()))
+
+    existentes = set(DataHorario.objects.filter(
+        data_horario__gte=inicio,
+        data_horario__lt=fim
+    ).values_list('data_horario', flat=True))
+
+    faltantes = []
+    dia = data_inicial
+    while dia <= data_final:
+        faltantes.extend(
+            DataHorario(data_horario=horario)
+            for horario in horarios_do_dia(dia)
+            if horario not in existentes
+        )
+        dia += timedelta(days=1)
+
+    DataHorario.objects.bulk_create(faltantes, batch_size=tamanho_lote, ignore_conflicts=True)
+
+    return len(faltantes)
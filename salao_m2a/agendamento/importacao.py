@@ -0,0 +1,218 @@
+import csv
+import datetime
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import Pessoa, Cliente
+
+COLUNAS_OBRIGATORIAS = ('nome_completo', 'cpf', 'email', 'celular')
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d')
+LIMITE_ERROS_GUARDADOS = 1000
+
+
+class ResultadoImportacao:
+    """
+    Acumula o resultado de uma importação: linhas lidas, clientes criados, erros por linha e tempo decorrido. Guarda
+    no máximo LIMITE_ERROS_GUARDADOS mensagens de erro para manter o consumo de memória limitado.
+    """
+
+    def __init__(self):
+        self.linhas_lidas = 0
+        self.criados = 0
+        self.total_erros = 0
+        self.erros = []
+        self.inicio = time.perf_counter()
+        self.fim = None
+
+    def adicionar_erro(self, linha, mensagem):
+        self.total_erros += 1
+        if len(self.erros) < LIMITE_ERROS_GUARDADOS:
+            self.erros.append((linha, mensagem))
+
+    @property
+    def tempo_decorrido(self):
+        return (self.fim or time.perf_counter()) - self.inicio
+
+    @property
+    def linhas_por_segundo(self):
+        tempo = self.tempo_decorrido
+        return self.linhas_lidas / tempo if tempo else 0
+
+
+def importar_clientes_csv(arquivo, tamanho_lote=1000, delimitador=',', ao_processar_lote=None):
+    """
+    Lê um CSV (com as colunas nome_completo, cpf, email, celular e, opcionalmente, data_nascimento) de forma
+    contínua, sem carregá-lo inteiro na memória, e cria Pessoa + Cliente para cada linha válida em lotes.
+
+    Cada lote é validado com os mesmos validadores do modelo Pessoa, tem a unicidade de CPF e e-mail conferida contra
+    o banco em uma consulta por campo e é gravado com 'bulk_create' em uma transação. A função opcional
+    'ao_processar_lote' recebe o resultado parcial ao fim de cada lote, permitindo exibir o progresso.
+
+    Se o arquivo não puder ser lido (codificação diferente da informada ao abri-lo ou CSV malformado), a importação
+    para nesse ponto: as linhas já lidas são gravadas e o problema é registrado como erro da linha seguinte.
+    """
+
+    resultado = ResultadoImportacao()
+    leitor = csv.DictReader(arquivo, delimiter=delimitador)
+
+    try:
+        cabecalho = leitor.fieldnames or ()
+    except (UnicodeDecodeError, csv.Error) as erro:
+        resultado.adicionar_erro(1, _mensagem_erro_leitura(erro))
+        resultado.fim = time.perf_counter()
+        return resultado
+
+    faltantes = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in cabecalho]
+    if faltantes:
+        resultado.adicionar_erro(1, f"Colunas obrigatórias ausentes no cabeçalho: {', '.join(faltantes)}.")
+        resultado.fim = time.perf_counter()
+        return resultado
+
+    cpfs_vistos = set()
+    emails_vistos = set()
+    linhas = enumerate(leitor, start=2)
+    erro_leitura = None
+
+    while erro_leitura is None:
+        # As linhas lidas antes de um erro de leitura ainda são processadas
+        lote = []
+        try:
+            for linha in islice(linhas, tamanho_lote):
+                lote.append(linha)
+        except (UnicodeDecodeError, csv.Error) as erro:
+            erro_leitura = erro
+        if not lote:
+            break
+
+        resultado.linhas_lidas += len(lote)
+        _processar_lote(lote, resultado, cpfs_vistos, emails_vistos)
+
+        if ao_processar_lote:
+            ao_processar_lote(resultado)
+
+    if erro_leitura is not None:
+        resultado.adicionar_erro(resultado.linhas_lidas + 2, _mensagem_erro_leitura(erro_leitura))
+
+    resultado.fim = time.perf_counter()
+    return resultado
+
+
+def _mensagem_erro_leitura(erro):
+    if isinstance(erro, UnicodeDecodeError):
+        return (
+            f"Importação interrompida: o arquivo não está na codificação {erro.encoding}. Salve-o em UTF-8 ou "
+            "escolha a codificação correta."
+        )
+    return f"Importação interrompida: CSV malformado ({erro})."
+
+
+def _validar_linha(dados):
+    """Valida e normaliza uma linha do CSV, retornando uma Pessoa não salva ou lançando ValidationError."""
+
+    valores = {campo: (dados.get(campo) or '').strip() for campo in COLUNAS_OBRIGATORIAS}
+
+    vazios = [campo for campo, valor in valores.items() if not valor]
+    if vazios:
+        raise ValidationError(f"Campo(s) obrigatório(s) vazio(s): {', '.join(vazios)}.")
+
+    if len(valores['nome_completo']) > Pessoa._meta.get_field('nome_completo').max_length:
+        raise ValidationError("Nome completo excede o tamanho máximo permitido.")
+
+    Pessoa.validador_cpf(valores['cpf'])
+    Pessoa.validador_celular(valores['celular'])
+    validate_email(valores['email'])
+
+    data_nascimento = None
+    texto_data = (dados.get('data_nascimento') or '').strip()
+    if texto_data:
+        for formato in FORMATOS_DATA:
+            try:
+                data_nascimento = datetime.datetime.strptime(texto_data, formato).date()
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValidationError("Data de nascimento deve estar no formato DD/MM/AAAA.")
+
+    return Pessoa(data_nascimento=data_nascimento, **valores)
+
+
+def _processar_lote(lote, resultado, cpfs_vistos, emails_vistos):
+    """Valida as linhas do lote, descarta duplicidades (no arquivo e no banco) e grava as restantes."""
+
+    candidatas = []
+    for numero_linha, dados in lote:
+        try:
+            pessoa = _validar_linha(dados)
+        except ValidationError as erro:
+            resultado.adicionar_erro(numero_linha, " ".join(erro.messages))
+            continue
+
+        if pessoa.cpf in cpfs_vistos:
+            resultado.adicionar_erro(numero_linha, f"CPF {pessoa.cpf} repetido no arquivo.")
+            continue
+        if pessoa.email in emails_vistos:
+            resultado.adicionar_erro(numero_linha, f"E-mail {pessoa.email} repetido no arquivo.")
+            continue
+
+        cpfs_vistos.add(pessoa.cpf)
+        emails_vistos.add(pessoa.email)
+        candidatas.append((numero_linha, pessoa))
+
+    if not candidatas:
+        return
+
+    cpfs_existentes = set(Pessoa.objects.filter(
+        cpf__in=[pessoa.cpf for _, pessoa in candidatas]
+    ).values_list('cpf', flat=True))
+    emails_existentes = set(Pessoa.objects.filter(
+        email__in=[pessoa.email for _, pessoa in candidatas]
+    ).values_list('email', flat=True))
+
+    pessoas = []
+    for numero_linha, pessoa in candidatas:
+        if pessoa.cpf in cpfs_existentes:
+            resultado.adicionar_erro(numero_linha, f"CPF {pessoa.cpf} já cadastrado.")
+        elif pessoa.email in emails_existentes:
+            resultado.adicionar_erro(numero_linha, f"E-mail {pessoa.email} já cadastrado.")
+        else:
+            pessoas.append((numero_linha, pessoa))
+
+    if not pessoas:
+        return
+
+    try:
+        with transaction.atomic():
+            Pessoa.objects.bulk_create([pessoa for _, pessoa in pessoas])
+            Cliente.objects.bulk_create([Cliente(pessoa=pessoa) for _, pessoa in pessoas])
+    except IntegrityError:
+        # Um registro gravado por outro processo depois da conferência acima derruba o lote inteiro; as linhas são
+        # então gravadas uma a uma, para identificar as que conflitam e manter as demais
+        _gravar_linha_a_linha(pessoas, resultado)
+        return
+
+    resultado.criados += len(pessoas)
+
+
+def _gravar_linha_a_linha(pessoas, resultado):
+    """Grava cada linha em sua própria transação, registrando como erro as que conflitam com o banco."""
+
+    for numero_linha, pessoa in pessoas:
+        # O bulk_create desfeito pode ter preenchido a chave primária
+        pessoa.pk = None
+        pessoa._state.adding = True
+        try:
+            with transaction.atomic():
+                pessoa.save()
+                Cliente.objects.create(pessoa=pessoa)
+        except IntegrityError as erro:
+            resultado.adicionar_erro(
+                numero_linha,
+                f"Conflito no banco ao gravar o CPF {pessoa.cpf} / e-mail {pessoa.email}: {erro}"
+            )
+        else:
+            resultado.criados += 1
@@ -0,0 +1,94 @@
+"""
+Manutenção dos indicadores acumulados de cada Cliente (valor vitalício, visitas, última visita e valor agendado em
+horários futuros). Os indicadores são recalculados apenas para os clientes afetados por uma alteração, com algumas consultas
+agrupadas por lote de clientes, e somente as linhas que mudaram são gravadas.
+
+O save() de um Agendamento atualiza o cliente pelo sinal registrado em 'signals'. Operações em massa que não passam
+pelo save() (QuerySet.update, bulk_create, exclusões) devem chamar 'atualizar_indicadores_clientes' com os clientes
+afetados. O comando 'recalcular_indicadores_clientes' refaz tudo a partir dos agendamentos.
+"""
+
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .choices import StatusAgendamento
+from .models import Agendamento, AgendamentoArquivado, Cliente
+
+CAMPOS_INDICADORES = ('valor_vitalicio', 'total_visitas', 'ultima_visita', 'valor_agendado_futuro')
+
+
+def calcular_indicadores(cliente_ids):
+    """
+    Retorna um dicionário {id do cliente: (valor_vitalicio, total_visitas, ultima_visita, valor_agendado_futuro)}
+    para os clientes informados. As visitas concluídas incluem os agendamentos arquivados.
+
+    O valor agendado soma apenas os agendamentos com status Agendado em horários que ainda não passaram. Como os
+    indicadores só são recalculados quando um agendamento do cliente muda, o valor não diminui sozinho quando o horário
+    passa: um agendamento vencido sem mudança de status continua contado até o próximo recálculo do cliente (por
+    exemplo, pelo comando 'recalcular_indicadores_clientes').
+    """
+
+    indicadores = {cliente_id: [0, 0, None, 0] for cliente_id in cliente_ids}
+
+    concluidos = Agendamento.ativos.filter(
+        cliente_id__in=cliente_ids,
+        status=StatusAgendamento.CONCLUIDO
+    ).values('cliente_id').annotate(
+        valor=Sum('valor_total'),
+        visitas=Count('id'),
+        ultima=Max('servico_funcionario_horario__data_horario__data_horario')
+    ).order_by()
+
+    arquivados = AgendamentoArquivado.objects.filter(
+        cliente_id__in=cliente_ids,
+        status=StatusAgendamento.CONCLUIDO
+    ).values('cliente_id').annotate(
+        valor=Sum('valor_total'),
+        visitas=Count('id'),
+        ultima=Max('data_horario')
+    ).order_by()
+
+    for linha in [*concluidos, *arquivados]:
+        atual = indicadores[linha['cliente_id']]
+        atual[0] += linha['valor'] or 0
+        atual[1] += linha['visitas']
+        if atual[2] is None or (linha['ultima'] is not None and linha['ultima'] > atual[2]):
+            atual[2] = linha['ultima']
+
+    agendados = Agendamento.ativos.filter(
+        cliente_id__in=cliente_ids,
+        status=StatusAgendamento.AGENDADO,
+        servico_funcionario_horario__data_horario__data_horario__gte=timezone.now()
+    ).values('cliente_id').annotate(valor=Sum('valor_total')).order_by()
+
+    for linha in agendados:
+        indicadores[linha['cliente_id']][3] = linha['valor'] or 0
+
+    return {cliente_id: tuple(valores) for cliente_id, valores in indicadores.items()}
+
+
+def atualizar_indicadores_clientes(cliente_ids, tamanho_lote=500):
+    """
+    Recalcula os indicadores dos clientes informados, em lotes, gravando apenas os que mudaram. Retorna a quantidade de
+    clientes atualizados.
+    """
+
+    cliente_ids = sorted({cliente_id for cliente_id in cliente_ids if cliente_id is not None})
+    atualizados = 0
+
+    for inicio in range(0, len(cliente_ids), tamanho_lote):
+        lote = cliente_ids[inicio:inicio + tamanho_lote]
+        indicadores = calcular_indicadores(lote)
+
+        alterados = []
+        for cliente in Cliente.objects.filter(pk__in=lote).only('pk', *CAMPOS_INDICADORES):
+            novos = indicadores[cliente.pk]
+            if tuple(getattr(cliente, campo) for campo in CAMPOS_INDICADORES) != novos:
+                for campo, valor in zip(CAMPOS_INDICADORES, novos):
+                    setattr(cliente, campo, valor)
+                alterados.append(cliente)
+
+        Cliente.objects.bulk_update(alterados, CAMPOS_INDICADORES)
+        atualizados += len(alterados)
+
+    return atualizados
@@ -0,0 +1,265 @@
+"""
+Lista de espera (ListaEspera) e reaproveitamento das vagas liberadas por cancelamentos.
+
+O agendamento cancelado continua ocupando a sua vaga. Quando agendamentos futuros são cancelados, pelas alterações em
+massa ('transicoes.transicionar_lote') ou pelo save(), através do sinal registrado em 'signals', 'ofertar_vagas'
+oferece cada vaga ao melhor pedido compatível: mesmo serviço, mesmo funcionário (quando o pedido indica um) e horário
+dentro da janela do pedido. Os pedidos são percorridos por prioridade e, entre iguais, por ordem de chegada, a mesma
+ordem do índice parcial 'espera_fila_idx'; cada pedido recebe no máximo uma vaga e cada vaga, uma oferta.
+
+Um cancelamento em massa é tratado de uma vez: as vagas (travadas), os seus serviços e os pedidos candidatos são lidos
+em quatro consultas, o casamento é feito na memória e as ofertas são gravadas com um único 'bulk_update', qualquer que
+seja a quantidade de vagas. A confirmação das ofertas também é feita em conjunto.
+
+A oferta vale por LISTA_ESPERA_VALIDADE_OFERTA_HORAS. Confirmada ('confirmar_ofertas'), o agendamento cancelado vai para
+a tabela de arquivo, liberando a vaga, e o cliente do pedido é agendado nela. Recusada ou vencida ('recusar_ofertas',
+'expirar_ofertas'), a vaga é ofertada ao próximo da fila.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .choices import SituacaoEspera, StatusAgendamento
+from .historico import registrar_transicoes
+from .indicadores import atualizar_indicadores_clientes
+from .models import Agendamento, AgendamentoArquivado, ListaEspera, ServicoFuncionarioHorario
+
+
+def vagas_canceladas_sem_oferta(agora=None):
+    """Retorna as vagas futuras ocupadas por agendamentos cancelados e sem oferta em aberto."""
+
+    return ServicoFuncionarioHorario.ativos.filter(
+        data_horario__data_horario__gt=agora or timezone.now(),
+        agendamento__status=StatusAgendamento.CANCELADO
+    ).exclude(Exists(ListaEspera.ativos.filter(
+        vaga_ofertada=OuterRef('pk'),
+        situacao=SituacaoEspera.OFERTADO
+    )))
+
+
+def ofertar_vagas(vagas_ids, agora=None):
+    """
+    Oferece as vagas informadas (ids ou subconsulta de ids) aos pedidos da lista de espera e retorna a quantidade de
+    ofertas feitas. São consideradas apenas as vagas futuras ainda ocupadas por um agendamento cancelado e sem oferta em
+    aberto; o cliente do agendamento cancelado não recebe a própria vaga.
+    """
+
+    agora = agora or timezone.now()
+    with transaction.atomic():
+        # As vagas ficam travadas até o fim da transação, de modo que dois cancelamentos ou um cancelamento e o comando
+        # 'processar_lista_espera' não ofertem a mesma vaga ao mesmo tempo. A busca pelas ofertas em aberto vem em uma
+        # consulta separada, feita depois da trava, para enxergar as ofertas gravadas por quem a tinha antes
+        travadas = list(ServicoFuncionarioHorario.objects.select_for_update().filter(
+            pk__in=vagas_ids
+        ).order_by('pk').values_list('pk', flat=True))
+        vagas = {
+            pk: (funcionario_id, horario, cliente_id)
+            for pk, funcionario_id, horario, cliente_id in vagas_canceladas_sem_oferta(agora).filter(
+                pk__in=travadas
+            ).values_list('pk', 'funcionario_id', 'data_horario__data_horario', 'agendamento__cliente_id')
+        }
+        if not vagas:
+            return 0
+
+        # Vagas de cada serviço, das mais próximas às mais distantes
+        vagas_por_servico = {}
+        for vaga_id, servico_id in ServicoFuncionarioHorario.servico.through.objects.filter(
+            servicofuncionariohorario_id__in=vagas
+        ).values_list('servicofuncionariohorario_id', 'servico_id'):
+            vagas_por_servico.setdefault(servico_id, []).append(vaga_id)
+        for ids in vagas_por_servico.values():
+            ids.sort(key=lambda vaga_id: vagas[vaga_id][1])
+
+        horarios = [horario for _, horario, _ in vagas.values()]
+        # Em bancos com SELECT ... FOR UPDATE, os pedidos sendo ofertados por outro cancelamento simultâneo são pulados
+        pedidos = ListaEspera.ativos.select_for_update(skip_locked=True).filter(
+            situacao=SituacaoEspera.AGUARDANDO,
+            servico_id__in=vagas_por_servico,
+            inicio__lte=max(horarios),
+            fim__gte=min(horarios)
+        ).order_by('-prioridade', 'data_cadastro', 'pk').values_list(
+            'pk', 'cliente_id', 'servico_id', 'funcionario_id', 'inicio', 'fim'
+        )
+
+        validade = agora + datetime.timedelta(hours=settings.LISTA_ESPERA_VALIDADE_OFERTA_HORAS)
+        ofertas = []
+        ofertadas = set()
+        clientes = set()
+        for pk, cliente_id, servico_id, funcionario_id, inicio, fim in pedidos:
+            if cliente_id in clientes:
+                continue
+            for vaga_id in vagas_por_servico[servico_id]:
+                vaga_funcionario_id, horario, cliente_cancelado_id = vagas[vaga_id]
+                if vaga_id in ofertadas or cliente_id == cliente_cancelado_id or not inicio <= horario <= fim:
+                    continue
+                if funcionario_id is not None and funcionario_id != vaga_funcionario_id:
+                    continue
+
+                ofertas.append(ListaEspera(
+                    pk=pk,
+                    situacao=SituacaoEspera.OFERTADO,
+                    vaga_ofertada_id=vaga_id,
+                    oferta_expira_em=min(validade, horario),
+                    data_atualizacao=agora
+                ))
+                ofertadas.add(vaga_id)
+                clientes.add(cliente_id)
+                break
+
+            if len(ofertadas) == len(vagas):
+                break
+
+        ListaEspera.objects.bulk_update(
+            ofertas,
+            ['situacao', 'vaga_ofertada', 'oferta_expira_em', 'data_atualizacao'],
+            batch_size=500
+        )
+
+    return len(ofertas)
+
+
+def _arquivar_cancelados(agendamentos_ids):
+    """
+    Copia os agendamentos cancelados informados para a tabela de arquivo e os remove, liberando as suas vagas, como faz
+    o comando 'arquivar_agendamentos' (que também remove as vagas, o que aqui não se aplica).
+    """
+
+    linhas = list(Agendamento.objects.filter(pk__in=agendamentos_ids).values_list(
+        'pk',
+        'cliente_id',
+        'servico_funcionario_horario_id',
+        'servico_funcionario_horario__funcionario_id',
+        'servico_funcionario_horario__data_horario__data_horario',
+        'valor_total',
+        'status'
+    ))
+
+    servicos = {}
+    for vaga_id, nome in ServicoFuncionarioHorario.servico.through.objects.filter(
+        servicofuncionariohorario_id__in=[vaga_id for _, _, vaga_id, *_ in linhas]
+    ).values_list('servicofuncionariohorario_id', 'servico__nome_servico'):
+        servicos.setdefault(vaga_id, []).append(nome)
+
+    AgendamentoArquivado.objects.bulk_create([
+        AgendamentoArquivado(
+            id_original=pk,
+            cliente_id=cliente_id,
+            funcionario_id=funcionario_id,
+            data_horario=horario,
+            servicos=", ".join(servicos.get(vaga_id, []))[:500],
+            valor_total=valor_total,
+            status=status
+        )
+        for pk, cliente_id, vaga_id, funcionario_id, horario, valor_total, status in linhas
+    ])
+    Agendamento.objects.filter(pk__in=agendamentos_ids).delete()
+    return [cliente_id for _, cliente_id, *_ in linhas]
+
+
+def confirmar_ofertas(pedidos_ids, agora=None):
+    """
+    Agenda os clientes dos pedidos informados nas vagas que lhes foram ofertadas e retorna os agendamentos criados.
+    Ofertas vencidas são ignoradas; as de vagas que deixaram de estar canceladas, ou que já ficaram com outro pedido,
+    são encerradas como expiradas.
+    """
+
+    agora = agora or timezone.now()
+    with transaction.atomic():
+        pedidos = list(ListaEspera.ativos.select_for_update().filter(
+            pk__in=pedidos_ids,
+            situacao=SituacaoEspera.OFERTADO,
+            oferta_expira_em__gt=agora
+        ).order_by('-prioridade', 'data_cadastro', 'pk').values_list('pk', 'cliente_id', 'vaga_ofertada_id'))
+
+        canceladas = dict(Agendamento.objects.select_for_update().filter(
+            servico_funcionario_horario_id__in=[vaga_id for _, _, vaga_id in pedidos],
+            status=StatusAgendamento.CANCELADO
+        ).values_list('servico_funcionario_horario_id', 'pk'))
+
+        # Cada vaga recebe um único agendamento: se ela tiver sido ofertada a mais de um pedido, vale o primeiro da fila
+        invalidos = []
+        validos = {}
+        for pk, cliente_id, vaga_id in pedidos:
+            if vaga_id in canceladas and vaga_id not in validos:
+                validos[vaga_id] = (pk, cliente_id, vaga_id)
+            else:
+                invalidos.append(pk)
+        pedidos = list(validos.values())
+        canceladas = {vaga_id: canceladas[vaga_id] for vaga_id in validos}
+
+        clientes_ids = _arquivar_cancelados(list(canceladas.values()))
+
+        # O bulk_create não chama o save() do modelo, então o valor de cada vaga é calculado aqui, em uma consulta
+        valores = ServicoFuncionarioHorario.valores_totais(list(canceladas))
+        agendamentos = Agendamento.objects.bulk_create([
+            Agendamento(
+                cliente_id=cliente_id,
+                servico_funcionario_horario_id=vaga_id,
+                status=StatusAgendamento.AGENDADO,
+                valor_total=valores.get(vaga_id) or 0
+            ) for _, cliente_id, vaga_id in pedidos
+        ])
+        registrar_transicoes((agendamento.pk, None, agendamento.status) for agendamento in agendamentos)
+
+        ListaEspera.objects.filter(pk__in=[pk for pk, _, _ in pedidos]).update(
+            situacao=SituacaoEspera.ATENDIDO,
+            data_atualizacao=agora
+        )
+        ListaEspera.objects.filter(pk__in=invalidos).update(
+            situacao=SituacaoEspera.EXPIRADO,
+            data_atualizacao=agora
+        )
+        atualizar_indicadores_clientes(clientes_ids + [cliente_id for _, cliente_id, _ in pedidos])
+
+    return agendamentos
+
+
+def _encerrar_ofertas(pedidos, situacao, agora):
+    """Encerra as ofertas dos pedidos com a situação informada e oferece as vagas liberadas ao próximo da fila."""
+
+    with transaction.atomic():
+        encerrados = list(pedidos.select_for_update().values_list('pk', 'vaga_ofertada_id'))
+        ListaEspera.objects.filter(pk__in=[pk for pk, _ in encerrados]).update(
+            situacao=situacao,
+            data_atualizacao=agora
+        )
+        ofertadas = ofertar_vagas([vaga_id for _, vaga_id in encerrados if vaga_id], agora)
+
+    return len(encerrados), ofertadas
+
+
+def recusar_ofertas(pedidos_ids, agora=None):
+    """
+    Encerra como recusadas as ofertas dos pedidos informados e oferece as vagas ao próximo da fila. Retorna (pedidos
+    encerrados, novas ofertas).
+    """
+
+    agora = agora or timezone.now()
+    return _encerrar_ofertas(
+        ListaEspera.ativos.filter(pk__in=pedidos_ids, situacao=SituacaoEspera.OFERTADO),
+        SituacaoEspera.RECUSADO,
+        agora
+    )
+
+
+def expirar_ofertas(agora=None):
+    """
+    Encerra as ofertas vencidas e oferece as vagas ao próximo da fila, e encerra os pedidos aguardando cuja janela já
+    passou. Retorna (ofertas vencidas, novas ofertas, pedidos encerrados).
+    """
+
+    agora = agora or timezone.now()
+    vencidas, ofertadas = _encerrar_ofertas(
+        ListaEspera.ativos.filter(situacao=SituacaoEspera.OFERTADO, oferta_expira_em__lte=agora),
+        SituacaoEspera.EXPIRADO,
+        agora
+    )
+    encerrados = ListaEspera.ativos.filter(situacao=SituacaoEspera.AGUARDANDO, fim__lt=agora).update(
+        situacao=SituacaoEspera.EXPIRADO,
+        data_atualizacao=agora
+    )
+    return vencidas, ofertadas, encerrados
@@ -0,0 +1,147 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from agendamento.choices import StatusAgendamento
+from agendamento.models import (
+    DataHorario,
+    ServicoFuncionarioHorario,
+    Agendamento,
+    AgendamentoArquivado,
+)
+
+
+class Command(BaseCommand):
+    """
+    Move agendamentos encerrados e antigos para a tabela de arquivo e remove vagas e horários passados que não foram
+    utilizados, mantendo as tabelas consultadas no dia a dia com tamanho limitado.
+    """
+
+    help = 'Arquiva agendamentos encerrados e remove vagas e horários passados sem uso.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=30,
+            help='Idade mínima, em dias, do horário para que o registro seja arquivado ou removido (padrão: 30).'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Quantidade de registros processados por transação (padrão: 1000).'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Apenas informa quantos registros seriam afetados, sem alterar o banco.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Executa, nesta ordem, o arquivamento dos agendamentos, a remoção das vagas sem
+        agendamento e a remoção dos horários sem vagas, todos anteriores à data de corte.
+        """
+        data_corte = timezone.now() - timedelta(days=options['dias'])
+        lote = options['lote']
+
+        agendamentos = Agendamento.ativos.filter(
+            status__in=[StatusAgendamento.CONCLUIDO, StatusAgendamento.CANCELADO],
+            servico_funcionario_horario__data_horario__data_horario__lt=data_corte
+        )
+        vagas = ServicoFuncionarioHorario.objects.filter(
+            data_horario__data_horario__lt=data_corte,
+            agendamento__isnull=True
+        )
+        horarios = DataHorario.objects.filter(
+            data_horario__lt=data_corte,
+            servicofuncionariohorario__isnull=True
+        )
+
+        self.stdout.write(f"Data de corte: {timezone.localtime(data_corte):%d/%m/%Y %H:%M}")
+
+        if options['simular']:
+            self.stdout.write(f"{agendamentos.count()} agendamento(s) seriam arquivados.")
+            self.stdout.write(f"{vagas.count()} vaga(s) sem agendamento seriam removidas.")
+            self.stdout.write(f"{horarios.count()} horário(s) sem vagas seriam removidos.")
+            return
+
+        total_arquivados = self._arquivar_agendamentos(agendamentos, lote)
+        self.stdout.write(f"{total_arquivados} agendamento(s) arquivados.")
+
+        total_vagas = self._remover_em_lotes(vagas, lote, self._remover_vagas)
+        self.stdout.write(f"{total_vagas} vaga(s) sem agendamento removidas.")
+
+        total_horarios = self._remover_em_lotes(
+            horarios,
+            lote,
+            lambda ids: DataHorario.objects.filter(pk__in=ids).delete()
+        )
+        self.stdout.write(f"{total_horarios} horário(s) sem vagas removidos.")
+
+        self.stdout.write(self.style.SUCCESS('Arquivamento concluído com sucesso!'))
+
+    def _arquivar_agendamentos(self, queryset, lote):
+        """
+        Copia os agendamentos para a tabela de arquivo, com o valor registrado no agendamento e os serviços da vaga no
+        momento do arquivamento, e em seguida remove o agendamento e a sua vaga. Cada lote é processado em uma transação.
+        """
+        total = 0
+
+        while True:
+            with transaction.atomic():
+                agendamentos = list(
+                    queryset.select_related(
+                        'servico_funcionario_horario__data_horario'
+                    ).prefetch_related(
+                        'servico_funcionario_horario__servico'
+                    ).order_by('pk')[:lote]
+                )
+
+                if not agendamentos:
+                    return total
+
+                arquivados = []
+                vagas_ids = []
+                for agendamento in agendamentos:
+                    vaga = agendamento.servico_funcionario_horario
+                    servicos = list(vaga.servico.all())
+                    arquivados.append(AgendamentoArquivado(
+                        id_original=agendamento.pk,
+                        cliente_id=agendamento.cliente_id,
+                        funcionario_id=vaga.funcionario_id,
+                        data_horario=vaga.data_horario.data_horario,
+                        servicos=", ".join(s.nome_servico for s in servicos)[:500],
+                        valor_total=agendamento.valor_total,
+                        status=agendamento.status,
+                    ))
+                    vagas_ids.append(vaga.pk)
+
+                AgendamentoArquivado.objects.bulk_create(arquivados)
+                Agendamento.objects.filter(pk__in=[a.pk for a in agendamentos]).delete()
+                self._remover_vagas(vagas_ids)
+
+            total += len(agendamentos)
+            self.stdout.write(f"  {total} agendamento(s) arquivados até o momento...")
+
+    def _remover_vagas(self, vagas_ids):
+        """Remove as vagas informadas junto com as linhas da tabela intermediária de serviços."""
+
+        ServicoFuncionarioHorario.servico.through.objects.filter(
+            servicofuncionariohorario_id__in=vagas_ids
+        ).delete()
+        ServicoFuncionarioHorario.objects.filter(pk__in=vagas_ids).delete()
+
+    def _remover_em_lotes(self, queryset, lote, remover):
+        """Aplica a função de remoção em lotes de IDs do queryset até que ele fique vazio."""
+
+        total = 0
+        while True:
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:lote])
+            if not ids:
+                return total
+
+            with transaction.atomic():
+                remover(ids)
+            total += len(ids)
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from agendamento.desempenho import atualizar_desempenho
+
+
+class Command(BaseCommand):
+    """
+    Atualiza o agregado diário de desempenho por funcionário usado pelo painel de desempenho.
+    """
+
+    help = 'Atualiza o agregado diário de desempenho por funcionário (incremental ou completo).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Recalcula todo o histórico, em vez de apenas os dias com agendamentos alterados.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Recalcula os dias com agendamentos alterados desde a última atualização (ou todo
+        o histórico, com --completo) e exibe quantos dias foram recalculados.
+        """
+        self.stdout.write("Atualizando o agregado de desempenho...")
+        inicio = time.perf_counter()
+
+        dias = atualizar_desempenho(completo=options['completo'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{dias} dia(s) recalculados em {time.perf_counter() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,81 @@
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from agendamento.views import buscar_vagas_disponiveis
+
+
+class Command(BaseCommand):
+    """
+    Compara, sobre os dados do banco, a busca de vagas do autocomplete com a forma anterior, que juntava a vaga aos
+    seus serviços para filtrar pelo nome. Exibe as linhas devolvidas pelo banco, as vagas repetidas e o tempo de cada
+    forma, e falha se a busca atual devolver alguma vaga mais de uma vez.
+    """
+
+    help = 'Compara linhas, repetições e tempo da busca de vagas com EXISTS e com junção nos serviços.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--termos',
+            nargs='+',
+            default=['Corte', 'Escova', 'Manicure', 'Maria', 'a'],
+            help='Termos pesquisados (padrão: Corte Escova Manicure Maria a).'
+        )
+        parser.add_argument(
+            '--repeticoes',
+            type=int,
+            default=5,
+            help='Quantas vezes cada consulta é executada; é exibido o melhor tempo (padrão: 5).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Para cada termo, executa as duas formas da busca, lendo todas as vagas encontradas
+        e a primeira página do autocomplete, e confere se ambas encontram o mesmo conjunto de vagas.
+        """
+        repetidas_atual = 0
+
+        for termo in options['termos']:
+            atual = buscar_vagas_disponiveis(termo)
+            juncao = buscar_vagas_disponiveis('').filter(
+                Q(servico__nome_servico__icontains=termo) |
+                Q(funcionario__pessoa__nome_completo__icontains=termo)
+            )
+
+            medicoes = {}
+            for nome, consulta in (('junção', juncao), ('exists', atual)):
+                ids = list(consulta.values_list('pk', flat=True))
+                repetidas = sum(quantidade - 1 for quantidade in Counter(ids).values())
+                medicoes[nome] = (
+                    set(ids),
+                    len(ids),
+                    repetidas,
+                    self._medir(lambda: list(consulta.values_list('pk', flat=True)), options['repeticoes']),
+                    self._medir(lambda: list(consulta[:10]), options['repeticoes']),
+                )
+
+            if medicoes['junção'][0] != medicoes['exists'][0]:
+                raise CommandError(f'As duas formas encontraram vagas diferentes para "{termo}"!')
+
+            self.stdout.write(f'"{termo}": {len(medicoes["exists"][0])} vaga(s) distintas.')
+            for nome, (_, linhas, repetidas, tempo_total, tempo_pagina) in medicoes.items():
+                self.stdout.write(
+                    f'  {nome:7} {linhas:7} linha(s), {repetidas:6} repetida(s), '
+                    f'todas em {tempo_total * 1000:8.1f} ms, primeira página em {tempo_pagina * 1000:6.1f} ms'
+                )
+            repetidas_atual += medicoes['exists'][2]
+
+        if repetidas_atual:
+            raise CommandError(f'A busca de vagas devolveu {repetidas_atual} vaga(s) repetida(s)!')
+
+        self.stdout.write(self.style.SUCCESS('Nenhuma vaga repetida na busca atual.'))
+
+    def _medir(self, funcao, repeticoes):
+        """Retorna o melhor tempo, em segundos, entre as execuções da função."""
+
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+        return min(tempos)
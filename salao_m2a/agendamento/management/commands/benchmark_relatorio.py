@@ -0,0 +1,98 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from agendamento.relatorio import buscar_linhas_relatorio, reduzir
+
+
+class Command(BaseCommand):
+    """
+    Mede o tempo das etapas do relatório de desempenho (busca e agregação) e compara a agregação serial com a
+    paralela, conferindo se ambas chegam ao mesmo resultado.
+    """
+
+    help = 'Compara o tempo de agregação serial e paralela do relatório de desempenho.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial no formato DD/MM/AAAA (usa dados do banco).')
+        parser.add_argument('--fim', help='Data final no formato DD/MM/AAAA (usa dados do banco).')
+        parser.add_argument(
+            '--sinteticas',
+            type=int,
+            help='Em vez do banco, gera esta quantidade de linhas sintéticas para medir apenas a agregação.'
+        )
+        parser.add_argument(
+            '--funcionarios',
+            type=int,
+            default=60,
+            help='Quantidade de funcionários nas linhas sintéticas (padrão: 60).'
+        )
+        parser.add_argument(
+            '--processos',
+            type=int,
+            help='Quantidade de processos do modo paralelo (padrão: RELATORIO_PROCESSOS ou quantidade de CPUs).'
+        )
+        parser.add_argument(
+            '--repeticoes',
+            type=int,
+            default=3,
+            help='Quantas vezes cada modo é executado; é exibido o melhor tempo (padrão: 3).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Obtém as linhas (do banco ou sintéticas) e executa a agregação nos modos serial e
+        paralelo, exibindo o melhor tempo de cada um.
+        """
+        if options['sinteticas']:
+            linhas = self._gerar_linhas_sinteticas(options['sinteticas'], options['funcionarios'])
+            self.stdout.write(f"{len(linhas)} linhas sintéticas geradas.")
+        elif options['inicio'] and options['fim']:
+            data_inicio = timezone.make_aware(datetime.datetime.strptime(options['inicio'], '%d/%m/%Y'))
+            data_fim = timezone.make_aware(
+                datetime.datetime.strptime(options['fim'], '%d/%m/%Y').replace(hour=23, minute=59, second=59)
+            )
+
+            inicio = time.perf_counter()
+            linhas = buscar_linhas_relatorio(data_inicio, data_fim)
+            self.stdout.write(f"Busca: {len(linhas)} linhas em {time.perf_counter() - inicio:.3f}s.")
+        else:
+            raise CommandError('Informe --inicio e --fim, ou --sinteticas.')
+
+        resultados = {}
+        for modo in ('serial', 'paralelo'):
+            tempos = []
+            for _ in range(options['repeticoes']):
+                inicio = time.perf_counter()
+                # O mínimo de linhas é zerado para que o modo paralelo seja sempre exercitado
+                resultados[modo] = reduzir(linhas, modo, options['processos'], minimo_linhas_paralelo=0)
+                tempos.append(time.perf_counter() - inicio)
+            self.stdout.write(f"Agregação {modo}: {min(tempos):.3f}s (melhor de {len(tempos)}).")
+
+        if resultados['serial'] != resultados['paralelo']:
+            raise CommandError('Os modos serial e paralelo produziram resultados diferentes!')
+
+        self.stdout.write(self.style.SUCCESS('Resultados idênticos nos dois modos.'))
+
+    def _gerar_linhas_sinteticas(self, quantidade, funcionarios):
+        """Gera linhas no formato da etapa de busca, com cerca de 1,3 serviço por agendamento."""
+
+        gerador = random.Random(0)
+        valores = [Decimal(v) for v in ('25.00', '50.00', '90.00', '150.00', '220.00', '350.00')]
+        linhas = []
+        agendamento_id = 0
+
+        while len(linhas) < quantidade:
+            agendamento_id += 1
+            funcionario_id = gerador.randrange(funcionarios)
+            for _ in range(2 if gerador.random() < 0.3 else 1):
+                linhas.append((
+                    funcionario_id,
+                    f'Funcionário {funcionario_id}',
+                    agendamento_id,
+                    gerador.choice(valores),
+                ))
+
+        return linhas
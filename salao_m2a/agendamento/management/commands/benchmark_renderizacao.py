@@ -0,0 +1,72 @@
+import datetime
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from agendamento.renderizadores import RENDERIZADORES
+
+
+class Command(BaseCommand):
+    """
+    Mede o tempo de geração do PDF do relatório em cada renderizador disponível, variando a quantidade de linhas da
+    tabela de funcionários.
+    """
+
+    help = 'Compara o tempo de renderização do PDF do relatório por renderizador e quantidade de funcionários.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--linhas',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000],
+            help='Quantidades de linhas de funcionários a medir (padrão: 10 100 1000).'
+        )
+        parser.add_argument(
+            '--renderizadores',
+            nargs='+',
+            choices=list(RENDERIZADORES),
+            default=list(RENDERIZADORES),
+            help='Renderizadores a comparar (padrão: todos).'
+        )
+        parser.add_argument(
+            '--repeticoes',
+            type=int,
+            default=3,
+            help='Quantas vezes cada combinação é executada; é exibido o melhor tempo (padrão: 3).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Para cada quantidade de linhas, monta um contexto sintético e renderiza o PDF com
+        cada renderizador, exibindo o melhor tempo e o tamanho do arquivo.
+        """
+        for quantidade in options['linhas']:
+            contexto = self._contexto(quantidade)
+
+            for nome in options['renderizadores']:
+                renderizador = RENDERIZADORES[nome]()
+                renderizador.renderizar(contexto)  # aquece caches de template e estilos
+
+                tempos = []
+                for _ in range(options['repeticoes']):
+                    inicio = time.perf_counter()
+                    pdf = renderizador.renderizar(contexto)
+                    tempos.append(time.perf_counter() - inicio)
+
+                self.stdout.write(
+                    f"{quantidade:>6} linha(s) | {nome:<10} | {min(tempos) * 1000:9.1f} ms | {len(pdf) / 1024:8.1f} KB"
+                )
+
+    def _contexto(self, quantidade):
+        funcionarios_data = {
+            i: {'nome': f'Funcionário {i:05d}', 'concluidos': 10 + i % 50, 'ganhos': Decimal('1234.50') + i}
+            for i in range(quantidade)
+        }
+        return {
+            'total_concluidos': sum(d['concluidos'] for d in funcionarios_data.values()),
+            'total_geral_ganhos': sum(d['ganhos'] for d in funcionarios_data.values()),
+            'funcionarios_data': funcionarios_data,
+            'data_geracao': datetime.date.today(),
+            'data_inicio': datetime.date.today() - datetime.timedelta(days=30),
+            'data_fim': datetime.date.today(),
+        }
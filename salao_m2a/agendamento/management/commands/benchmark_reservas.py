@@ -0,0 +1,165 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+from django.utils import timezone
+from agendamento.choices import StatusAgendamento
+from agendamento.desempenho import dias_dos_agendamentos, recalcular_dias
+from agendamento.indicadores import atualizar_indicadores_clientes
+from agendamento.models import Agendamento, Cliente, ServicoFuncionarioHorario
+
+
+class Command(BaseCommand):
+    """
+    Mede a vazão de reservas simultâneas com a configuração de banco em uso (veja as variáveis DB_* no settings.py),
+    para comparar perfis: SQLite com e sem ajustes, conexões persistentes ou não, PostgreSQL com ou sem pool. Cada
+    thread simula recepcionistas reservando vagas livres, uma por requisição, e ao final os agendamentos criados são
+    removidos.
+    """
+
+    help = 'Mede reservas por segundo e latências com várias threads reservando vagas ao mesmo tempo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Quantidade de recepcionistas simultâneas (padrão: 8).'
+        )
+        parser.add_argument(
+            '--reservas',
+            type=int,
+            default=50,
+            help='Quantidade de reservas feitas por cada thread (padrão: 50).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Exibe o perfil do banco, distribui vagas livres entre as threads, dispara as
+        reservas em paralelo e exibe a vazão, as latências e os erros; por fim, desfaz as reservas.
+        """
+        self.stdout.write(f'Perfil: {self._descrever_perfil()}')
+
+        quantidade = options['threads'] * options['reservas']
+        vagas = list(ServicoFuncionarioHorario.ativos.filter(
+            funcionario__ativo=True,
+            agendamento__isnull=True,
+            data_horario__data_horario__gte=timezone.now()
+        ).values_list('pk', flat=True)[:quantidade])
+        cliente_ids = list(Cliente.ativos.values_list('pk', flat=True)[:500])
+
+        if len(vagas) < quantidade or not cliente_ids:
+            raise CommandError(
+                f'São necessárias {quantidade} vagas livres e ao menos um cliente; há {len(vagas)} vagas. '
+                'Gere mais horários ou reduza --threads/--reservas.'
+            )
+
+        random.Random(0).shuffle(vagas)
+        self.latencias = []
+        self.erros = Counter()
+        self.criados = []
+        self.trava = threading.Lock()
+
+        threads = [
+            threading.Thread(
+                target=self._reservar,
+                args=(vagas[indice::options['threads']], cliente_ids)
+            )
+            for indice in range(options['threads'])
+        ]
+
+        inicio = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            duracao = time.perf_counter() - inicio
+        finally:
+            self._desfazer()
+
+        if not self.latencias:
+            raise CommandError(f'Nenhuma reserva foi concluída. Erros: {dict(self.erros)}')
+
+        latencias = sorted(self.latencias)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(latencias)} reserva(s) em {duracao:.2f}s: {len(latencias) / duracao:.1f} reservas/s, '
+            f'p50 {self._percentil(latencias, 50):.1f} ms, p95 {self._percentil(latencias, 95):.1f} ms, '
+            f'p99 {self._percentil(latencias, 99):.1f} ms, média {statistics.fmean(latencias):.1f} ms, '
+            f'{sum(self.erros.values())} erro(s){f" {dict(self.erros)}" if self.erros else ""}.'
+        ))
+
+    def _reservar(self, vagas, cliente_ids):
+        """
+        Executa as reservas de uma thread. Cada reserva é tratada como uma requisição: as conexões vencidas são
+        fechadas antes e depois, como fazem os sinais de início e fim de requisição do Django, e a gravação ocorre
+        em uma transação, como no admin.
+        """
+
+        gerador = random.Random(vagas[0] if vagas else 0)
+        try:
+            for vaga_id in vagas:
+                close_old_connections()
+                inicio = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        vaga = ServicoFuncionarioHorario.ativos.select_for_update(of=('self',)).get(
+                            pk=vaga_id,
+                            agendamento__isnull=True
+                        )
+                        agendamento = Agendamento(
+                            cliente_id=gerador.choice(cliente_ids),
+                            servico_funcionario_horario=vaga,
+                            status=StatusAgendamento.AGENDADO
+                        )
+                        agendamento.save()
+                except (DatabaseError, ServicoFuncionarioHorario.DoesNotExist) as erro:
+                    with self.trava:
+                        self.erros[type(erro).__name__] += 1
+                else:
+                    latencia = (time.perf_counter() - inicio) * 1000
+                    with self.trava:
+                        self.latencias.append(latencia)
+                        self.criados.append((agendamento.pk, agendamento.cliente_id))
+                close_old_connections()
+        finally:
+            connections.close_all()
+
+    def _desfazer(self):
+        """Remove os agendamentos criados e recalcula os indicadores dos clientes envolvidos."""
+
+        if not self.criados:
+            return
+
+        criados = Agendamento.objects.filter(pk__in=[pk for pk, _ in self.criados])
+        dias = dias_dos_agendamentos(criados)
+        criados.delete()
+        atualizar_indicadores_clientes([cliente_id for _, cliente_id in self.criados])
+        recalcular_dias(dias)
+        self.stdout.write(f'{len(self.criados)} reserva(s) de teste removida(s).')
+
+    def _descrever_perfil(self):
+        """Resume o banco e as opções de conexão em uso."""
+
+        banco = settings.DATABASES['default']
+        partes = [connection.vendor, f"CONN_MAX_AGE={banco.get('CONN_MAX_AGE', 0)}"]
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    partes.append(f'{pragma}={cursor.fetchone()[0]}')
+            partes.append(f"transaction_mode={banco['OPTIONS'].get('transaction_mode', 'DEFERRED')}")
+        else:
+            partes.append(f"pool={'sim' if banco.get('OPTIONS', {}).get('pool') else 'não'}")
+
+        return ', '.join(partes)
+
+    @staticmethod
+    def _percentil(valores, percentual):
+        indice = min(len(valores) - 1, int(len(valores) * percentual / 100))
+        return valores[indice]
@@ -0,0 +1,130 @@
+import http.cookiejar
+import statistics
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Gera carga sobre uma view de autocomplete de um servidor em execução, simulando recepcionistas digitando ao mesmo
+    tempo, e mede requisições por segundo e latências. Serve para comparar o mesmo endpoint servido via WSGI e via ASGI.
+    """
+
+    help = 'Simula sessões concorrentes de digitação em um autocomplete e mede req/s e latências (p50, p95, p99).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url-base',
+            default='http://127.0.0.1:8000',
+            help='Endereço do servidor em execução (padrão: http://127.0.0.1:8000).'
+        )
+        parser.add_argument(
+            '--caminho',
+            default='/agendamento/vaga-disponivel-ordenada-autocomplete/',
+            help='Caminho da view de autocomplete a ser testada.'
+        )
+        parser.add_argument('--usuario', required=True, help='Usuário usado para autenticar no admin.')
+        parser.add_argument('--senha', required=True, help='Senha do usuário.')
+        parser.add_argument(
+            '--sessoes',
+            type=int,
+            default=50,
+            help='Quantidade de sessões de digitação simultâneas (padrão: 50).'
+        )
+        parser.add_argument(
+            '--repeticoes',
+            type=int,
+            default=5,
+            help='Quantas vezes cada sessão digita a lista de termos (padrão: 5).'
+        )
+        parser.add_argument(
+            '--termos',
+            nargs='+',
+            default=['Corte', 'Manicure', 'Maria', '25/12'],
+            help='Termos digitados letra a letra em cada sessão.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Autentica uma sessão por usuário simulado e dispara, em paralelo, uma requisição
+        a cada letra digitada, exibindo ao final a vazão e a distribuição das latências.
+        """
+        self.url_base = options['url_base'].rstrip('/')
+        self.caminho = options['caminho']
+
+        prefixos = [
+            termo[:tamanho]
+            for termo in options['termos']
+            for tamanho in range(1, len(termo) + 1)
+        ] * options['repeticoes']
+
+        self.stdout.write(f"Autenticando {options['sessoes']} sessão(ões) em {self.url_base}...")
+        abridores = [self._autenticar(options['usuario'], options['senha']) for _ in range(options['sessoes'])]
+
+        self.stdout.write(f"Disparando {len(prefixos) * len(abridores)} requisições em {self.caminho}...")
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(abridores)) as executor:
+            resultados = list(executor.map(lambda abridor: self._digitar(abridor, prefixos), abridores))
+        duracao = time.perf_counter() - inicio
+
+        latencias = sorted(latencia for latencias_sessao, _ in resultados for latencia in latencias_sessao)
+        erros = sum(erros_sessao for _, erros_sessao in resultados)
+
+        if not latencias:
+            raise CommandError('Nenhuma requisição foi concluída com sucesso.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(latencias)} requisição(ões) em {duracao:.1f}s: {len(latencias) / duracao:.1f} req/s, "
+            f"p50 {self._percentil(latencias, 50):.1f} ms, p95 {self._percentil(latencias, 95):.1f} ms, "
+            f"p99 {self._percentil(latencias, 99):.1f} ms, média {statistics.fmean(latencias):.1f} ms, "
+            f"{erros} erro(s)."
+        ))
+
+    def _autenticar(self, usuario, senha):
+        """Faz login no admin e retorna um 'opener' do urllib com os cookies da sessão autenticada."""
+
+        cookies = http.cookiejar.CookieJar()
+        abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+        url_login = f"{self.url_base}/admin/login/"
+
+        abridor.open(url_login).read()
+        csrf = next((c.value for c in cookies if c.name == 'csrftoken'), '')
+        dados = urllib.parse.urlencode({
+            'username': usuario,
+            'password': senha,
+            'csrfmiddlewaretoken': csrf,
+            'next': '/admin/',
+        }).encode()
+        requisicao = urllib.request.Request(url_login, data=dados, headers={'Referer': url_login})
+        abridor.open(requisicao).read()
+
+        if not any(c.name == 'sessionid' for c in cookies):
+            raise CommandError('Não foi possível autenticar com o usuário e senha informados.')
+
+        return abridor
+
+    def _digitar(self, abridor, prefixos):
+        """Executa as requisições de uma sessão, uma por prefixo, e retorna as latências (ms) e o total de erros."""
+
+        latencias = []
+        erros = 0
+        for prefixo in prefixos:
+            url = f"{self.url_base}{self.caminho}?{urllib.parse.urlencode({'q': prefixo})}"
+            inicio = time.perf_counter()
+            try:
+                abridor.open(url).read()
+            except OSError:
+                erros += 1
+                continue
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+        return latencias, erros
+
+    @staticmethod
+    def _percentil(valores_ordenados, percentil):
+        indice = min(len(valores_ordenados) - 1, round(percentil / 100 * (len(valores_ordenados) - 1)))
+        return valores_ordenados[indice]
@@ -0,0 +1,111 @@
+import datetime
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from agendamento.choices import OrigemFechamento, StatusAgendamento
+from agendamento.transicoes import (
+    fechar_agendamentos,
+    fim_do_dia,
+    limite_fechamento_automatico,
+    pendentes_de_fechamento,
+)
+
+
+class Command(BaseCommand):
+    """
+    Fecha os agendamentos que ainda estão como 'Agendado' e cujo horário já passou, em lotes, exibindo o progresso e
+    registrando cada execução. Sem opções, aplica a política FECHAMENTO_AUTOMATICO_* do settings.py; pode ser agendado
+    no cron ou ficar em execução com --daemon.
+    """
+
+    help = 'Fecha os agendamentos ainda "Agendado" cujo horário já passou, conforme a política de fechamento.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ate',
+            type=datetime.date.fromisoformat,
+            help='Fecha os agendamentos até o fim deste dia (AAAA-MM-DD), em vez do limite da política automática.'
+        )
+        parser.add_argument(
+            '--status',
+            choices=[StatusAgendamento.CONCLUIDO, StatusAgendamento.CANCELADO],
+            help='Novo status dos agendamentos (padrão: FECHAMENTO_AUTOMATICO_STATUS).'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=settings.TRANSICAO_TAMANHO_LOTE,
+            help=f'Quantidade de agendamentos alterados por transação (padrão: {settings.TRANSICAO_TAMANHO_LOTE}).'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Apenas informa quantos agendamentos seriam alterados, sem alterar o banco.'
+        )
+        parser.add_argument(
+            '--daemon',
+            action='store_true',
+            help='Continua em execução, fechando os agendamentos a cada intervalo.'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=60,
+            help='Intervalo, em minutos, entre os fechamentos no modo --daemon (padrão: 60).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Conta os agendamentos pendentes até o limite (o fim do dia de --ate ou o limite da
+        política automática) e altera o status de todos, um lote por transação. No modo --daemon, repete o fechamento a
+        cada intervalo até ser interrompido.
+        """
+        status = options['status'] or settings.FECHAMENTO_AUTOMATICO_STATUS
+        if status is None:
+            raise CommandError('O fechamento automático está desligado; informe o novo status com --status.')
+        if options['ate'] and options['ate'] >= timezone.localdate():
+            raise CommandError('Só é possível fechar dias anteriores a hoje.')
+        if options['ate'] and options['daemon']:
+            raise CommandError('--ate não pode ser usado com --daemon, que segue o limite da política automática.')
+        if options['lote'] < 1:
+            raise CommandError('O tamanho do lote deve ser maior que zero.')
+
+        if not options['daemon']:
+            self._fechar(options['ate'], status, options['lote'], options['simular'], OrigemFechamento.COMANDO)
+            return
+
+        self.stdout.write(f"Modo daemon: fechando agendamentos a cada {options['intervalo']} minuto(s).")
+        try:
+            while True:
+                # Conexões abertas há muito tempo podem ter sido encerradas pelo banco entre uma rodada e outra
+                close_old_connections()
+                self._fechar(None, status, options['lote'], options['simular'], OrigemFechamento.AGENDADO)
+                time.sleep(options['intervalo'] * 60)
+        except KeyboardInterrupt:
+            self.stdout.write("Execução interrompida.")
+
+    def _fechar(self, ate, status, lote, simular, origem):
+        """Fecha os agendamentos pendentes até o limite e informa o que foi alterado."""
+
+        limite = fim_do_dia(ate) if ate else limite_fechamento_automatico()
+        total = pendentes_de_fechamento(limite).count()
+
+        self.stdout.write(
+            f'{total} agendamento(s) pendente(s) com horário antes de {timezone.localtime(limite):%d/%m/%Y %H:%M}.'
+        )
+        if simular or not total:
+            return
+
+        def progresso(alterados, lotes):
+            self.stdout.write(
+                f'  Lote {lotes}: {alterados} de {total} agendamento(s) alterados ({alterados / total:.0%}).'
+            )
+
+        fechamento = fechar_agendamentos(limite, status, origem, tamanho_lote=lote, progresso=progresso)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{fechamento.alterados} agendamento(s) marcados como "{StatusAgendamento(status).label}"; '
+            f'{fechamento.dias_recalculados} dia(s) do desempenho recalculados.'
+        ))
@@ -1,7 +1,9 @@
+import time
 from datetime import timedelta
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
 from django.utils import timezone
-from agendamento.models import DataHorario
+from agendamento.horarios import garantir_horarios
 
 class Command(BaseCommand):
     """
@@ -10,55 +12,64 @@ class Command(BaseCommand):
 
     help = 'Garante que existam horários de atendimento criados para os próximos 6 meses.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=180,
+            help='Quantidade de dias à frente que devem ter horários cadastrados (padrão: 180).'
+        )
+        parser.add_argument(
+            '--daemon',
+            action='store_true',
+            help='Continua em execução, completando os horários a cada intervalo.'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=60,
+            help='Intervalo, em minutos, entre as verificações no modo --daemon (padrão: 60).'
+        )
+
     def handle(self, *args, **options):
         """
-        Ponto de entrada do comando. Verifica o último horário cadastrado e cria novos slots de horário em intervalos
-        de 30 minutos até completar um período de 180 dias no futuro.
+        Ponto de entrada do comando. Cria apenas os slots de 30 minutos que estiverem faltando entre hoje e o fim do
+        período, inclusive dias removidos no meio do período. No modo --daemon, repete a verificação a cada intervalo
+        até ser interrompido.
         """
-        self.stdout.write("Verificando e criando horários futuros...")
+        if not options['daemon']:
+            self._completar(options['dias'])
+            return
 
-        hoje = timezone.now().date()
-        data_limite = hoje + timedelta(days=180)
+        self.stdout.write(f"Modo daemon: verificando horários a cada {options['intervalo']} minuto(s).")
+        try:
+            while True:
+                # Conexões abertas há muito tempo podem ter sido encerradas pelo banco entre uma rodada e outra
+                close_old_connections()
+                self._completar(options['dias'])
+                time.sleep(options['intervalo'] * 60)
+        except KeyboardInterrupt:
+            self.stdout.write("Execução interrompida.")
 
-        ultimo_horario = DataHorario.objects.order_by('-data_horario').first()
+    def _completar(self, dias):
+        """Cria os horários faltantes do período e informa quantos foram criados."""
 
-        if ultimo_horario:
-            data_inicial = ultimo_horario.data_horario.date() + timedelta(days=1)
-        else:
-            data_inicial = hoje
+        self.stdout.write("Verificando e criando horários futuros...")
+
+        hoje = timezone.localdate()
+        data_limite = hoje + timedelta(days=dias)
 
-        if data_inicial > data_limite:
+        criados = garantir_horarios(hoje, data_limite)
+
+        if criados:
             self.stdout.write(
                 self.style.SUCCESS(
-                    'Horários já existem para os próximos 6 meses. Nenhuma ação necessária.'
+                    f'{criados} novos horários criados com sucesso até {data_limite}.'
                 )
             )
-            return
-
-        horarios_a_criar = []
-        current_date = data_inicial
-
-        while current_date <= data_limite:
-            if current_date.weekday() < 6:  # Segunda a Sábado (0-5)
-                start_hour, end_hour = 8, 19
-            else:  # Domingo (6)
-                start_hour, end_hour = 9, 15
-
-            for hour in range(start_hour, end_hour):
-                for minute in [0, 30]:
-                    dt = timezone.make_aware(
-                        timezone.datetime(current_date.year, current_date.month, current_date.day, hour, minute)
-                    )
-                    horarios_a_criar.append(DataHorario(data_horario=dt))
-
-            current_date += timedelta(days=1)
-
-        if horarios_a_criar:
-            DataHorario.objects.bulk_create(horarios_a_criar)
+        else:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'{len(horarios_a_criar)} novos horários criados com sucesso até {data_limite}.'
+                    f'Horários já existem até {data_limite}. Nenhuma ação necessária.'
                 )
             )
-        else:
-            self.stdout.write("Nenhum novo horário precisou ser criado.")
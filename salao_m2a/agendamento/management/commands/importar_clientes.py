@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from agendamento.importacao import importar_clientes_csv
+
+
+class Command(BaseCommand):
+    """
+    Importa clientes em massa a partir de um arquivo CSV, criando os registros de Pessoa e Cliente em lotes.
+    """
+
+    help = 'Importa clientes (Pessoa + Cliente) a partir de um arquivo CSV, em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'arquivo',
+            help='Caminho do CSV com as colunas nome_completo, cpf, email, celular e data_nascimento (opcional).'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Quantidade de linhas validadas e gravadas por transação (padrão: 1000).'
+        )
+        parser.add_argument(
+            '--delimitador',
+            default=',',
+            help='Caractere separador de colunas do CSV (padrão: ",").'
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Codificação do arquivo (padrão: utf-8-sig).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Lê o arquivo de forma contínua, exibe o progresso a cada lote e, ao final, o
+        total importado, a vazão em linhas por segundo e os erros encontrados por linha.
+        """
+        self.stdout.write(f"Importando clientes de {options['arquivo']}...")
+
+        try:
+            arquivo = open(options['arquivo'], encoding=options['encoding'], newline='')
+        except OSError as erro:
+            raise CommandError(f"Não foi possível abrir o arquivo: {erro}")
+
+        with arquivo:
+            resultado = importar_clientes_csv(
+                arquivo,
+                tamanho_lote=options['lote'],
+                delimitador=options['delimitador'],
+                ao_processar_lote=self._exibir_progresso
+            )
+
+        for linha, mensagem in resultado.erros:
+            self.stdout.write(self.style.WARNING(f"Linha {linha}: {mensagem}"))
+
+        if resultado.total_erros > len(resultado.erros):
+            self.stdout.write(f"... e mais {resultado.total_erros - len(resultado.erros)} erro(s) não exibidos.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.criados} cliente(s) importados de {resultado.linhas_lidas} linha(s) em "
+            f"{resultado.tempo_decorrido:.1f}s ({resultado.linhas_por_segundo:.0f} linhas/s), "
+            f"com {resultado.total_erros} erro(s)."
+        ))
+
+    def _exibir_progresso(self, resultado):
+        self.stdout.write(
+            f"  {resultado.linhas_lidas} linha(s) lidas, {resultado.criados} cliente(s) criados "
+            f"({resultado.linhas_por_segundo:.0f} linhas/s)..."
+        )
@@ -1,8 +1,11 @@
 import random
+import time
 from datetime import timedelta
 from faker import Faker
+from django.apps import apps
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.color import no_style
+from django.db import connection, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User, Group, Permission
 from django.contrib.contenttypes.models import ContentType
@@ -14,7 +17,14 @@ from agendamento.models import (
     DataHorario,
     ServicoFuncionarioHorario,
     Agendamento,
+    AgendamentoArquivado,
+    FechamentoAgendamentos,
+    TransicaoStatus,
+    ListaEspera,
 )
+from agendamento.horarios import horarios_do_dia
+from agendamento.historico import registrar_transicoes
+from agendamento.indicadores import atualizar_indicadores_clientes
 
 # --- CONSTANTES DE CONFIGURAÇÃO ---
 TOTAL_PESSOAS = 10000
@@ -36,6 +46,18 @@ class Command(BaseCommand):
 
     help = 'Limpa e popula o banco de dados com dados de teste completos, incluindo usuários e permissões.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rapido',
+            action='store_true',
+            help='Esvazia as tabelas do app com TRUNCATE (ou equivalente do banco), sem carregar os registros.'
+        )
+        parser.add_argument(
+            '--apenas-limpar',
+            action='store_true',
+            help='Apenas limpa os dados, sem popular o banco novamente.'
+        )
+
     @transaction.atomic
     def handle(self, *args, **options):
         """
@@ -44,8 +66,15 @@ class Command(BaseCommand):
         """
 
         self.stdout.write("Iniciando a configuração completa do salão...")
+        inicio = time.perf_counter()
+
+        if options['rapido']:
+            self._limpar_dados_rapido()
+        else:
+            self._limpar_dados()
 
-        self._limpar_dados()
+        if options['apenas_limpar']:
+            return
         self._criar_grupos_e_permissoes()
         servicos = self._criar_servicos()
         pessoas = self._criar_pessoas()
@@ -55,7 +84,9 @@ class Command(BaseCommand):
         self._criar_vagas_de_atendimento()
         self._criar_agendamentos()
 
-        self.stdout.write(self.style.SUCCESS('Configuração do salão concluída com sucesso!'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Configuração do salão concluída com sucesso em {time.perf_counter() - inicio:.1f}s!'
+        ))
 
     def _limpar_dados(self):
         """
@@ -64,6 +95,11 @@ class Command(BaseCommand):
         """
 
         self.stdout.write("Limpando dados existentes...")
+        inicio = time.perf_counter()
+        ListaEspera.objects.all().delete()
+        TransicaoStatus.objects.all().delete()
+        FechamentoAgendamentos.objects.all().delete()
+        AgendamentoArquivado.objects.all().delete()
         Agendamento.objects.all().delete()
         ServicoFuncionarioHorario.objects.all().delete()
         DataHorario.objects.all().delete()
@@ -73,7 +109,30 @@ class Command(BaseCommand):
         Pessoa.objects.all().delete()
         User.objects.exclude(is_superuser=True).delete()
         Group.objects.all().delete()
-        self.stdout.write("Dados limpos.")
+        self.stdout.write(f"Dados limpos em {time.perf_counter() - inicio:.1f}s.")
+
+    def _limpar_dados_rapido(self):
+        """
+        Esvazia de uma só vez todas as tabelas do app 'agendamento', inclusive as intermediárias dos campos
+        ManyToMany, usando o comando de limpeza de cada banco (TRUNCATE ... CASCADE no PostgreSQL, TRUNCATE com as
+        chaves estrangeiras desativadas no MySQL, DELETE sem carregar os registros no SQLite) e reiniciando as
+        sequências de IDs. Usuários (exceto superusuários) e grupos são removidos como no modo normal.
+        """
+
+        self.stdout.write("Limpando dados existentes (modo rápido)...")
+        inicio = time.perf_counter()
+
+        tabelas = [
+            modelo._meta.db_table
+            for modelo in apps.get_app_config('agendamento').get_models(include_auto_created=True)
+        ]
+        comandos = connection.ops.sql_flush(no_style(), tabelas, reset_sequences=True, allow_cascade=True)
+        connection.ops.execute_sql_flush(comandos)
+        self.stdout.write(f"{len(tabelas)} tabelas esvaziadas em {time.perf_counter() - inicio:.1f}s.")
+
+        User.objects.exclude(is_superuser=True).delete()
+        Group.objects.all().delete()
+        self.stdout.write(f"Dados limpos em {time.perf_counter() - inicio:.1f}s.")
 
     def _criar_grupos_e_permissoes(self):
         """
@@ -90,7 +149,8 @@ class Command(BaseCommand):
             Servico,
             DataHorario,
             ServicoFuncionarioHorario,
-            Agendamento
+            Agendamento,
+            ListaEspera
         ]
 
         content_types = []
@@ -365,16 +425,7 @@ class Command(BaseCommand):
         horarios = []
 
         while current_date <= end_date:
-            if current_date.weekday() < 6:  # Segunda a Sábado (0-5)
-                start_hour, end_hour = 8, 19
-            else:  # Domingo (6)
-                start_hour, end_hour = 9, 15
-
-            for hour in range(start_hour, end_hour):
-                for minute in [0, 30]:
-                    dt = timezone.make_aware(
-                        timezone.datetime(current_date.year, current_date.month, current_date.day, hour, minute))
-                    horarios.append(DataHorario(data_horario=dt))
+            horarios.extend(DataHorario(data_horario=dt) for dt in horarios_do_dia(current_date))
             current_date += timedelta(days=1)
 
         DataHorario.objects.bulk_create(horarios, batch_size=1000)
@@ -387,7 +438,7 @@ class Command(BaseCommand):
         """
 
         self.stdout.write("Criando vagas de atendimento (com possíveis combos)...")
-        funcionarios = list(Funcionario.objects.filter(ativo=True))
+        funcionarios = list(Funcionario.ativos.all())
         horarios_todos = list(DataHorario.objects.all())
         vagas_criadas = []
 
@@ -445,7 +496,7 @@ class Command(BaseCommand):
 
         self.stdout.write("Criando agendamentos...")
         vagas_disponiveis = list(ServicoFuncionarioHorario.objects.all())
-        clientes_ativos = list(Cliente.objects.filter(ativo=True))
+        clientes_ativos = list(Cliente.ativos.all())
 
         if not vagas_disponiveis or not clientes_ativos:
             self.stdout.write(self.style.WARNING("Não há vagas ou clientes ativos para criar agendamentos."))
@@ -453,14 +504,22 @@ class Command(BaseCommand):
 
         total_agendamentos = int(len(vagas_disponiveis) * 0.90)
         vagas_para_agendar = random.sample(vagas_disponiveis, k=total_agendamentos)
+        valores = ServicoFuncionarioHorario.valores_totais()
 
         agendamentos = []
         for vaga in vagas_para_agendar:
             agendamentos.append(Agendamento(
                 cliente=random.choice(clientes_ativos),
                 servico_funcionario_horario=vaga,
-                status=random.choice(['AGENDADO', 'CONCLUIDO', 'CANCELADO'])
+                status=random.choice(['AGENDADO', 'CONCLUIDO', 'CANCELADO']),
+                valor_total=valores.get(vaga.pk) or 0
             ))
 
         Agendamento.objects.bulk_create(agendamentos, batch_size=1000)
         self.stdout.write(f"{len(agendamentos)} agendamentos criados.")
+
+        # Cada agendamento entra no histórico já com o status sorteado, como se tivesse sido criado assim
+        registrar_transicoes((agendamento.pk, None, agendamento.status) for agendamento in agendamentos)
+
+        atualizar_indicadores_clientes(cliente.pk for cliente in clientes_ativos)
+        self.stdout.write("Indicadores dos clientes calculados.")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from agendamento.lista_espera import expirar_ofertas, ofertar_vagas, vagas_canceladas_sem_oferta
+
+
+class Command(BaseCommand):
+    """
+    Mantém a lista de espera em dia: encerra as ofertas vencidas, oferecendo as vagas ao próximo da fila, encerra os
+    pedidos cuja janela já passou e oferece as vagas canceladas que ainda estão sem oferta (por exemplo, porque não
+    havia pedido compatível no momento do cancelamento). Deve ser agendado no cron, por exemplo a cada hora.
+    """
+
+    help = 'Expira ofertas vencidas da lista de espera e oferece as vagas canceladas ainda sem oferta.'
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Processa as ofertas e os pedidos vencidos e, em seguida, oferece de uma vez todas
+        as vagas futuras canceladas sem oferta.
+        """
+        agora = timezone.now()
+        vencidas, reofertadas, encerrados = expirar_ofertas(agora)
+        self.stdout.write(
+            f'{vencidas} oferta(s) vencida(s), {reofertadas} vaga(s) ofertadas ao próximo da fila; '
+            f'{encerrados} pedido(s) com a janela encerrada.'
+        )
+
+        ofertadas = ofertar_vagas(vagas_canceladas_sem_oferta(agora).values('pk'), agora)
+        self.stdout.write(self.style.SUCCESS(f'{ofertadas} vaga(s) cancelada(s) ofertadas à lista de espera.'))
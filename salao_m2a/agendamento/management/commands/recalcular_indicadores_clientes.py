@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from agendamento.indicadores import atualizar_indicadores_clientes
+from agendamento.models import Cliente
+
+
+class Command(BaseCommand):
+    """
+    Recalcula, a partir dos agendamentos ativos e arquivados, os indicadores acumulados de todos os clientes.
+    """
+
+    help = 'Recalcula valor vitalício, visitas, última visita e valor agendado de todos os clientes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Quantidade de clientes recalculados por vez (padrão: 500).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Percorre os clientes em lotes e grava apenas os que estavam desatualizados,
+        exibindo ao final quantos foram corrigidos.
+        """
+        self.stdout.write("Recalculando indicadores dos clientes...")
+        inicio = time.perf_counter()
+
+        cliente_ids = list(Cliente.objects.values_list('pk', flat=True))
+        atualizados = atualizar_indicadores_clientes(cliente_ids, tamanho_lote=options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(cliente_ids)} cliente(s) verificados e {atualizados} atualizados em '
+            f'{time.perf_counter() - inicio:.1f}s.'
+        ))
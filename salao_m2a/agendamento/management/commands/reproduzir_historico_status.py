@@ -0,0 +1,95 @@
+import datetime
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from agendamento.choices import StatusAgendamento
+from agendamento.desempenho import atualizar_desempenho
+from agendamento.historico import reproduzir_historico
+from agendamento.indicadores import atualizar_indicadores_clientes
+from agendamento.models import Agendamento
+from agendamento.transicoes import fim_do_dia
+
+
+class Command(BaseCommand):
+    """
+    Refaz, a partir do histórico de status, a situação dos agendamentos. Com --ate, exibe quantos agendamentos estavam
+    em cada status ao fim do dia informado. Sem ele, compara o status atual de cada agendamento com o obtido pelo
+    histórico e, com --corrigir, grava o status do histórico nos divergentes e refaz os derivados (indicadores dos
+    clientes e agregado de desempenho).
+    """
+
+    help = 'Reproduz o histórico de status dos agendamentos para consultar uma data passada ou conferir o status atual.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ate',
+            type=datetime.date.fromisoformat,
+            help='Exibe a quantidade de agendamentos em cada status ao fim deste dia (AAAA-MM-DD).'
+        )
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help='Grava nos agendamentos divergentes o status obtido pelo histórico.'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=settings.TRANSICAO_TAMANHO_LOTE,
+            help=f'Quantidade de agendamentos corrigidos por transação (padrão: {settings.TRANSICAO_TAMANHO_LOTE}).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Percorre o histórico uma única vez, em ordem, e exibe a contagem por status na data
+        de --ate ou as divergências em relação ao status atual, corrigindo-as com --corrigir.
+        """
+        if options['ate'] and options['corrigir']:
+            raise CommandError('--corrigir compara com o status atual e não pode ser usado com --ate.')
+        if options['lote'] < 1:
+            raise CommandError('O tamanho do lote deve ser maior que zero.')
+
+        if options['ate']:
+            estado = reproduzir_historico(fim_do_dia(options['ate']))
+            contagem = Counter(estado.values())
+            self.stdout.write(f"Situação ao fim de {options['ate']:%d/%m/%Y}, segundo o histórico:")
+            for status in StatusAgendamento:
+                self.stdout.write(f'  {status.label}: {contagem[status]}')
+            return
+
+        estado = reproduzir_historico()
+        divergentes = []
+        sem_historico = 0
+        for pk, status, cliente_id in Agendamento.objects.values_list('pk', 'status', 'cliente_id').iterator(
+            chunk_size=5000
+        ):
+            esperado = estado.get(pk)
+            if esperado is None:
+                sem_historico += 1
+            elif esperado != status:
+                divergentes.append((pk, esperado, cliente_id))
+
+        self.stdout.write(
+            f'{len(estado)} agendamento(s) no histórico; {len(divergentes)} com status diferente do histórico e '
+            f'{sem_historico} sem histórico.'
+        )
+        if not options['corrigir'] or not divergentes:
+            return
+
+        for inicio in range(0, len(divergentes), options['lote']):
+            lote = divergentes[inicio:inicio + options['lote']]
+            with transaction.atomic():
+                for status in StatusAgendamento:
+                    # O update() não aciona o auto_now; a data de atualização é usada pelo agregado de desempenho
+                    Agendamento.objects.filter(pk__in=[pk for pk, esperado, _ in lote if esperado == status]).update(
+                        status=status,
+                        data_atualizacao=timezone.now()
+                    )
+                atualizar_indicadores_clientes([cliente_id for _, _, cliente_id in lote])
+
+        dias = atualizar_desempenho()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(divergentes)} agendamento(s) corrigidos conforme o histórico; {dias} dia(s) do desempenho '
+            'recalculados.'
+        ))
@@ -0,0 +1,72 @@
+import sqlite3
+import time
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from agendamento.snapshot import calcular_checksum, ler_checksum, eh_snapshot_sqlite
+
+
+class Command(BaseCommand):
+    """
+    Restaura um snapshot gerado pelo 'salvar_snapshot', substituindo todos os dados do banco atual.
+    """
+
+    help = 'Restaura um snapshot gerado por salvar_snapshot, verificando antes o checksum SHA-256.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do snapshot a ser restaurado.')
+        parser.add_argument(
+            '--sem-verificacao',
+            action='store_true',
+            help='Não confere o checksum do snapshot antes de restaurá-lo.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. Confere o checksum e restaura o snapshot: no SQLite, copia as páginas do arquivo
+        para o banco atual com a API de backup do sqlite3; nos demais bancos, esvazia as tabelas com 'flush' e carrega
+        o dumpdata com 'loaddata'.
+        """
+        arquivo = Path(options['arquivo']).resolve()
+
+        if not arquivo.exists():
+            raise CommandError(f'O arquivo {arquivo} não existe.')
+
+        inicio = time.perf_counter()
+
+        if not options['sem_verificacao']:
+            esperado = ler_checksum(arquivo)
+            if esperado is None:
+                raise CommandError(
+                    f'Checksum não encontrado para {arquivo}. Use --sem-verificacao para restaurar mesmo assim.'
+                )
+            if calcular_checksum(arquivo) != esperado:
+                raise CommandError(f'O checksum de {arquivo} não confere: o snapshot está corrompido ou foi alterado.')
+            self.stdout.write("Checksum verificado.")
+
+        self.stdout.write(f"Restaurando snapshot {arquivo}...")
+
+        if eh_snapshot_sqlite(arquivo):
+            if connection.vendor != 'sqlite':
+                raise CommandError('Snapshots no formato SQLite só podem ser restaurados em um banco SQLite.')
+
+            connection.ensure_connection()
+            origem = sqlite3.connect(f'file:{arquivo}?mode=ro', uri=True)
+            try:
+                origem.backup(connection.connection)
+            finally:
+                origem.close()
+        else:
+            call_command('flush', interactive=False, verbosity=0)
+            call_command('loaddata', str(arquivo), verbosity=0)
+
+        self.stdout.write(self.style.SUCCESS(f'Snapshot restaurado em {time.perf_counter() - inicio:.1f}s.'))
+
+        # O snapshot guarda as migrações aplicadas no momento em que foi salvo
+        executor = MigrationExecutor(connection)
+        if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            self.stdout.write(self.style.WARNING(
+                'O snapshot foi salvo antes das últimas migrações. Execute "python manage.py migrate".'
+            ))
@@ -0,0 +1,64 @@
+import time
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from agendamento.snapshot import gravar_checksum, caminho_checksum, MODELOS_EXCLUIDOS_DUMP
+
+
+class Command(BaseCommand):
+    """
+    Salva o estado atual do banco em um arquivo de snapshot, para que testes de desempenho possam sempre partir do
+    mesmo conjunto de dados sem precisar executar o 'popular_banco' novamente.
+    """
+
+    help = 'Salva um snapshot do banco de dados (com checksum SHA-256) para ser restaurado com restaurar_snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'arquivo',
+            help='Caminho do snapshot. Nos bancos que não são SQLite, use a extensão .json.gz.'
+        )
+        parser.add_argument(
+            '--sobrescrever',
+            action='store_true',
+            help='Substitui o arquivo, caso ele já exista.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Ponto de entrada do comando. No SQLite, gera uma cópia compacta e consistente do banco com 'VACUUM INTO'; nos
+        demais bancos, usa o dumpdata compactado com gzip. Ao final, grava o checksum ao lado do snapshot.
+        """
+        arquivo = Path(options['arquivo']).resolve()
+
+        if arquivo.exists():
+            if not options['sobrescrever']:
+                raise CommandError(f'O arquivo {arquivo} já existe. Use --sobrescrever para substituí-lo.')
+            arquivo.unlink()
+            caminho_checksum(arquivo).unlink(missing_ok=True)
+
+        inicio = time.perf_counter()
+        self.stdout.write(f"Salvando snapshot do banco em {arquivo}...")
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM INTO %s', [str(arquivo)])
+        else:
+            if not arquivo.name.endswith('.json.gz'):
+                raise CommandError('Fora do SQLite, o snapshot é um dumpdata compactado: use a extensão .json.gz.')
+            call_command(
+                'dumpdata',
+                exclude=MODELOS_EXCLUIDOS_DUMP,
+                natural_foreign=True,
+                natural_primary=True,
+                output=str(arquivo),
+                verbosity=0
+            )
+
+        checksum = gravar_checksum(arquivo)
+        tamanho = arquivo.stat().st_size / (1024 * 1024)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot salvo em {time.perf_counter() - inicio:.1f}s ({tamanho:.1f} MiB, sha256 {checksum[:12]}...).'
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgendamentoArquivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_original', models.BigIntegerField(unique=True, verbose_name='ID do Agendamento')),
+                ('data_horario', models.DateTimeField(verbose_name='Data')),
+                ('servicos', models.CharField(blank=True, max_length=500, verbose_name='Serviço(s)')),
+                ('valor_total', models.DecimalField(decimal_places=2, max_digits=9, verbose_name='Valor Total')),
+                ('status', models.CharField(choices=[('AGENDADO', 'Agendado'), ('CONCLUIDO', 'Concluído'), ('CANCELADO', 'Cancelado')], max_length=20, verbose_name='Status')),
+                ('data_arquivamento', models.DateTimeField(auto_now_add=True, verbose_name='Data de Arquivamento')),
+                ('cliente', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='agendamento.cliente', verbose_name='Cliente')),
+                ('funcionario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='agendamento.funcionario', verbose_name='Funcionário')),
+            ],
+            options={
+                'verbose_name': 'Agendamento Arquivado',
+                'verbose_name_plural': 'Agendamentos Arquivados',
+                'indexes': [models.Index(fields=['status', 'data_horario'], name='arquivado_status_data_idx')],
+            },
+        ),
+    ]
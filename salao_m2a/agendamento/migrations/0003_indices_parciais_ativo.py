@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0002_agendamentoarquivado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['status', 'servico_funcionario_horario'], name='agendamento_status_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['id'], name='cliente_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datahorario',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['data_horario'], name='datahorario_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='funcionario',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['id'], name='funcionario_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pessoa',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['nome_completo'], name='pessoa_nome_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servico',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['nome_servico'], name='servico_nome_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicofuncionariohorario',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['data_horario', 'funcionario'], name='vaga_data_ativo_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def deduplicar_horarios(apps, schema_editor):
+    """
+    Mantém um único DataHorario por data/hora (o de menor ID) antes da criação da restrição de unicidade. As vagas dos
+    registros excedentes passam para o registro mantido; quando o funcionário já tem vaga no mesmo horário, a vaga sem
+    agendamento é descartada. Dois agendamentos do mesmo funcionário no mesmo horário precisam ser resolvidos à mão.
+    """
+
+    DataHorario = apps.get_model('agendamento', 'DataHorario')
+    ServicoFuncionarioHorario = apps.get_model('agendamento', 'ServicoFuncionarioHorario')
+    Agendamento = apps.get_model('agendamento', 'Agendamento')
+
+    def tem_agendamento(vaga):
+        return Agendamento.objects.filter(servico_funcionario_horario_id=vaga.pk).exists()
+
+    duplicados = DataHorario.objects.values('data_horario').annotate(
+        mantido_id=Min('id'),
+        total=Count('id')
+    ).filter(total__gt=1).order_by()
+
+    for duplicado in duplicados:
+        mantido_id = duplicado['mantido_id']
+        excedentes = list(DataHorario.objects.filter(
+            data_horario=duplicado['data_horario']
+        ).exclude(pk=mantido_id).values_list('pk', flat=True))
+
+        if DataHorario.objects.filter(pk__in=excedentes, ativo=True).exists():
+            DataHorario.objects.filter(pk=mantido_id).update(ativo=True)
+
+        vagas_mantidas = {
+            vaga.funcionario_id: vaga
+            for vaga in ServicoFuncionarioHorario.objects.filter(data_horario_id=mantido_id)
+        }
+
+        for vaga in ServicoFuncionarioHorario.objects.filter(data_horario_id__in=excedentes).order_by('pk'):
+            existente = vagas_mantidas.get(vaga.funcionario_id)
+
+            if existente is not None:
+                if not tem_agendamento(vaga):
+                    vaga.delete()
+                    continue
+                if tem_agendamento(existente):
+                    raise RuntimeError(
+                        f'O funcionário {vaga.funcionario_id} possui dois agendamentos em '
+                        f'{duplicado["data_horario"]} (vagas {existente.pk} e {vaga.pk}). Resolva o conflito antes de '
+                        f'aplicar esta migração.'
+                    )
+                existente.delete()
+
+            vaga.data_horario_id = mantido_id
+            vaga.save(update_fields=['data_horario'])
+            vagas_mantidas[vaga.funcionario_id] = vaga
+
+        DataHorario.objects.filter(pk__in=excedentes).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0003_indices_parciais_ativo'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicar_horarios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0004_deduplicar_datahorario'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='datahorario',
+            name='data_horario',
+            field=models.DateTimeField(unique=True, verbose_name='Data'),
+        ),
+    ]
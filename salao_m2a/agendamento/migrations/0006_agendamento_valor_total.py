@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:14
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_valor_total(apps, schema_editor):
+    """Preenche o valor dos agendamentos existentes com a soma atual dos serviços da vaga, em um único UPDATE."""
+
+    Agendamento = apps.get_model('agendamento', 'Agendamento')
+    ServicoFuncionarioHorario = apps.get_model('agendamento', 'ServicoFuncionarioHorario')
+
+    soma_servicos = ServicoFuncionarioHorario.servico.through.objects.filter(
+        servicofuncionariohorario_id=OuterRef('servico_funcionario_horario_id')
+    ).values('servicofuncionariohorario_id').annotate(
+        total=Sum('servico__valor')
+    ).values('total')
+
+    Agendamento.objects.update(
+        valor_total=Coalesce(
+            Subquery(soma_servicos, output_field=models.DecimalField(max_digits=9, decimal_places=2)),
+            Value(Decimal('0'))
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0005_datahorario_unico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agendamento',
+            name='valor_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Soma dos valores dos serviços da vaga no momento do agendamento.', max_digits=9, verbose_name='Valor Total'),
+        ),
+        migrations.RunPython(preencher_valor_total, migrations.RunPython.noop),
+    ]
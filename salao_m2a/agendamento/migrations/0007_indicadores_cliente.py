@@ -0,0 +1,95 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:16
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+CONCLUIDO = 'CONCLUIDO'
+AGENDADO = 'AGENDADO'
+
+
+def preencher_indicadores(apps, schema_editor):
+    """Calcula os indicadores de todos os clientes em um único UPDATE com subconsultas correlacionadas."""
+
+    Cliente = apps.get_model('agendamento', 'Cliente')
+    Agendamento = apps.get_model('agendamento', 'Agendamento')
+    AgendamentoArquivado = apps.get_model('agendamento', 'AgendamentoArquivado')
+    decimal = models.DecimalField(max_digits=11, decimal_places=2)
+
+    def agregado(modelo, status, expressao, output_field, **filtros):
+        return Subquery(
+            modelo.objects.filter(
+                cliente_id=OuterRef('pk'),
+                status=status,
+                **filtros
+            ).values('cliente_id').annotate(resultado=expressao).values('resultado'),
+            output_field=output_field
+        )
+
+    def somar(expressao_ativos, expressao_arquivados, output_field, zero):
+        return (
+            Coalesce(agregado(Agendamento, CONCLUIDO, expressao_ativos, output_field, ativo=True), zero) +
+            Coalesce(agregado(AgendamentoArquivado, CONCLUIDO, expressao_arquivados, output_field), zero)
+        )
+
+    ultima_ativos = agregado(
+        Agendamento, CONCLUIDO, Max('servico_funcionario_horario__data_horario__data_horario'),
+        models.DateTimeField(), ativo=True
+    )
+    ultima_arquivados = agregado(AgendamentoArquivado, CONCLUIDO, Max('data_horario'), models.DateTimeField())
+
+    Cliente.objects.update(
+        valor_vitalicio=somar(Sum('valor_total'), Sum('valor_total'), decimal, Value(0, output_field=decimal)),
+        total_visitas=somar(Count('id'), Count('id'), IntegerField(), Value(0)),
+        ultima_visita=Greatest(
+            Coalesce(ultima_ativos, ultima_arquivados),
+            Coalesce(ultima_arquivados, ultima_ativos)
+        ),
+        valor_agendado_futuro=Coalesce(
+            agregado(
+                Agendamento, AGENDADO, Sum('valor_total'), decimal, ativo=True,
+                servico_funcionario_horario__data_horario__data_horario__gte=timezone.now()
+            ),
+            Value(0, output_field=decimal)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0006_agendamento_valor_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='total_visitas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Visitas'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='ultima_visita',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Última Visita'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='valor_agendado_futuro',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Soma dos agendamentos com status Agendado em horários futuros.', max_digits=11, verbose_name='Valor Agendado'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='valor_vitalicio',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=11, verbose_name='Valor Vitalício'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['valor_vitalicio'], name='cliente_valor_vitalicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['ultima_visita'], name='cliente_ultima_visita_idx'),
+        ),
+        migrations.RunPython(preencher_indicadores, migrations.RunPython.noop),
+    ]
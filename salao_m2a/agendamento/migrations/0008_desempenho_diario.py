@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0007_indicadores_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DesempenhoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('agendados', models.PositiveIntegerField(default=0, help_text='Total de agendamentos do dia, em qualquer status.', verbose_name='Agendamentos')),
+                ('concluidos', models.PositiveIntegerField(default=0, verbose_name='Concluídos')),
+                ('cancelados', models.PositiveIntegerField(default=0, verbose_name='Cancelados')),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=11, verbose_name='Receita')),
+                ('data_calculo', models.DateTimeField(verbose_name='Calculado em')),
+            ],
+            options={
+                'verbose_name': 'Desempenho Diário',
+                'verbose_name_plural': 'Desempenho Diário',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['data_atualizacao'], name='agendamento_atualizacao_idx'),
+        ),
+        migrations.AddField(
+            model_name='desempenhodiario',
+            name='funcionario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='agendamento.funcionario', verbose_name='Funcionário'),
+        ),
+        migrations.AddIndex(
+            model_name='desempenhodiario',
+            index=models.Index(fields=['data', 'funcionario'], name='desempenho_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='desempenhodiario',
+            index=models.Index(fields=['data_calculo'], name='desempenho_calculo_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='desempenhodiario',
+            constraint=models.UniqueConstraint(fields=('funcionario', 'data'), name='desempenho_funcionario_data_unico'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0008_desempenho_diario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FechamentoAgendamentos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(choices=[('COMANDO', 'Comando'), ('AGENDADO', 'Execução Agendada'), ('ADMIN', 'Admin')], max_length=20, verbose_name='Origem')),
+                ('limite', models.DateTimeField(verbose_name='Horários Até')),
+                ('status', models.CharField(choices=[('AGENDADO', 'Agendado'), ('CONCLUIDO', 'Concluído'), ('CANCELADO', 'Cancelado')], max_length=20, verbose_name='Novo Status')),
+                ('alterados', models.PositiveIntegerField(default=0, verbose_name='Agendamentos Alterados')),
+                ('lotes', models.PositiveIntegerField(default=0, verbose_name='Lotes')),
+                ('dias_recalculados', models.PositiveIntegerField(blank=True, help_text='Dias do agregado de desempenho recalculados ao final do fechamento.', null=True, verbose_name='Dias Recalculados')),
+                ('data_inicio', models.DateTimeField(auto_now_add=True, verbose_name='Início')),
+                ('data_fim', models.DateTimeField(blank=True, help_text='Vazio enquanto o fechamento está em andamento ou quando foi interrompido.', null=True, verbose_name='Fim')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Fechamento de Agendamentos',
+                'verbose_name_plural': 'Fechamentos de Agendamentos',
+                'indexes': [models.Index(fields=['data_inicio'], name='fechamento_inicio_idx')],
+            },
+        ),
+    ]
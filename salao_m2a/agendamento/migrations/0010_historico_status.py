@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+CODIGOS_STATUS = {'AGENDADO': 1, 'CONCLUIDO': 2, 'CANCELADO': 3}
+
+
+def registrar_estado_inicial(apps, schema_editor):
+    """
+    Inicia o histórico a partir do estado atual. Cada agendamento recebe a criação (como Agendado, na data de cadastro)
+    e, se o status atual for outro, a mudança para ele na data da última atualização. Cada agendamento arquivado recebe
+    uma única linha com o status final, no horário do atendimento, já que as datas originais não foram guardadas.
+    """
+
+    Agendamento = apps.get_model('agendamento', 'Agendamento')
+    AgendamentoArquivado = apps.get_model('agendamento', 'AgendamentoArquivado')
+    TransicaoStatus = apps.get_model('agendamento', 'TransicaoStatus')
+
+    def transicoes():
+        for pk, status, cadastro, atualizacao in Agendamento.objects.order_by('pk').values_list(
+            'pk', 'status', 'data_cadastro', 'data_atualizacao'
+        ).iterator(chunk_size=2000):
+            yield TransicaoStatus(agendamento_id=pk, para=CODIGOS_STATUS['AGENDADO'], momento=cadastro)
+            if status != 'AGENDADO':
+                yield TransicaoStatus(agendamento_id=pk, de=CODIGOS_STATUS['AGENDADO'],
+                                      para=CODIGOS_STATUS[status], momento=atualizacao)
+
+        for id_original, status, horario in AgendamentoArquivado.objects.order_by('pk').values_list(
+            'id_original', 'status', 'data_horario'
+        ).iterator(chunk_size=2000):
+            yield TransicaoStatus(agendamento_id=id_original, para=CODIGOS_STATUS[status], momento=horario)
+
+    lote = []
+    for transicao in transicoes():
+        lote.append(transicao)
+        if len(lote) == 2000:
+            TransicaoStatus.objects.bulk_create(lote)
+            lote = []
+    TransicaoStatus.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0009_fechamento_agendamentos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransicaoStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agendamento_id', models.BigIntegerField(verbose_name='ID do Agendamento')),
+                ('de', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Agendado'), (2, 'Concluído'), (3, 'Cancelado')], null=True, verbose_name='Status Anterior')),
+                ('para', models.PositiveSmallIntegerField(choices=[(1, 'Agendado'), (2, 'Concluído'), (3, 'Cancelado')], verbose_name='Novo Status')),
+                ('momento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Momento')),
+                ('usuario', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Transição de Status',
+                'verbose_name_plural': 'Transições de Status',
+                'indexes': [models.Index(fields=['momento'], name='transicao_momento_idx'), models.Index(fields=['agendamento_id', 'momento'], name='transicao_agendamento_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_estado_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0010_historico_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListaEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('data_cadastro', models.DateTimeField(auto_now_add=True, verbose_name='Data de Cadastro')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+                ('inicio', models.DateTimeField(verbose_name='A partir de')),
+                ('fim', models.DateTimeField(verbose_name='Até')),
+                ('prioridade', models.PositiveSmallIntegerField(default=0, help_text='Pedidos com prioridade maior recebem as vagas primeiro; entre iguais, o mais antigo.', verbose_name='Prioridade')),
+                ('situacao', models.CharField(choices=[('AGUARDANDO', 'Aguardando'), ('OFERTADO', 'Vaga Ofertada'), ('ATENDIDO', 'Atendido'), ('RECUSADO', 'Recusado'), ('EXPIRADO', 'Expirado')], default='AGUARDANDO', editable=False, max_length=20, verbose_name='Situação')),
+                ('oferta_expira_em', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Oferta Válida Até')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='agendamento.cliente', verbose_name='Cliente')),
+                ('funcionario', models.ForeignKey(blank=True, help_text='Deixe em branco para aceitar qualquer funcionário que realize o serviço.', null=True, on_delete=django.db.models.deletion.PROTECT, to='agendamento.funcionario', verbose_name='Funcionário')),
+                ('servico', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='agendamento.servico', verbose_name='Serviço')),
+                ('vaga_ofertada', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ofertas', to='agendamento.servicofuncionariohorario', verbose_name='Vaga Ofertada')),
+            ],
+            options={
+                'verbose_name': 'Pedido da Lista de Espera',
+                'verbose_name_plural': 'Lista de Espera',
+                'indexes': [models.Index(condition=models.Q(('ativo', True), ('situacao', 'AGUARDANDO')), fields=['servico', '-prioridade', 'data_cadastro'], name='espera_fila_idx'), models.Index(condition=models.Q(('ativo', True), ('situacao', 'OFERTADO')), fields=['oferta_expira_em'], name='espera_oferta_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamento', '0011_lista_espera'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_ativo_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='funcionario',
+            name='funcionario_ativo_idx',
+        ),
+    ]
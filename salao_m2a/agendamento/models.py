@@ -1,7 +1,20 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import RegexValidator
+from django.utils import timezone
+
+from .choices import CodigoStatus, OrigemFechamento, SituacaoEspera, StatusAgendamento
+
+
+class AtivoManager(models.Manager):
+    """
+    Manager que retorna apenas os registros ativos, aproveitando os índices parciais sobre 'ativo=True' definidos em
+    cada modelo.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(ativo=True)
 
-from .choices import StatusAgendamento
 
 class BaseModel(models.Model):
     """
@@ -22,6 +35,9 @@ class BaseModel(models.Model):
         auto_now=True
     )
 
+    objects = models.Manager()
+    ativos = AtivoManager()
+
     class Meta:
         abstract = True
 
@@ -72,6 +88,9 @@ class Pessoa(BaseModel):
     class Meta:
         verbose_name = 'Pessoa'
         verbose_name_plural = 'Pessoas'
+        indexes = [
+            models.Index(fields=['nome_completo'], condition=models.Q(ativo=True), name='pessoa_nome_ativo_idx'),
+        ]
 
     def __str__(self):
         return self.nome_e_sobrenome
@@ -99,9 +118,41 @@ class Cliente(BaseModel):
         on_delete=models.PROTECT
     )
 
+    # Indicadores acumulados, mantidos pelo módulo 'indicadores' para permitir ordenar e filtrar sem agregações
+    valor_vitalicio = models.DecimalField(
+        verbose_name='Valor Vitalício',
+        max_digits=11,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+    total_visitas = models.PositiveIntegerField(
+        verbose_name='Visitas',
+        default=0,
+        editable=False
+    )
+    ultima_visita = models.DateTimeField(
+        verbose_name='Última Visita',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    valor_agendado_futuro = models.DecimalField(
+        verbose_name='Valor Agendado',
+        max_digits=11,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text='Soma dos agendamentos com status Agendado em horários futuros.'
+    )
+
     class Meta:
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
+        indexes = [
+            models.Index(fields=['valor_vitalicio'], name='cliente_valor_vitalicio_idx'),
+            models.Index(fields=['ultima_visita'], name='cliente_ultima_visita_idx'),
+        ]
 
     def __str__(self):
         return self.pessoa.nome_e_sobrenome
@@ -123,6 +174,11 @@ class Servico(BaseModel):
         default=30
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['nome_servico'], condition=models.Q(ativo=True), name='servico_nome_ativo_idx'),
+        ]
+
     def __str__(self):
         return self.nome_servico
 
@@ -146,11 +202,17 @@ class Funcionario(BaseModel):
 class DataHorario(BaseModel):
     """Armazena um timestamp específico para um possível agendamento."""
     data_horario = models.DateTimeField(
-        verbose_name='Data'
+        verbose_name='Data',
+        unique=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_horario'], condition=models.Q(ativo=True), name='datahorario_ativo_idx'),
+        ]
+
     def __str__(self):
-        return self.data_horario.strftime("%d/%m/%Y %H:%M")
+        return timezone.localtime(self.data_horario).strftime("%d/%m/%Y %H:%M")
 
 
 class ServicoFuncionarioHorario(BaseModel):
@@ -179,11 +241,29 @@ class ServicoFuncionarioHorario(BaseModel):
         unique_together = ('funcionario', 'data_horario')
         verbose_name = 'Vaga de Atendimento'
         verbose_name_plural = 'Vagas de Atendimento'
+        indexes = [
+            models.Index(fields=['data_horario', 'funcionario'], condition=models.Q(ativo=True), name='vaga_data_ativo_idx'),
+        ]
 
     def __str__(self):
         nomes_servicos = ", ".join([s.nome_servico for s in self.servico.all()])
         return f'{self.funcionario} - {self.data_horario} - Serviços: {nomes_servicos}'
 
+    @classmethod
+    def valores_totais(cls, vagas_ids=None):
+        """
+        Retorna um dicionário {id da vaga: soma dos valores dos seus serviços}, calculado em uma única consulta sobre a
+        tabela intermediária. Sem 'vagas_ids', considera todas as vagas.
+        """
+
+        servicos_das_vagas = cls.servico.through.objects.all()
+        if vagas_ids is not None:
+            servicos_das_vagas = servicos_das_vagas.filter(servicofuncionariohorario_id__in=vagas_ids)
+
+        return dict(servicos_das_vagas.values('servicofuncionariohorario_id').annotate(
+            total=models.Sum('servico__valor')
+        ).values_list('servicofuncionariohorario_id', 'total'))
+
 
 class Agendamento(BaseModel):
     """
@@ -210,6 +290,356 @@ class Agendamento(BaseModel):
         default=StatusAgendamento.AGENDADO,
     )
 
+    valor_total = models.DecimalField(
+        verbose_name='Valor Total',
+        max_digits=9,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text='Soma dos valores dos serviços da vaga no momento do agendamento.'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'servico_funcionario_horario'],
+                condition=models.Q(ativo=True),
+                name='agendamento_status_ativo_idx'
+            ),
+            models.Index(fields=['data_atualizacao'], name='agendamento_atualizacao_idx'),
+        ]
+
     def __str__(self):
         nome_cliente = self.cliente.pessoa.nome_e_sobrenome if self.cliente else "Cliente Removido"
-        return f"{nome_cliente} - {self.servico_funcionario_horario}"
\ No newline at end of file
+        return f"{nome_cliente} - {self.servico_funcionario_horario}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._vaga_original_id = instancia.__dict__.get('servico_funcionario_horario_id')
+        instancia._cliente_original_id = instancia.__dict__.get('cliente_id')
+        instancia._status_original = instancia.__dict__.get('status')
+        return instancia
+
+    def save(self, *args, **kwargs):
+        """
+        Registra em 'valor_total' o preço dos serviços da vaga ao criar o agendamento ou ao trocá-lo de vaga. Depois
+        disso o valor não acompanha alterações no preço dos serviços, preservando o histórico. Inserções em massa
+        ('bulk_create') não passam por aqui e devem preencher o campo com ServicoFuncionarioHorario.valores_totais.
+        """
+
+        vaga_id = self.__dict__.get('servico_funcionario_horario_id')
+        if vaga_id and (self._state.adding or vaga_id != getattr(self, '_vaga_original_id', None)):
+            self.valor_total = ServicoFuncionarioHorario.valores_totais([vaga_id]).get(vaga_id) or 0
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'valor_total'}
+
+        super().save(*args, **kwargs)
+        self._vaga_original_id = vaga_id
+        self._cliente_original_id = self.__dict__.get('cliente_id')
+        self._status_original = self.__dict__.get('status')
+
+class AgendamentoArquivado(models.Model):
+    """
+    Cópia compacta e imutável de um Agendamento já encerrado (Concluído ou Cancelado) cujo horário ficou no passado.
+    Mantém apenas o necessário para relatórios e métricas, permitindo remover a vaga e o horário das tabelas quentes.
+    """
+    id_original = models.BigIntegerField(
+        verbose_name='ID do Agendamento',
+        unique=True
+    )
+    cliente = models.ForeignKey(
+        Cliente,
+        verbose_name='Cliente',
+        on_delete=models.SET_NULL,
+        null=True
+    )
+    funcionario = models.ForeignKey(
+        Funcionario,
+        verbose_name='Funcionário',
+        on_delete=models.PROTECT
+    )
+    data_horario = models.DateTimeField(
+        verbose_name='Data'
+    )
+    servicos = models.CharField(
+        verbose_name='Serviço(s)',
+        max_length=500,
+        blank=True
+    )
+    valor_total = models.DecimalField(
+        verbose_name='Valor Total',
+        max_digits=9,
+        decimal_places=2
+    )
+    status = models.CharField(
+        verbose_name='Status',
+        max_length=20,
+        choices=StatusAgendamento.choices
+    )
+    data_arquivamento = models.DateTimeField(
+        verbose_name='Data de Arquivamento',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Agendamento Arquivado'
+        verbose_name_plural = 'Agendamentos Arquivados'
+        indexes = [
+            models.Index(fields=['status', 'data_horario'], name='arquivado_status_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.funcionario} - {self.data_horario:%d/%m/%Y %H:%M} - {self.get_status_display()}"
+
+
+class DesempenhoDiario(models.Model):
+    """
+    Agregado diário de agendamentos por funcionário (quantidades por status e receita dos concluídos), incluindo os
+    arquivados. É mantido pelo módulo 'desempenho' e consultado pelo painel de desempenho, de modo que as séries
+    históricas não precisem percorrer a tabela de agendamentos.
+    """
+    funcionario = models.ForeignKey(
+        Funcionario,
+        verbose_name='Funcionário',
+        on_delete=models.CASCADE
+    )
+    data = models.DateField(
+        verbose_name='Data'
+    )
+    agendados = models.PositiveIntegerField(
+        verbose_name='Agendamentos',
+        default=0,
+        help_text='Total de agendamentos do dia, em qualquer status.'
+    )
+    concluidos = models.PositiveIntegerField(
+        verbose_name='Concluídos',
+        default=0
+    )
+    cancelados = models.PositiveIntegerField(
+        verbose_name='Cancelados',
+        default=0
+    )
+    receita = models.DecimalField(
+        verbose_name='Receita',
+        max_digits=11,
+        decimal_places=2,
+        default=0
+    )
+    data_calculo = models.DateTimeField(
+        verbose_name='Calculado em'
+    )
+
+    class Meta:
+        verbose_name = 'Desempenho Diário'
+        verbose_name_plural = 'Desempenho Diário'
+        constraints = [
+            models.UniqueConstraint(fields=['funcionario', 'data'], name='desempenho_funcionario_data_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['data', 'funcionario'], name='desempenho_data_idx'),
+            models.Index(fields=['data_calculo'], name='desempenho_calculo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.funcionario} - {self.data:%d/%m/%Y}"
+
+    @property
+    def taxa_conclusao(self):
+        """Percentual de agendamentos concluídos entre os que já foram encerrados (concluídos ou cancelados)."""
+
+        encerrados = self.concluidos + self.cancelados
+        return round(100 * self.concluidos / encerrados, 1) if encerrados else None
+
+
+class FechamentoAgendamentos(models.Model):
+    """
+    Registro de uma execução do fechamento de agendamentos (veja o módulo 'transicoes'): até que horário os
+    agendamentos ainda 'Agendado' foram fechados, com qual status, quem disparou a execução e quantos foram alterados.
+    """
+    origem = models.CharField(
+        verbose_name='Origem',
+        max_length=20,
+        choices=OrigemFechamento.choices
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name='Usuário',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    limite = models.DateTimeField(
+        verbose_name='Horários Até'
+    )
+    status = models.CharField(
+        verbose_name='Novo Status',
+        max_length=20,
+        choices=StatusAgendamento.choices
+    )
+    alterados = models.PositiveIntegerField(
+        verbose_name='Agendamentos Alterados',
+        default=0
+    )
+    lotes = models.PositiveIntegerField(
+        verbose_name='Lotes',
+        default=0
+    )
+    dias_recalculados = models.PositiveIntegerField(
+        verbose_name='Dias Recalculados',
+        null=True,
+        blank=True,
+        help_text='Dias do agregado de desempenho recalculados ao final do fechamento.'
+    )
+    data_inicio = models.DateTimeField(
+        verbose_name='Início',
+        auto_now_add=True
+    )
+    data_fim = models.DateTimeField(
+        verbose_name='Fim',
+        null=True,
+        blank=True,
+        help_text='Vazio enquanto o fechamento está em andamento ou quando foi interrompido.'
+    )
+
+    class Meta:
+        verbose_name = 'Fechamento de Agendamentos'
+        verbose_name_plural = 'Fechamentos de Agendamentos'
+        indexes = [
+            models.Index(fields=['data_inicio'], name='fechamento_inicio_idx'),
+        ]
+
+    def __str__(self):
+        return f"{timezone.localtime(self.data_inicio):%d/%m/%Y %H:%M} - {self.get_origem_display()}"
+
+
+class TransicaoStatus(models.Model):
+    """
+    Linha do histórico de status dos agendamentos (veja o módulo 'historico'), que só recebe inserções. O agendamento é
+    guardado pelo id, sem chave estrangeira, para que o histórico sobreviva ao arquivamento e à exclusão, e os status
+    como códigos de CodigoStatus; 'de' vazio indica a criação do agendamento.
+    """
+    agendamento_id = models.BigIntegerField(
+        verbose_name='ID do Agendamento'
+    )
+    de = models.PositiveSmallIntegerField(
+        verbose_name='Status Anterior',
+        choices=CodigoStatus.choices,
+        null=True,
+        blank=True
+    )
+    para = models.PositiveSmallIntegerField(
+        verbose_name='Novo Status',
+        choices=CodigoStatus.choices
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name='Usuário',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='+'
+    )
+    momento = models.DateTimeField(
+        verbose_name='Momento',
+        default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'Transição de Status'
+        verbose_name_plural = 'Transições de Status'
+        indexes = [
+            models.Index(fields=['momento'], name='transicao_momento_idx'),
+            models.Index(fields=['agendamento_id', 'momento'], name='transicao_agendamento_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.agendamento_id}: {self.get_de_display() or '-'} -> {self.get_para_display()}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('O histórico de status só recebe inserções; uma transição não pode ser alterada.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('O histórico de status só recebe inserções; uma transição não pode ser excluída.')
+
+
+class ListaEspera(BaseModel):
+    """
+    Pedido de um Cliente por uma vaga de um Serviço dentro de uma janela de horários, opcionalmente com um Funcionário
+    específico. Quando uma vaga compatível é liberada por um cancelamento, ela é ofertada ao pedido de maior prioridade
+    e, entre iguais, ao mais antigo (veja o módulo 'lista_espera').
+    """
+    cliente = models.ForeignKey(
+        Cliente,
+        verbose_name='Cliente',
+        on_delete=models.CASCADE
+    )
+    servico = models.ForeignKey(
+        Servico,
+        verbose_name='Serviço',
+        on_delete=models.PROTECT
+    )
+    funcionario = models.ForeignKey(
+        Funcionario,
+        verbose_name='Funcionário',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        help_text='Deixe em branco para aceitar qualquer funcionário que realize o serviço.'
+    )
+    inicio = models.DateTimeField(
+        verbose_name='A partir de'
+    )
+    fim = models.DateTimeField(
+        verbose_name='Até'
+    )
+    prioridade = models.PositiveSmallIntegerField(
+        verbose_name='Prioridade',
+        default=0,
+        help_text='Pedidos com prioridade maior recebem as vagas primeiro; entre iguais, o mais antigo.'
+    )
+    situacao = models.CharField(
+        verbose_name='Situação',
+        max_length=20,
+        choices=SituacaoEspera.choices,
+        default=SituacaoEspera.AGUARDANDO,
+        editable=False
+    )
+    vaga_ofertada = models.ForeignKey(
+        ServicoFuncionarioHorario,
+        verbose_name='Vaga Ofertada',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='ofertas'
+    )
+    oferta_expira_em = models.DateTimeField(
+        verbose_name='Oferta Válida Até',
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    class Meta:
+        verbose_name = 'Pedido da Lista de Espera'
+        verbose_name_plural = 'Lista de Espera'
+        indexes = [
+            # Fila de cada serviço na ordem em que as vagas são ofertadas; só os pedidos aguardando entram no índice
+            models.Index(
+                fields=['servico', '-prioridade', 'data_cadastro'],
+                condition=models.Q(ativo=True, situacao=SituacaoEspera.AGUARDANDO),
+                name='espera_fila_idx'
+            ),
+            models.Index(
+                fields=['oferta_expira_em'],
+                condition=models.Q(ativo=True, situacao=SituacaoEspera.OFERTADO),
+                name='espera_oferta_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente} - {self.servico}"
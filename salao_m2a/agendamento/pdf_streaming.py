@@ -0,0 +1,136 @@
+"""
+Escritor mínimo de PDF que emite o documento em pedaços, página a página. Diferente do ReportLab e do xhtml2pdf, que
+montam o arquivo inteiro em memória antes de salvá-lo, aqui cada página é escrita assim que fica pronta e apenas os
+deslocamentos dos objetos (alguns bytes por página) são guardados até o final, para a tabela de referências (xref).
+
+Usa apenas as fontes padrão Helvetica e Helvetica-Bold, com codificação WinAnsi, suficientes para textos em português.
+"""
+
+import zlib
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+LARGURA_A4 = 595.28
+ALTURA_A4 = 841.89
+
+_OBJ_CATALOGO = 1
+_OBJ_PAGINAS = 2
+_OBJ_FONTE = 3
+_OBJ_FONTE_NEGRITO = 4
+_PRIMEIRO_OBJ_LIVRE = 5
+
+
+def _escapar(texto):
+    """Converte o texto para WinAnsi e escapa os caracteres especiais de strings literais do PDF."""
+
+    dados = texto.encode('cp1252', errors='replace')
+    return dados.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def largura_texto(texto, tamanho, negrito=False):
+    """Largura, em pontos, do texto na fonte Helvetica (ou Helvetica-Bold) no tamanho informado."""
+
+    return stringWidth(texto, 'Helvetica-Bold' if negrito else 'Helvetica', tamanho)
+
+
+def ajustar_texto(texto, largura_maxima, tamanho, negrito=False):
+    """Corta o texto, acrescentando reticências, para que caiba na largura informada."""
+
+    if largura_texto(texto, tamanho, negrito) <= largura_maxima:
+        return texto
+
+    while texto and largura_texto(texto + '...', tamanho, negrito) > largura_maxima:
+        texto = texto[:-1]
+    return texto + '...'
+
+
+class PaginaPDF:
+    """Acumula os comandos de desenho de uma única página."""
+
+    def __init__(self):
+        self._comandos = []
+
+    def texto(self, x, y, texto, tamanho=9, negrito=False, alinhamento='esquerda'):
+        if alinhamento == 'direita':
+            x -= largura_texto(texto, tamanho, negrito)
+        elif alinhamento == 'centro':
+            x -= largura_texto(texto, tamanho, negrito) / 2
+
+        fonte = b'F2' if negrito else b'F1'
+        self._comandos.append(
+            b'BT /%s %.1f Tf %.2f %.2f Td (%s) Tj ET' % (fonte, tamanho, x, y, _escapar(texto))
+        )
+
+    def linha(self, x1, y1, x2, y2, cinza=0.8):
+        self._comandos.append(b'%.2f G %.2f %.2f m %.2f %.2f l S' % (cinza, x1, y1, x2, y2))
+
+    def conteudo(self):
+        return b'\n'.join(self._comandos)
+
+
+class DocumentoPDFStreaming:
+    """
+    Gera um documento PDF a partir de um iterável de PaginaPDF, devolvendo um iterador de bytes que pode ser enviado
+    diretamente em um StreamingHttpResponse.
+    """
+
+    def __init__(self, titulo=''):
+        self.titulo = titulo
+        self._posicao = 0
+        self._deslocamentos = {}
+
+    def _emitir(self, dados):
+        self._posicao += len(dados)
+        return dados
+
+    def _objeto(self, numero, corpo):
+        self._deslocamentos[numero] = self._posicao
+        return self._emitir(b'%d 0 obj\n%s\nendobj\n' % (numero, corpo))
+
+    def gerar(self, paginas):
+        yield self._emitir(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+        for numero, nome in ((_OBJ_FONTE, b'Helvetica'), (_OBJ_FONTE_NEGRITO, b'Helvetica-Bold')):
+            yield self._objeto(
+                numero,
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % nome
+            )
+
+        proximo = _PRIMEIRO_OBJ_LIVRE
+        filhas = []
+        for pagina in paginas:
+            conteudo = zlib.compress(pagina.conteudo())
+            yield self._objeto(
+                proximo,
+                b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(conteudo), conteudo)
+            )
+            yield self._objeto(
+                proximo + 1,
+                b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] '
+                b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>' % (
+                    _OBJ_PAGINAS, LARGURA_A4, ALTURA_A4, _OBJ_FONTE, _OBJ_FONTE_NEGRITO, proximo
+                )
+            )
+            filhas.append(proximo + 1)
+            proximo += 2
+
+        yield self._objeto(
+            _OBJ_PAGINAS,
+            b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                b' '.join(b'%d 0 R' % filha for filha in filhas), len(filhas)
+            )
+        )
+        yield self._objeto(_OBJ_CATALOGO, b'<< /Type /Catalog /Pages %d 0 R >>' % _OBJ_PAGINAS)
+
+        obj_info = proximo
+        yield self._objeto(obj_info, b'<< /Title (%s) /Producer (salao_m2a) >>' % _escapar(self.titulo))
+
+        inicio_xref = self._posicao
+        entradas = [b'0000000000 65535 f \n']
+        entradas.extend(b'%010d 00000 n \n' % self._deslocamentos[numero] for numero in range(1, obj_info + 1))
+        yield self._emitir(
+            b'xref\n0 %d\n%s' % (obj_info + 1, b''.join(entradas)) +
+            b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+                obj_info + 1, _OBJ_CATALOGO, obj_info, inicio_xref
+            )
+        )
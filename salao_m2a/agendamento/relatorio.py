@@ -0,0 +1,174 @@
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .agregacao import particionar_por_funcionario, reduzir_linhas, combinar_parciais
+from .choices import StatusAgendamento
+from .historico import ids_com_status_em
+from .models import Agendamento, AgendamentoArquivado, Funcionario
+
+
+def filtro_concluidos(campo_id, em=None):
+    """
+    Filtra os agendamentos concluídos: pelo status atual ou, com 'em', pelo status que tinham nesse momento segundo o
+    histórico de status. 'campo_id' é o campo com o id do agendamento ('pk' ou 'id_original', nos arquivados).
+    """
+
+    if em is None:
+        return Q(status=StatusAgendamento.CONCLUIDO)
+    return Q(**{f'{campo_id}__in': ids_com_status_em(em, StatusAgendamento.CONCLUIDO)})
+
+
+def buscar_linhas_relatorio(data_inicio, data_fim, em=None):
+    """
+    Etapa de busca do relatório: retorna, como tuplas simples, os agendamentos concluídos no período (incluindo os
+    arquivados), no formato esperado pelas funções de 'agregacao'. O valor vem da coluna 'valor_total' de cada
+    agendamento, sem junção com os serviços. Com 'em', considera os concluídos naquele momento (veja filtro_concluidos).
+    """
+
+    linhas = list(Agendamento.ativos.filter(
+        filtro_concluidos('pk', em),
+        servico_funcionario_horario__data_horario__data_horario__gte=data_inicio,
+        servico_funcionario_horario__data_horario__data_horario__lte=data_fim
+    ).values_list(
+        'servico_funcionario_horario__funcionario_id',
+        'servico_funcionario_horario__funcionario__pessoa__nome_completo',
+        'pk',
+        'valor_total'
+    ).order_by())
+
+    # Agendamentos arquivados deixam de existir na tabela principal, então o ID original não se repete
+    linhas.extend(AgendamentoArquivado.objects.filter(
+        filtro_concluidos('id_original', em),
+        data_horario__gte=data_inicio,
+        data_horario__lte=data_fim
+    ).values_list(
+        'funcionario_id',
+        'funcionario__pessoa__nome_completo',
+        'id_original',
+        'valor_total'
+    ).order_by())
+
+    return linhas
+
+
+def reduzir(linhas, modo=None, processos=None, minimo_linhas_paralelo=None):
+    """
+    Etapa de redução do relatório. No modo 'paralelo', as linhas são particionadas por funcionário e reduzidas em um
+    pool de processos, e os parciais são combinados ao final; no modo 'serial', tudo é reduzido no processo atual.
+    Volumes abaixo de RELATORIO_MINIMO_LINHAS_PARALELO são sempre reduzidos em série.
+    """
+
+    modo = modo or settings.RELATORIO_MODO
+    processos = processos or settings.RELATORIO_PROCESSOS or os.cpu_count() or 1
+    if minimo_linhas_paralelo is None:
+        minimo_linhas_paralelo = settings.RELATORIO_MINIMO_LINHAS_PARALELO
+
+    if modo != 'paralelo' or processos < 2 or len(linhas) < minimo_linhas_paralelo:
+        return combinar_parciais([reduzir_linhas(linhas)])
+
+    particoes = particionar_por_funcionario(linhas, processos)
+    with ProcessPoolExecutor(max_workers=min(processos, len(particoes))) as executor:
+        parciais = list(executor.map(reduzir_linhas, particoes))
+
+    return combinar_parciais(parciais)
+
+
+def calcular_relatorio(data_inicio, data_fim, modo=None, processos=None, em=None):
+    """
+    Executa as duas etapas do relatório e retorna uma tupla com os dados por funcionário, o total de serviços
+    concluídos e o total de ganhos do período. Com 'em', o relatório reflete a situação dos agendamentos naquele
+    momento.
+    """
+
+    funcionarios_data = reduzir(buscar_linhas_relatorio(data_inicio, data_fim, em), modo, processos)
+    total_concluidos = sum(dados['concluidos'] for dados in funcionarios_data.values())
+    total_geral_ganhos = sum(dados['ganhos'] for dados in funcionarios_data.values())
+
+    return funcionarios_data, total_concluidos, total_geral_ganhos
+
+
+def ordem_dos_funcionarios(campo):
+    """
+    Retorna uma expressão com a posição de cada funcionário (inclusive os inativos) na ordem alfabética do nome e, entre
+    homônimos, do id, calculada em Python. 'campo' é o caminho até o id do funcionário. Ordenar as consultas por ela,
+    em vez do nome, garante que o banco e o heapq.merge usem a mesma ordem, qualquer que seja a collation do banco.
+    """
+
+    funcionarios = sorted(
+        Funcionario.objects.values_list('pk', 'pessoa__nome_completo'),
+        key=lambda funcionario: (funcionario[1], funcionario[0])
+    )
+    return Case(
+        *[When(**{campo: pk}, then=Value(posicao)) for posicao, (pk, _) in enumerate(funcionarios)],
+        default=Value(len(funcionarios)),
+        output_field=IntegerField()
+    )
+
+
+def buscar_linhas_detalhe(data_inicio, data_fim, tamanho_lote=2000, em=None):
+    """
+    Etapa de busca do relatório detalhado: gera, sem carregar tudo em memória, uma tupla (id_funcionario,
+    nome_funcionario, data_horario, nome_cliente, servicos, valor) por agendamento concluído no período, ordenadas por
+    funcionário (nome e id, veja ordem_dos_funcionarios) e horário. Os agendamentos ativos são lidos com um cursor no
+    servidor e intercalados com os arquivados. Com 'em', considera os concluídos naquele momento. As consultas só são
+    feitas quando a primeira linha é pedida.
+    """
+
+    agendamentos = Agendamento.ativos.filter(
+        filtro_concluidos('pk', em),
+        servico_funcionario_horario__data_horario__data_horario__gte=data_inicio,
+        servico_funcionario_horario__data_horario__data_horario__lte=data_fim
+    ).annotate(
+        ordem_funcionario=ordem_dos_funcionarios('servico_funcionario_horario__funcionario_id')
+    ).values_list(
+        'ordem_funcionario',
+        'servico_funcionario_horario__funcionario_id',
+        'servico_funcionario_horario__funcionario__pessoa__nome_completo',
+        'servico_funcionario_horario__data_horario__data_horario',
+        'cliente__pessoa__nome_completo',
+        'pk',
+        'servico_funcionario_horario__servico__nome_servico',
+        'valor_total'
+    ).order_by(
+        'ordem_funcionario',
+        'servico_funcionario_horario__data_horario__data_horario',
+        'pk',
+        'servico_funcionario_horario__servico__nome_servico'
+    ).iterator(chunk_size=tamanho_lote)
+
+    def agrupar_servicos():
+        # Uma linha por serviço vem da junção com a tabela intermediária; aqui elas voltam a ser um agendamento
+        for _, linhas in groupby(agendamentos, key=lambda linha: linha[5]):
+            linhas = list(linhas)
+            ordem, funcionario_id, funcionario, data_horario, cliente = linhas[0][:5]
+            servicos = ", ".join(linha[6] for linha in linhas if linha[6])
+            yield ordem, funcionario_id, funcionario, data_horario, cliente or '', servicos, linhas[0][7]
+
+    arquivados = AgendamentoArquivado.objects.filter(
+        filtro_concluidos('id_original', em),
+        data_horario__gte=data_inicio,
+        data_horario__lte=data_fim
+    ).annotate(
+        ordem_funcionario=ordem_dos_funcionarios('funcionario_id')
+    ).values_list(
+        'ordem_funcionario',
+        'funcionario_id',
+        'funcionario__pessoa__nome_completo',
+        'data_horario',
+        'cliente__pessoa__nome_completo',
+        'servicos',
+        'valor_total'
+    ).order_by(
+        'ordem_funcionario',
+        'data_horario'
+    ).iterator(chunk_size=tamanho_lote)
+
+    arquivados = ((o, i, f, d, c or '', s, v) for o, i, f, d, c, s, v in arquivados)
+
+    for linha in heapq.merge(agrupar_servicos(), arquivados, key=lambda linha: (linha[0], linha[3])):
+        yield linha[1:]
@@ -0,0 +1,277 @@
+from abc import ABC, abstractmethod
+from io import BytesIO
+from itertools import chain, groupby
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.formats import date_format
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer
+from xhtml2pdf import pisa
+
+from .pdf_streaming import DocumentoPDFStreaming, PaginaPDF, ajustar_texto, LARGURA_A4, ALTURA_A4
+
+
+class ErroRenderizacao(Exception):
+    """Indica que o PDF do relatório não pôde ser gerado pelo renderizador."""
+
+
+class RenderizadorRelatorio(ABC):
+    """
+    Interface dos renderizadores do relatório de desempenho. Recebe o mesmo contexto usado pelo template
+    'agendamento/relatorio.html' e devolve o conteúdo do PDF em bytes.
+    """
+
+    @abstractmethod
+    def renderizar(self, contexto):
+        """Gera o PDF do relatório para o contexto informado, lançando ErroRenderizacao em caso de falha."""
+
+
+class RenderizadorXhtml2pdf(RenderizadorRelatorio):
+    """
+    Renderiza o template HTML do relatório com o xhtml2pdf. O template compilado é reaproveitado pelo carregador de
+    templates do Django, que o mantém em memória fora do modo DEBUG.
+    """
+
+    template_path = 'agendamento/relatorio.html'
+
+    def renderizar(self, contexto):
+        html = get_template(self.template_path).render(contexto)
+        result = BytesIO()
+        pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
+
+        if pdf.err:
+            raise ErroRenderizacao(pdf.err)
+
+        return result.getvalue()
+
+
+def _estilos_reportlab():
+    """Cria os estilos de parágrafo e de tabela usados pelo renderizador ReportLab."""
+
+    titulo = ParagraphStyle('titulo', fontName='Helvetica', fontSize=18, leading=22, alignment=TA_CENTER,
+                            textColor=colors.HexColor('#2c3e50'), spaceAfter=12)
+    subtitulo = ParagraphStyle('subtitulo', parent=titulo, fontSize=14, leading=18)
+    # Texto das células que podem ser longas (nomes), quebrado em linhas dentro da coluna como no template HTML
+    corpo = ParagraphStyle('corpo', fontName='Helvetica', fontSize=10, leading=12,
+                           textColor=colors.HexColor('#333333'))
+    tabela = TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica', 10),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#333333')),
+        ('PADDING', (0, 0), (-1, -1), 6),
+    ])
+    cabecalho = TableStyle([
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 10),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f2f2f2')),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+    ])
+    resumo = TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica', 12),
+        ('FONT', (1, 0), (1, -1), 'Helvetica-Bold', 12),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ])
+    return titulo, subtitulo, corpo, tabela, cabecalho, resumo
+
+
+class RenderizadorReportLab(RenderizadorRelatorio):
+    """
+    Desenha o relatório diretamente com o ReportLab, sem passar por HTML e CSS. Produz o mesmo conteúdo do template,
+    com custo que cresce apenas com a quantidade de linhas da tabela de funcionários.
+    """
+
+    def renderizar(self, contexto):
+        titulo, subtitulo, corpo, estilo_tabela, estilo_cabecalho, estilo_resumo = _estilos_reportlab()
+        rodape = f"Relatório gerado em {date_format(contexto['data_geracao'], 'd/m/Y')}"
+        if contexto.get('data_posicao'):
+            rodape += f" - situação em {date_format(contexto['data_posicao'], 'd/m/Y')}"
+
+        def desenhar_rodape(canvas, documento):
+            canvas.saveState()
+            canvas.setFont('Helvetica', 8)
+            canvas.setFillColor(colors.HexColor('#777777'))
+            canvas.drawCentredString(A4[0] / 2, 0.75 * cm, rodape)
+            canvas.restoreState()
+
+        linhas = [['Funcionário', 'Serviços Concluídos', 'Ganhos Gerados']]
+        linhas.extend(
+            [Paragraph(escape(dados['nome']), corpo), dados['concluidos'], f"R$ {dados['ganhos']:.2f}"]
+            for dados in contexto['funcionarios_data'].values()
+        )
+        vazio = len(linhas) == 1
+        if vazio:
+            linhas.append([Paragraph('Nenhum serviço concluído encontrado para os filtros aplicados.', corpo), '', ''])
+
+        largura = A4[0] - 3 * cm
+        tabela_resumo = Table([
+            ['Total de Serviços Concluídos no Período:', contexto['total_concluidos']],
+            ['Ganhos Totais no Período:', f"R$ {contexto['total_geral_ganhos']:.2f}"],
+        ], colWidths=[largura * 0.7, largura * 0.3])
+        tabela_resumo.setStyle(estilo_tabela)
+        tabela_resumo.setStyle(estilo_resumo)
+
+        tabela_funcionarios = Table(linhas, colWidths=[largura * 0.5, largura * 0.25, largura * 0.25], repeatRows=1)
+        tabela_funcionarios.setStyle(estilo_tabela)
+        tabela_funcionarios.setStyle(estilo_cabecalho)
+        if vazio:
+            tabela_funcionarios.setStyle(TableStyle([('SPAN', (0, 1), (-1, 1))]))
+
+        periodo = (
+            f"{date_format(contexto['data_inicio'], 'd/m/Y')} a {date_format(contexto['data_fim'], 'd/m/Y')}"
+        )
+        result = BytesIO()
+        documento = SimpleDocTemplate(
+            result,
+            pagesize=A4,
+            leftMargin=1.5 * cm,
+            rightMargin=1.5 * cm,
+            topMargin=1.5 * cm,
+            bottomMargin=1.5 * cm,
+            title='Relatório de Serviços Concluídos'
+        )
+        documento.build(
+            [
+                Paragraph(f"Relatório de Desempenho de {periodo}", titulo),
+                Paragraph("Serviços Concluídos", subtitulo),
+                tabela_resumo,
+                Spacer(1, 0.8 * cm),
+                Paragraph("Desempenho por Funcionário", subtitulo),
+                tabela_funcionarios,
+            ],
+            onFirstPage=desenhar_rodape,
+            onLaterPages=desenhar_rodape
+        )
+
+        return result.getvalue()
+
+
+RENDERIZADORES = {
+    'xhtml2pdf': RenderizadorXhtml2pdf,
+    'reportlab': RenderizadorReportLab,
+}
+
+
+def obter_renderizador(nome=None):
+    """Retorna uma instância do renderizador informado ou, na falta dele, do definido em RELATORIO_RENDERIZADOR."""
+
+    return RENDERIZADORES[nome or settings.RELATORIO_RENDERIZADOR]()
+
+
+class RenderizadorDetalhadoStreaming:
+    """
+    Renderiza o relatório detalhado (um serviço concluído por linha, agrupado por funcionário) página a página,
+    devolvendo um iterador de bytes. Apenas a página corrente fica em memória, qualquer que seja o número de linhas.
+    """
+
+    MARGEM = 40
+    ENTRELINHA = 14
+    TAMANHO_FONTE = 8
+    # Posição x (início) e largura de cada coluna: Data/Hora, Cliente, Serviço(s) e Valor
+    COLUNAS = ((40, 70), (115, 150), (270, 210), (485, 70))
+
+    def __init__(self, data_inicio, data_fim, data_geracao, data_posicao=None):
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.data_geracao = data_geracao
+        self.rodape = f"Relatório gerado em {date_format(data_geracao, 'd/m/Y')}"
+        if data_posicao:
+            self.rodape += f" - situação em {date_format(data_posicao, 'd/m/Y')}"
+        self.titulo = (
+            f"Relatório Detalhado de {date_format(data_inicio, 'd/m/Y')} a {date_format(data_fim, 'd/m/Y')}"
+        )
+
+    def gerar(self, linhas):
+        return DocumentoPDFStreaming(self.titulo).gerar(self._paginas(linhas))
+
+    def _nova_pagina(self, numero):
+        pagina = PaginaPDF()
+        y = ALTURA_A4 - self.MARGEM
+        pagina.texto(LARGURA_A4 / 2, y, self.titulo, tamanho=14, alinhamento='centro')
+        pagina.texto(
+            LARGURA_A4 / 2,
+            self.MARGEM / 2,
+            f"Página {numero} - {self.rodape}",
+            tamanho=7,
+            alinhamento='centro'
+        )
+
+        y -= 2 * self.ENTRELINHA
+        for (x, largura), cabecalho in zip(self.COLUNAS, ('Data/Hora', 'Cliente', 'Serviço(s)', 'Valor')):
+            if cabecalho == 'Valor':
+                pagina.texto(x + largura, y, cabecalho, self.TAMANHO_FONTE, negrito=True, alinhamento='direita')
+            else:
+                pagina.texto(x, y, cabecalho, self.TAMANHO_FONTE, negrito=True)
+        pagina.linha(self.MARGEM, y - 4, LARGURA_A4 - self.MARGEM, y - 4, cinza=0.5)
+
+        return pagina, y - self.ENTRELINHA
+
+    def _paginas(self, linhas):
+        numero = 1
+        pagina, y = self._nova_pagina(numero)
+        total_geral = 0
+        total_servicos = 0
+
+        def quebrar_pagina():
+            # Se não couber mais uma linha, entrega a página cheia e começa outra
+            nonlocal pagina, y, numero
+            if y < self.MARGEM + self.ENTRELINHA:
+                yield pagina
+                numero += 1
+                pagina, y = self._nova_pagina(numero)
+
+        def escrever(texto_esquerda, texto_direita='', negrito=False):
+            nonlocal y
+            yield from quebrar_pagina()
+            pagina.texto(self.MARGEM, y, texto_esquerda, self.TAMANHO_FONTE, negrito=negrito)
+            if texto_direita:
+                pagina.texto(LARGURA_A4 - self.MARGEM, y, texto_direita, self.TAMANHO_FONTE, negrito=negrito,
+                             alinhamento='direita')
+            y -= self.ENTRELINHA
+
+        # Agrupa pelo id, para que funcionários homônimos tenham seções e subtotais separados
+        for _, agendamentos in groupby(linhas, key=lambda linha: linha[0]):
+            primeiro = next(agendamentos)
+            yield from escrever(primeiro[1], negrito=True)
+            subtotal = 0
+            quantidade = 0
+
+            for _, _, data_horario, cliente, servicos, valor in chain([primeiro], agendamentos):
+                yield from quebrar_pagina()
+
+                celulas = (
+                    date_format(timezone.localtime(data_horario), 'd/m/Y H:i'),
+                    cliente,
+                    servicos,
+                )
+                for (x, largura), celula in zip(self.COLUNAS, celulas):
+                    pagina.texto(x, y, ajustar_texto(celula, largura - 4, self.TAMANHO_FONTE), self.TAMANHO_FONTE)
+                x, largura = self.COLUNAS[-1]
+                pagina.texto(x + largura, y, f"R$ {valor:.2f}", self.TAMANHO_FONTE, alinhamento='direita')
+                y -= self.ENTRELINHA
+
+                subtotal += valor
+                quantidade += 1
+
+            yield from escrever(f"Total: {quantidade} serviço(s)", f"R$ {subtotal:.2f}", negrito=True)
+            pagina.linha(self.MARGEM, y + self.ENTRELINHA - 4, LARGURA_A4 - self.MARGEM, y + self.ENTRELINHA - 4)
+            y -= self.ENTRELINHA / 2
+
+            total_geral += subtotal
+            total_servicos += quantidade
+
+        if total_servicos:
+            yield from escrever(
+                f"Total geral: {total_servicos} serviço(s) concluído(s)",
+                f"R$ {total_geral:.2f}",
+                negrito=True
+            )
+        else:
+            yield from escrever("Nenhum serviço concluído encontrado para os filtros aplicados.")
+
+        yield pagina
@@ -0,0 +1,180 @@
+"""
+Leituras em uma réplica do banco de dados.
+
+Quando DATABASES tem a conexão 'replica', as leituras pesadas que toleram dados levemente atrasados (relatórios, painel
+de desempenho, colunas de ganho do admin e autocompletes) podem ser enviadas a ela com 'ler_de(banco_para_leitura())',
+aliviando o banco principal, que continua recebendo todas as gravações. O roteador só desvia as leituras feitas dentro
+desse bloco e apenas dos modelos deste app; sessões, usuários e permissões são sempre lidos do banco principal.
+
+A réplica deixa de ser usada, voltando-se ao banco principal, quando:
+
+- o atraso estimado da réplica passa de REPLICA_ATRASO_TOLERADO segundos;
+- o usuário gravou algo nos últimos REPLICA_ATRASO_TOLERADO segundos (o middleware 'fixar_primario_apos_escrita'
+  marca a sessão com um cookie), para que ele sempre veja as próprias alterações, como um agendamento recém-criado;
+- há uma transação aberta no banco principal.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+from .models import Agendamento
+
+BANCO_REPLICA = 'replica'
+
+COOKIE_PRIMARIO = 'ler_primario'
+
+CHAVE_ATRASO = 'replica:atraso'
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_banco_leitura = ContextVar('banco_leitura', default=None)
+
+
+def replica_configurada():
+    return BANCO_REPLICA in settings.DATABASES
+
+
+def _medir_atraso():
+    """
+    Estima, em segundos, o atraso da réplica. No PostgreSQL usa o horário da última transação aplicada pela réplica
+    (zero quando ela já aplicou tudo o que recebeu). Nos demais bancos compara os agendamentos: o atraso é a idade da
+    alteração mais antiga do banco principal que ainda não chegou à réplica. Réplica inacessível conta como atraso
+    infinito.
+    """
+
+    try:
+        conexao = connections[BANCO_REPLICA]
+        if conexao.vendor == 'postgresql':
+            with conexao.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )
+                return float(cursor.fetchone()[0])
+
+        ultima_replica = Agendamento.objects.using(BANCO_REPLICA).aggregate(
+            ultima=Max('data_atualizacao')
+        )['ultima']
+    except DatabaseError:
+        return float('inf')
+
+    pendentes = Agendamento.objects.using(DEFAULT_DB_ALIAS)
+    if ultima_replica is not None:
+        pendentes = pendentes.filter(data_atualizacao__gt=ultima_replica)
+    primeira_pendente = pendentes.aggregate(primeira=Min('data_atualizacao'))['primeira']
+
+    if primeira_pendente is None:
+        return 0.0
+    return max((timezone.now() - primeira_pendente).total_seconds(), 0.0)
+
+
+def atraso_replica():
+    """Retorna o atraso estimado da réplica, medido no máximo uma vez a cada REPLICA_VERIFICACAO_SEGUNDOS."""
+
+    atraso = cache.get(CHAVE_ATRASO)
+    if atraso is None:
+        atraso = _medir_atraso()
+        cache.set(CHAVE_ATRASO, atraso, settings.REPLICA_VERIFICACAO_SEGUNDOS)
+    return atraso
+
+
+def banco_para_leitura(request=None):
+    """Escolhe o banco ('replica' ou 'default') para as leituras que toleram atraso, conforme as regras do módulo."""
+
+    if not replica_configurada():
+        return DEFAULT_DB_ALIAS
+    if request is not None and COOKIE_PRIMARIO in request.COOKIES:
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    if atraso_replica() > settings.REPLICA_ATRASO_TOLERADO:
+        return DEFAULT_DB_ALIAS
+    return BANCO_REPLICA
+
+
+@contextmanager
+def ler_de(banco):
+    """Envia ao banco informado as leituras dos modelos do app feitas dentro do bloco."""
+
+    token = _banco_leitura.set(banco)
+    try:
+        yield banco
+    finally:
+        _banco_leitura.reset(token)
+
+
+def iterar_em(banco, iteravel):
+    """
+    Percorre 'iteravel' lendo do banco informado. Para respostas em streaming, cujo gerador só é consumido depois que a
+    view retorna: o bloco 'ler_de' envolve cada passo, em vez de ficar aberto entre um passo e outro.
+    """
+
+    iterador = iter(iteravel)
+    while True:
+        with ler_de(banco):
+            try:
+                item = next(iterador)
+            except StopIteration:
+                return
+        yield item
+
+
+class RoteadorReplica:
+    """
+    Roteador de banco de dados: leituras dos modelos do app dentro de 'ler_de' vão ao banco escolhido; todas as
+    gravações e migrações vão ao banco principal.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'agendamento':
+            return _banco_leitura.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == BANCO_REPLICA:
+            return False
+        return None
+
+
+def _marcar_escrita(request, response):
+    if request.method not in METODOS_SEGUROS and replica_configurada():
+        response.set_cookie(
+            COOKIE_PRIMARIO,
+            '1',
+            max_age=settings.REPLICA_ATRASO_TOLERADO,
+            httponly=True,
+            samesite='Lax'
+        )
+    return response
+
+
+@sync_and_async_middleware
+def fixar_primario_apos_escrita(get_response):
+    """
+    Middleware que, após qualquer requisição que possa ter gravado dados (métodos diferentes de GET, HEAD, OPTIONS e
+    TRACE), faz as leituras desse navegador irem ao banco principal durante REPLICA_ATRASO_TOLERADO segundos.
+    """
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return _marcar_escrita(request, await get_response(request))
+    else:
+        def middleware(request):
+            return _marcar_escrita(request, get_response(request))
+
+    return middleware
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.db import transaction
+
+from .choices import StatusAgendamento
+from .historico import registrar_transicoes
+from .indicadores import atualizar_indicadores_clientes
+from .models import ServicoFuncionarioHorario, Agendamento
+
+
+def reservar_recorrente(cliente, funcionario, servico, primeiro_horario, ocorrencias=12, intervalo_dias=7,
+                        exigir_todas=False):
+    """
+    Reserva, para um mesmo cliente, funcionário e serviço, as vagas livres em uma série de horários recorrentes (por
+    exemplo, semanalmente por 12 semanas). As vagas de todas as ocorrências são buscadas em uma única consulta e os
+    agendamentos são criados com um único 'bulk_create' dentro de uma transação.
+
+    Retorna uma tupla com a lista de agendamentos criados e a lista de horários (datetime) em que não havia vaga
+    disponível. Com 'exigir_todas', nada é reservado se alguma ocorrência estiver em conflito.
+    """
+
+    horarios = [primeiro_horario + timedelta(days=intervalo_dias * i) for i in range(ocorrencias)]
+
+    with transaction.atomic():
+        vagas = dict(
+            ServicoFuncionarioHorario.ativos.select_for_update(
+                of=('self',)
+            ).filter(
+                funcionario=funcionario,
+                servico=servico,
+                data_horario__ativo=True,
+                data_horario__data_horario__in=horarios,
+                agendamento__isnull=True
+            ).values_list(
+                'data_horario__data_horario',
+                'pk'
+            )
+        )
+
+        conflitos = [horario for horario in horarios if horario not in vagas]
+        if exigir_todas and conflitos:
+            return [], conflitos
+
+        # O bulk_create não chama o save() do modelo, então o valor de cada vaga é calculado aqui, em uma consulta
+        valores = ServicoFuncionarioHorario.valores_totais(vagas.values())
+
+        agendamentos = Agendamento.objects.bulk_create([
+            Agendamento(
+                cliente=cliente,
+                servico_funcionario_horario_id=vagas[horario],
+                status=StatusAgendamento.AGENDADO,
+                valor_total=valores.get(vagas[horario]) or 0
+            ) for horario in horarios if horario in vagas
+        ])
+        registrar_transicoes((agendamento.pk, None, agendamento.status) for agendamento in agendamentos)
+        atualizar_indicadores_clientes([cliente.pk])
+
+    return agendamentos, conflitos
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidar_catalogo
+from .choices import StatusAgendamento
+from .desempenho import recalcular_dias
+from .historico import registrar_transicoes
+from .indicadores import atualizar_indicadores_clientes
+from .lista_espera import ofertar_vagas
+from .models import Agendamento, Funcionario, Pessoa, Servico, ServicoFuncionarioHorario
+
+
+@receiver(post_save, sender=Agendamento, dispatch_uid='agendamento_atualiza_indicadores_cliente')
+def atualizar_indicadores_apos_salvar(sender, instance, raw=False, **kwargs):
+    """
+    Recalcula os indicadores do cliente do agendamento salvo e, se o agendamento mudou de cliente, também os do cliente
+    anterior. Ignorado durante o carregamento de fixtures (loaddata).
+    """
+
+    if raw:
+        return
+
+    atualizar_indicadores_clientes([
+        instance.cliente_id,
+        getattr(instance, '_cliente_original_id', None),
+    ])
+
+
+@receiver(post_save, sender=Agendamento, dispatch_uid='agendamento_registra_transicao')
+def registrar_transicao_apos_salvar(sender, instance, created, raw=False, **kwargs):
+    """Registra no histórico a criação do agendamento ou a mudança de status. Ignorado durante o loaddata."""
+
+    if raw:
+        return
+
+    anterior = None if created else getattr(instance, '_status_original', None)
+    if created or instance.status != anterior:
+        registrar_transicoes([(instance.pk, anterior, instance.status)])
+
+
+@receiver(post_save, sender=Agendamento, dispatch_uid='agendamento_troca_vaga_recalcula_desempenho')
+def recalcular_desempenho_apos_trocar_vaga(sender, instance, created, raw=False, **kwargs):
+    """
+    Recalcula o desempenho do dia da vaga anterior quando o agendamento muda de vaga; o dia da nova vaga é encontrado
+    pela atualização incremental. Ignorado durante o loaddata.
+    """
+
+    vaga_anterior_id = getattr(instance, '_vaga_original_id', None)
+    if raw or created or vaga_anterior_id in (None, instance.servico_funcionario_horario_id):
+        return
+
+    horarios = ServicoFuncionarioHorario.objects.filter(pk=vaga_anterior_id).values_list(
+        'data_horario__data_horario', flat=True
+    )
+    recalcular_dias({timezone.localdate(horario) for horario in horarios})
+
+
+@receiver(post_save, sender=Agendamento, dispatch_uid='agendamento_cancelado_oferta_vaga')
+def ofertar_vaga_apos_cancelar(sender, instance, created, raw=False, **kwargs):
+    """Oferece à lista de espera a vaga de um agendamento que acabou de ser cancelado. Ignorado durante o loaddata."""
+
+    if raw or instance.status != StatusAgendamento.CANCELADO:
+        return
+
+    if created or getattr(instance, '_status_original', None) != StatusAgendamento.CANCELADO:
+        ofertar_vagas([instance.servico_funcionario_horario_id])
+
+
+@receiver(post_save, sender=Servico, dispatch_uid='servico_invalida_catalogo')
+@receiver(post_delete, sender=Servico, dispatch_uid='servico_exclusao_invalida_catalogo')
+@receiver(post_save, sender=Funcionario, dispatch_uid='funcionario_invalida_catalogo')
+@receiver(post_delete, sender=Funcionario, dispatch_uid='funcionario_exclusao_invalida_catalogo')
+@receiver(post_save, sender=Pessoa, dispatch_uid='pessoa_invalida_catalogo')
+@receiver(m2m_changed, sender=Funcionario.servico.through, dispatch_uid='servicos_funcionario_invalidam_catalogo')
+def invalidar_catalogo_apos_alteracao(sender, **kwargs):
+    """
+    Descarta do cache o catálogo de serviços, os serviços de cada funcionário e as opções de funcionários (que usam o
+    nome da pessoa) após qualquer alteração nesses cadastros. O descarte espera a confirmação da transação: antes dela,
+    outra requisição poderia preencher o cache de novo com os dados ainda não gravados.
+    """
+
+    transaction.on_commit(invalidar_catalogo)
+
@@ -0,0 +1,49 @@
+"""
+Funções compartilhadas pelos comandos 'salvar_snapshot' e 'restaurar_snapshot'. No SQLite, o snapshot é uma cópia
+compacta do próprio arquivo do banco; nos demais bancos, é um dumpdata em JSON compactado com gzip. Ao lado de cada
+snapshot fica um arquivo '.sha256', no mesmo formato do utilitário sha256sum, usado para verificar a integridade antes
+da restauração.
+"""
+
+import hashlib
+from pathlib import Path
+
+CABECALHO_SQLITE = b'SQLite format 3\x00'
+
+# Tabelas que são recriadas pelo 'migrate' ou que não fazem sentido em um conjunto de dados de teste
+MODELOS_EXCLUIDOS_DUMP = ['contenttypes', 'auth.permission', 'sessions', 'admin.logentry']
+
+
+def caminho_checksum(caminho):
+    caminho = Path(caminho)
+    return caminho.with_name(caminho.name + '.sha256')
+
+
+def calcular_checksum(caminho, tamanho_bloco=1024 * 1024):
+    """Calcula o SHA-256 do arquivo lendo-o em blocos, sem carregá-lo inteiro em memória."""
+
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def gravar_checksum(caminho):
+    checksum = calcular_checksum(caminho)
+    caminho_checksum(caminho).write_text(f'{checksum}  {Path(caminho).name}\n')
+    return checksum
+
+
+def ler_checksum(caminho):
+    """Retorna o checksum registrado para o snapshot, ou None se o arquivo '.sha256' não existir."""
+
+    arquivo = caminho_checksum(caminho)
+    if not arquivo.exists():
+        return None
+    return arquivo.read_text().split()[0]
+
+
+def eh_snapshot_sqlite(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read(len(CABECALHO_SQLITE)) == CABECALHO_SQLITE
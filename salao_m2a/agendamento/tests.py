@@ -0,0 +1,306 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .agregacao import combinar_parciais, particionar_por_funcionario, reduzir_linhas
+from .busca import interpretar_busca, interpretacoes_da_busca
+from .cache import CHAVE_CATALOGO_SERVICOS, catalogo_servicos
+from .choices import SituacaoEspera, StatusAgendamento
+from .lista_espera import confirmar_ofertas, expirar_ofertas
+from .models import (
+    Agendamento,
+    AgendamentoArquivado,
+    Cliente,
+    DataHorario,
+    Funcionario,
+    ListaEspera,
+    Pessoa,
+    Servico,
+    ServicoFuncionarioHorario,
+)
+from .transicoes import transicionar_status
+
+
+class VagaDisponivelOrdenadaAutocompleteTests(TestCase):
+    """Busca de vagas do autocomplete: cada vaga deve aparecer uma única vez, mesmo com vários serviços encontrados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('recepcao', password='senha')
+
+        pessoa = Pessoa.objects.create(
+            nome_completo='Ana Souza',
+            cpf='111.444.777-35',
+            email='ana@example.com',
+            celular='(11) 91234-5678'
+        )
+        funcionario = Funcionario.objects.create(pessoa=pessoa)
+        servicos = [
+            Servico.objects.create(nome_servico='Corte Feminino', valor=80),
+            Servico.objects.create(nome_servico='Corte Masculino', valor=50),
+        ]
+        funcionario.servico.set(servicos)
+
+        horario = DataHorario.objects.create(data_horario=timezone.now() + datetime.timedelta(days=1))
+        cls.vaga = ServicoFuncionarioHorario.objects.create(funcionario=funcionario, data_horario=horario)
+        cls.vaga.servico.set(servicos)
+
+    def buscar(self, termo):
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('agendamento:vaga-disponivel-ordenada-autocomplete'), {'q': termo})
+        self.assertEqual(resposta.status_code, 200)
+        return [resultado['id'] for resultado in resposta.json()['results']]
+
+    def test_vaga_com_dois_servicos_encontrados_aparece_uma_vez(self):
+        self.assertEqual(self.buscar('Corte'), [str(self.vaga.pk)])
+
+    def test_vaga_encontrada_pelos_servicos_e_pelo_funcionario_aparece_uma_vez(self):
+        # "o" está no nome do funcionário e no dos dois serviços
+        self.assertEqual(self.buscar('o'), [str(self.vaga.pk)])
+
+
+class InterpretarBuscaTests(SimpleTestCase):
+    """Interpretação dos termos temporais das buscas de vagas e de datas, com 'hoje' fixo em uma segunda-feira."""
+
+    hoje = datetime.date(2026, 10, 19)
+
+    def momento(self, ano, mes, dia, hora=0, minuto=0):
+        return timezone.make_aware(datetime.datetime(ano, mes, dia, hora, minuto))
+
+    def interpretar(self, termo):
+        return interpretar_busca(termo, hoje=self.hoje)
+
+    def dias_da_semana(self, intervalos):
+        # Dias consecutivos formam um único intervalo, então cada dia coberto é conferido
+        dias = set()
+        for inicio, fim, _ in intervalos:
+            dia = timezone.localtime(inicio).date()
+            while timezone.make_aware(datetime.datetime.combine(dia, datetime.time.min)) < fim:
+                dias.add(dia.weekday())
+                dia += datetime.timedelta(days=1)
+        return dias
+
+    def test_data(self):
+        intervalos, texto = self.interpretar('25/12')
+        self.assertEqual(intervalos, [(self.momento(2026, 12, 25), self.momento(2026, 12, 26), None)])
+        self.assertEqual(texto, '')
+
+    def test_data_passada_sem_ano_vai_para_o_proximo_ano(self):
+        intervalos, _ = self.interpretar('10/01')
+        self.assertEqual(intervalos, [(self.momento(2027, 1, 10), self.momento(2027, 1, 11), None)])
+
+    def test_intervalo_de_datas_na_virada_do_ano(self):
+        intervalos, _ = self.interpretar('25/12 a 05/01')
+        self.assertEqual(intervalos, [(self.momento(2026, 12, 25), self.momento(2027, 1, 6), None)])
+
+    def test_intervalo_de_datas_com_hifen(self):
+        intervalos, _ = self.interpretar('25/12-31/12')
+        self.assertEqual(intervalos, [(self.momento(2026, 12, 25), self.momento(2027, 1, 1), None)])
+
+    def test_hoje_e_amanha(self):
+        self.assertEqual(self.interpretar('hoje')[0], [(self.momento(2026, 10, 19), self.momento(2026, 10, 20), None)])
+        self.assertEqual(
+            self.interpretar('amanhã')[0],
+            [(self.momento(2026, 10, 20), self.momento(2026, 10, 21), None)]
+        )
+
+    def test_horario_com_data(self):
+        intervalos, _ = self.interpretar('25/12 14h30')
+        self.assertEqual(intervalos, [
+            (self.momento(2026, 12, 25, 14, 30), self.momento(2026, 12, 25, 14, 31), None)
+        ])
+
+    def test_intervalo_de_horarios_com_hifen_inclui_a_ultima_hora(self):
+        intervalos, _ = self.interpretar('25/12 14h-16h')
+        self.assertEqual(intervalos, [(self.momento(2026, 12, 25, 14), self.momento(2026, 12, 25, 17), None)])
+
+    def test_dia_da_semana_por_extenso(self):
+        intervalos, texto = self.interpretar('terça-feira')
+        self.assertEqual(self.dias_da_semana(intervalos), {1})
+        self.assertEqual(texto, '')
+
+    def test_intervalo_de_dias_da_semana_abreviados(self):
+        for termo in ('seg-qua', 'seg a qua'):
+            with self.subTest(termo=termo):
+                leituras = interpretacoes_da_busca(termo, hoje=self.hoje)
+                self.assertEqual(len(leituras), 1)
+                self.assertEqual(self.dias_da_semana(leituras[0][0]), {0, 1, 2})
+
+    def test_intervalo_de_dias_da_semana_que_passa_pelo_domingo(self):
+        intervalos, _ = self.interpretar('sexta a segunda')
+        self.assertEqual(self.dias_da_semana(intervalos), {4, 5, 6, 0})
+
+    def test_abreviacao_isolada_tem_duas_leituras(self):
+        (intervalos, texto), literal = interpretacoes_da_busca('Ter', hoje=self.hoje)
+        self.assertEqual(self.dias_da_semana(intervalos), {1})
+        self.assertEqual(texto, '')
+        self.assertEqual(literal, ([], 'Ter'))
+
+    def test_texto_com_dia_e_horario(self):
+        intervalos, texto = self.interpretar('Ana sexta 14h')
+        self.assertEqual(texto, 'Ana')
+        self.assertEqual(self.dias_da_semana(intervalos), {4})
+        self.assertTrue(all(timezone.localtime(inicio).hour == 14 for inicio, _, _ in intervalos))
+
+    def test_muitos_intervalos_passam_a_conferir_a_hora(self):
+        intervalos, _ = self.interpretar('8h 9h')
+        self.assertEqual(intervalos, [(
+            self.momento(2026, 10, 19),
+            self.momento(2027, 4, 18),
+            ((8 * 60, 9 * 60), (9 * 60, 10 * 60))
+        )])
+
+    def test_termos_nao_temporais(self):
+        for termo in ('Teresa', '24h', '31/02', '10h a 9h', '31/12/2026 a 01/01/2026', '01/01/2026 a 01/06/2027'):
+            with self.subTest(termo=termo):
+                self.assertEqual(self.interpretar(termo), ([], termo))
+
+
+class ListaEsperaTests(TestCase):
+    """Oferta das vagas canceladas à lista de espera, confirmação das ofertas e repasse das vencidas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.servico = Servico.objects.create(nome_servico='Escova', valor=60)
+        outro_servico = Servico.objects.create(nome_servico='Manicure', valor=30)
+        funcionario = Funcionario.objects.create(pessoa=cls.criar_pessoa(0, 'Bruna Lima'))
+        funcionario.servico.set([cls.servico, outro_servico])
+
+        horario = DataHorario.objects.create(data_horario=timezone.now() + datetime.timedelta(days=2))
+        cls.vaga = ServicoFuncionarioHorario.objects.create(funcionario=funcionario, data_horario=horario)
+        cls.vaga.servico.set([cls.servico])
+
+        cls.cliente_cancelado, cls.primeiro, cls.prioritario, cls.outro = [
+            Cliente.objects.create(pessoa=cls.criar_pessoa(numero, nome))
+            for numero, nome in enumerate(('Carla Dias', 'Diego Melo', 'Elisa Rocha', 'Fabio Reis'), start=1)
+        ]
+        cls.agendamento = Agendamento.objects.create(
+            cliente=cls.cliente_cancelado,
+            servico_funcionario_horario=cls.vaga,
+            status=StatusAgendamento.AGENDADO
+        )
+
+    @staticmethod
+    def criar_pessoa(numero, nome):
+        return Pessoa.objects.create(
+            nome_completo=nome,
+            cpf=f'{numero:03d}.000.000-00',
+            email=f'pessoa{numero}@example.com',
+            celular='(11) 91234-5678'
+        )
+
+    def setUp(self):
+        inicio, fim = timezone.now(), timezone.now() + datetime.timedelta(days=3)
+        # O próprio cliente do cancelamento, com a maior prioridade, não deve receber a vaga de volta
+        self.pedido_cancelado = self.criar_pedido(self.cliente_cancelado, self.servico, inicio, fim, prioridade=5)
+        self.pedido_primeiro = self.criar_pedido(self.primeiro, self.servico, inicio, fim)
+        self.pedido_prioritario = self.criar_pedido(self.prioritario, self.servico, inicio, fim, prioridade=1)
+        self.pedido_outro_servico = self.criar_pedido(
+            self.outro, Servico.objects.get(nome_servico='Manicure'), inicio, fim, prioridade=9
+        )
+
+    def criar_pedido(self, cliente, servico, inicio, fim, prioridade=0):
+        return ListaEspera.objects.create(
+            cliente=cliente, servico=servico, inicio=inicio, fim=fim, prioridade=prioridade
+        )
+
+    def cancelar(self):
+        self.agendamento.status = StatusAgendamento.CANCELADO
+        self.agendamento.save()
+
+    def situacoes(self):
+        return {
+            pedido.pk: (pedido.situacao, pedido.vaga_ofertada_id)
+            for pedido in ListaEspera.objects.all()
+        }
+
+    def test_cancelamento_oferta_a_vaga_ao_melhor_pedido_compativel(self):
+        self.cancelar()
+
+        self.assertEqual(self.situacoes(), {
+            self.pedido_cancelado.pk: (SituacaoEspera.AGUARDANDO, None),
+            self.pedido_primeiro.pk: (SituacaoEspera.AGUARDANDO, None),
+            self.pedido_prioritario.pk: (SituacaoEspera.OFERTADO, self.vaga.pk),
+            self.pedido_outro_servico.pk: (SituacaoEspera.AGUARDANDO, None),
+        })
+
+    def test_confirmacao_agenda_o_cliente_na_vaga(self):
+        self.cancelar()
+
+        criados = confirmar_ofertas([self.pedido_prioritario.pk])
+
+        self.assertEqual(len(criados), 1)
+        agendamento = Agendamento.objects.get(servico_funcionario_horario=self.vaga)
+        self.assertEqual(agendamento.cliente_id, self.prioritario.pk)
+        self.assertEqual(agendamento.status, StatusAgendamento.AGENDADO)
+        self.assertEqual(agendamento.valor_total, 60)
+        self.assertTrue(AgendamentoArquivado.objects.filter(id_original=self.agendamento.pk).exists())
+        self.pedido_prioritario.refresh_from_db()
+        self.assertEqual(self.pedido_prioritario.situacao, SituacaoEspera.ATENDIDO)
+
+    def test_oferta_vencida_passa_ao_proximo_da_fila(self):
+        self.cancelar()
+
+        vencidas, ofertadas, encerrados = expirar_ofertas(timezone.now() + datetime.timedelta(hours=25))
+
+        self.assertEqual((vencidas, ofertadas, encerrados), (1, 1, 0))
+        situacoes = self.situacoes()
+        self.assertEqual(situacoes[self.pedido_prioritario.pk], (SituacaoEspera.EXPIRADO, self.vaga.pk))
+        self.assertEqual(situacoes[self.pedido_primeiro.pk], (SituacaoEspera.OFERTADO, self.vaga.pk))
+
+    def test_cancelamento_em_massa_retorna_as_ofertas_feitas(self):
+        alterados, ofertadas = transicionar_status(
+            Agendamento.objects.filter(pk=self.agendamento.pk),
+            StatusAgendamento.CANCELADO
+        )
+
+        self.assertEqual((alterados, ofertadas), (1, 1))
+
+
+class CatalogoCacheTests(TestCase):
+    """Invalidação do catálogo de serviços guardado no cache."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalogo_e_descartado_apos_a_confirmacao_da_alteracao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Servico.objects.create(nome_servico='Hidratação', valor=90)
+            # Uma leitura feita antes da confirmação guarda o catálogo ainda não gravado
+            catalogo_servicos()
+            self.assertIsNotNone(cache.get(CHAVE_CATALOGO_SERVICOS))
+
+        self.assertIsNone(cache.get(CHAVE_CATALOGO_SERVICOS))
+
+
+class AgregacaoRelatorioTests(SimpleTestCase):
+    """Redução das linhas do relatório de desempenho por funcionário."""
+
+    linhas = [
+        (7, 'Ana Souza', 1, Decimal('50')),
+        (7, 'Ana Souza', 1, Decimal('30')),
+        (3, 'Ana Souza', 2, Decimal('80')),
+        (5, 'Bruno Lima', 3, None),
+    ]
+
+    def test_homonimos_ficam_separados_e_ordenados_pelo_id(self):
+        resultado = combinar_parciais([reduzir_linhas(self.linhas)])
+
+        self.assertEqual(list(resultado.items()), [
+            (3, {'nome': 'Ana Souza', 'concluidos': 1, 'ganhos': Decimal('80')}),
+            (7, {'nome': 'Ana Souza', 'concluidos': 1, 'ganhos': Decimal('80')}),
+            (5, {'nome': 'Bruno Lima', 'concluidos': 1, 'ganhos': Decimal('0')}),
+        ])
+
+    def test_particoes_combinadas_igualam_a_reducao_serial(self):
+        parciais = [reduzir_linhas(particao) for particao in particionar_por_funcionario(self.linhas, 2)]
+
+        self.assertEqual(
+            list(combinar_parciais(parciais).items()),
+            list(combinar_parciais([reduzir_linhas(self.linhas)]).items())
+        )
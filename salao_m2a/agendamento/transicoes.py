@@ -0,0 +1,155 @@
+"""
+Alteração de status de agendamentos em massa.
+
+As ações do admin e o fechamento do dia podem alcançar dezenas de milhares de agendamentos. Em vez de um único UPDATE,
+que manteria o banco travado para gravações durante toda a operação, os agendamentos são percorridos em lotes pela
+chave primária (sem carregar o conjunto inteiro na memória) e cada lote é alterado, registrado no histórico de status
+e tem os indicadores dos seus clientes atualizados em uma transação própria; nos cancelamentos, as vagas do lote são
+ofertadas à lista de espera na mesma transação. Uma interrupção no meio preserva os lotes já gravados, e repetir a
+operação continua de onde ela parou, já que os agendamentos alterados deixam de fazer parte do conjunto.
+
+O fechamento de agendamentos altera os que ainda estão como 'Agendado' depois que o horário passou, segundo a política
+FECHAMENTO_AUTOMATICO_* do settings.py, e registra cada execução em FechamentoAgendamentos. Os indicadores dos clientes
+são atualizados a cada lote e o agregado de desempenho, de forma incremental, ao final da execução.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .choices import StatusAgendamento
+from .desempenho import atualizar_desempenho
+from .historico import registrar_transicoes
+from .indicadores import atualizar_indicadores_clientes
+from .lista_espera import ofertar_vagas
+from .models import Agendamento, FechamentoAgendamentos
+
+
+def fim_do_dia(dia):
+    """Retorna o início do dia seguinte, limite (exclusivo) dos horários do dia informado."""
+
+    return timezone.make_aware(datetime.datetime.combine(dia + datetime.timedelta(days=1), datetime.time.min))
+
+
+def limite_fechamento_automatico():
+    """Retorna o horário até o qual (exclusive) os agendamentos são fechados pela política automática."""
+
+    return timezone.now() - datetime.timedelta(hours=settings.FECHAMENTO_AUTOMATICO_HORAS)
+
+
+def pendentes_de_fechamento(limite):
+    """Retorna os agendamentos ativos ainda com status 'Agendado' cujo horário é anterior a 'limite'."""
+
+    return Agendamento.ativos.filter(
+        status=StatusAgendamento.AGENDADO,
+        servico_funcionario_horario__data_horario__data_horario__lt=limite
+    )
+
+
+def transicionar_lote(queryset, status, apos=0, tamanho_lote=None):
+    """
+    Altera para 'status' o próximo lote de agendamentos do queryset com chave primária maior que 'apos'. Retorna
+    (último id do lote, quantidade alterada, vagas ofertadas à lista de espera); o último id é None quando não há mais
+    agendamentos.
+    """
+
+    tamanho_lote = tamanho_lote or settings.TRANSICAO_TAMANHO_LOTE
+    ids = list(queryset.filter(pk__gt=apos).order_by('pk').values_list('pk', flat=True)[:tamanho_lote])
+    if not ids:
+        return None, 0, 0
+
+    with transaction.atomic():
+        # O queryset é aplicado de novo dentro da transação, descartando os agendamentos alterados por outro usuário
+        # depois da leitura dos ids; o status anterior de cada um vai para o histórico
+        linhas = list(Agendamento.objects.filter(
+            pk__in=queryset.filter(pk__in=ids).values('pk')
+        ).exclude(status=status).select_for_update().values_list(
+            'pk', 'status', 'cliente_id', 'servico_funcionario_horario_id'
+        ))
+
+        # O update() não aciona o auto_now; a data de atualização é usada pelo agregado de desempenho
+        alterados = Agendamento.objects.filter(pk__in=[pk for pk, *_ in linhas]).update(
+            status=status,
+            data_atualizacao=timezone.now()
+        )
+        registrar_transicoes((pk, anterior, status) for pk, anterior, *_ in linhas)
+        atualizar_indicadores_clientes([cliente_id for _, _, cliente_id, _ in linhas])
+        ofertadas = 0
+        if status == StatusAgendamento.CANCELADO:
+            ofertadas = ofertar_vagas([vaga_id for *_, vaga_id in linhas])
+
+    return ids[-1], alterados, ofertadas
+
+
+def transicionar_status(queryset, status, tamanho_lote=None, progresso=None):
+    """
+    Altera para 'status' todos os agendamentos do queryset, um lote por transação, e retorna (quantidade alterada,
+    vagas ofertadas à lista de espera). Após cada lote, chama 'progresso(alterados até o momento, lotes processados)',
+    quando informado.
+    """
+
+    apos = 0
+    total = 0
+    total_ofertadas = 0
+    lotes = 0
+    while True:
+        apos, alterados, ofertadas = transicionar_lote(queryset, status, apos, tamanho_lote)
+        if apos is None:
+            return total, total_ofertadas
+
+        total += alterados
+        total_ofertadas += ofertadas
+        lotes += 1
+        if progresso is not None:
+            progresso(total, lotes)
+
+
+def iniciar_fechamento(limite, status, origem, usuario=None):
+    """
+    Cria o registro de uma execução do fechamento antes do primeiro lote, para que ela apareça no histórico mesmo se
+    for interrompida. Os lotes são somados por 'registrar_lote' e o fim é marcado por 'concluir_fechamento'.
+    """
+
+    return FechamentoAgendamentos.objects.create(limite=limite, status=status, origem=origem, usuario=usuario)
+
+
+def registrar_lote(fechamento, alterados):
+    """Soma um lote ao registro do fechamento, que assim reflete o que já foi gravado mesmo se houver interrupção."""
+
+    FechamentoAgendamentos.objects.filter(pk=fechamento.pk).update(
+        alterados=F('alterados') + alterados,
+        lotes=F('lotes') + 1
+    )
+
+
+def concluir_fechamento(fechamento):
+    """Atualiza o agregado de desempenho com os dias alterados e marca o fim do fechamento."""
+
+    fechamento.refresh_from_db(fields=['alterados', 'lotes'])
+    fechamento.dias_recalculados = atualizar_desempenho()
+    fechamento.data_fim = timezone.now()
+    fechamento.save(update_fields=['dias_recalculados', 'data_fim'])
+    return fechamento
+
+
+def fechar_agendamentos(limite, status, origem, usuario=None, tamanho_lote=None, progresso=None):
+    """
+    Fecha, com o status informado, os agendamentos pendentes com horário anterior a 'limite', em lotes, registrando a
+    execução. Retorna o registro (FechamentoAgendamentos). 'progresso' é repassado a 'transicionar_status'.
+    """
+
+    fechamento = iniciar_fechamento(limite, status, origem, usuario)
+    anterior = 0
+
+    def registrar(alterados, lotes):
+        nonlocal anterior
+        registrar_lote(fechamento, alterados - anterior)
+        anterior = alterados
+        if progresso is not None:
+            progresso(alterados, lotes)
+
+    transicionar_status(pendentes_de_fechamento(limite), status, tamanho_lote, registrar)
+    return concluir_fechamento(fechamento)
@@ -10,6 +10,24 @@ urlpatterns = [
         name='pessoa-disponivel-autocomplete'
     ),
 
+    path(
+        'cliente-autocomplete/',
+        views.ClienteAutocomplete.as_view(),
+        name='cliente-autocomplete',
+    ),
+
+    path(
+        'funcionario-autocomplete/',
+        views.FuncionarioAutocomplete.as_view(),
+        name='funcionario-autocomplete',
+    ),
+
+    path(
+        'servico-autocomplete/',
+        views.ServicoAutocomplete.as_view(),
+        name='servico-autocomplete',
+    ),
+
     path(
         'vaga-disponivel-ordenada-autocomplete/',
         views.VagaDisponivelOrdenadaAutocomplete.as_view(),
@@ -22,6 +40,24 @@ urlpatterns = [
         name='data-ordenada-autocomplete',
     ),
 
+    path(
+        'async/pessoa-disponivel-autocomplete/',
+        views.PessoaDisponivelAutocompleteAsync.as_view(),
+        name='pessoa-disponivel-autocomplete-async'
+    ),
+
+    path(
+        'async/vaga-disponivel-ordenada-autocomplete/',
+        views.VagaDisponivelOrdenadaAutocompleteAsync.as_view(),
+        name='vaga-disponivel-ordenada-autocomplete-async',
+    ),
+
+    path(
+        'async/data-ordenada-autocomplete/',
+        views.DataOrdenadaAutocompleteAsync.as_view(),
+        name='data-ordenada-autocomplete-async',
+    ),
+
     path(
         'relatorio-pdf/',
         views.gerar_relatorio_pdf,
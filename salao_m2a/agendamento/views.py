@@ -1,19 +1,134 @@
-from collections import defaultdict
 import datetime
-from io import BytesIO
 
 from django.contrib import messages
-from xhtml2pdf import pisa
+from asgiref.sync import sync_to_async
 from dal import autocomplete
-from django.db.models import Q, Sum
-from django.http import HttpResponse, HttpResponseRedirect, HttpResponseForbidden
-from django.template.loader import get_template
+from django.db.models import Exists, OuterRef, Q
+from django.http import (
+    HttpResponse,
+    HttpResponseRedirect,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse
+)
 from django.utils import timezone
+from django.views import View
+
+from .models import (
+    Pessoa,
+    Cliente,
+    Funcionario,
+    Servico,
+    ServicoFuncionarioHorario,
+    DataHorario
+)
+from .busca import interpretar_busca, interpretacoes_da_busca, filtro_intervalos
+from .cache import pertence_ao_grupo, servicos_por_funcionario
+from .replica import banco_para_leitura, iterar_em, ler_de
+from .relatorio import calcular_relatorio, buscar_linhas_detalhe
+from .renderizadores import obter_renderizador, ErroRenderizacao, RenderizadorDetalhadoStreaming
+from .transicoes import fim_do_dia
+
+
+def buscar_pessoas_disponiveis(termo):
+    """
+    Monta o queryset de Pessoas ativas que ainda não são nem Clientes, nem Funcionários, filtrando por nome, celular
+    ou CPF quando um termo de busca é informado. Compartilhado pelas views de autocomplete síncrona e assíncrona.
+    """
+
+    qs = Pessoa.ativos.filter(
+        cliente__isnull=True,
+        funcionario__isnull=True
+    )
+
+    if termo:
+        qs = qs.filter(
+            Q(nome_completo__icontains=termo) |
+            Q(celular__icontains=termo) |
+            Q(cpf__icontains=termo)
+        )
+
+    return qs.order_by('nome_completo')
+
+
+def buscar_vagas_disponiveis(termo):
+    """
+    Monta o queryset de Vagas de Atendimento ativas, livres e futuras, filtrando por data, horário ou dia da semana
+    (veja 'busca.interpretar_busca'), nome de serviço ou nome de funcionário. Partes temporais e texto se combinam
+    ("Ana sexta 14h"); um termo só temporal dispensa a busca por nome. Um termo com mais de uma leitura ("Ter" é
+    terça-feira ou o começo de "Teresa") traz as vagas de qualquer uma delas. Os filtros usam apenas subconsultas,
+    então cada vaga aparece uma única vez, sem DISTINCT. Já traz o funcionário, o horário e os serviços de cada vaga
+    para que o rótulo seja montado sem consultas adicionais.
+    """
+
+    qs = ServicoFuncionarioHorario.ativos.filter(
+        funcionario__ativo=True,
+        agendamento__isnull=True,
+        data_horario__data_horario__gte=timezone.now()
+    )
+
+    if termo:
+        filtro = Q()
+        for intervalos, texto in interpretacoes_da_busca(termo):
+            leitura = Q()
+
+            if intervalos:
+                # Os intervalos são resolvidos na tabela de horários, bem menor que a de vagas, pelo índice da coluna;
+                # aplicados sobre a junção, o banco testaria cada vaga contra todos os intervalos
+                horarios = DataHorario.objects.filter(filtro_intervalos('data_horario', intervalos))
+                leitura &= Q(data_horario__in=horarios.values('pk'))
+
+            if texto:
+                # Semi-junção com os serviços da vaga: uma junção direta repetiria a vaga para cada serviço encontrado
+                servicos = ServicoFuncionarioHorario.servico.through.objects.filter(
+                    servicofuncionariohorario_id=OuterRef('pk'),
+                    servico__nome_servico__icontains=texto
+                )
+                leitura &= Exists(servicos) | Q(funcionario__pessoa__nome_completo__icontains=texto)
+
+            filtro |= leitura
+
+        qs = qs.filter(filtro)
+
+    return qs.select_related(
+        'funcionario__pessoa',
+        'data_horario'
+    ).prefetch_related(
+        'servico'
+    ).order_by('data_horario__data_horario', 'funcionario__pessoa__nome_completo')
+
+
+def buscar_datas_disponiveis(termo):
+    """
+    Monta o queryset de Datas e Horários ativos e futuros, filtrando por data, horário ou dia da semana (veja
+    'busca.interpretar_busca'). Palavras não temporais são ignoradas.
+    """
+
+    qs = DataHorario.ativos.filter(
+        data_horario__gte=timezone.now()
+    )
 
-from .models import Pessoa, ServicoFuncionarioHorario, Agendamento, DataHorario
+    if termo:
+        intervalos, _ = interpretar_busca(termo)
 
+        if intervalos:
+            qs = qs.filter(filtro_intervalos('data_horario', intervalos))
 
-class PessoaDisponivelAutocomplete(autocomplete.Select2QuerySetView):
+    return qs.order_by('data_horario')
+
+
+class LeituraReplicaMixin:
+    """
+    Faz as consultas de uma view de autocomplete do django-autocomplete-light lerem da réplica, quando disponível
+    (veja 'replica.banco_para_leitura').
+    """
+
+    def get(self, request, *args, **kwargs):
+        with ler_de(banco_para_leitura(request)):
+            return super().get(request, *args, **kwargs)
+
+
+class PessoaDisponivelAutocomplete(LeituraReplicaMixin, autocomplete.Select2QuerySetView):
     """
     Fornece uma view de autocomplete para Pessoas que ainda não são nem Clientes, nem Funcionários, permitindo a busca
      por nome, celular ou CPF e que não apareça a pessoa que já foi selecionada como Cliente ou Funcionário
@@ -23,121 +138,176 @@ class PessoaDisponivelAutocomplete(autocomplete.Select2QuerySetView):
         if not self.request.user.is_authenticated:
             return Pessoa.objects.none()
 
-        qs = Pessoa.objects.filter(
-            cliente__isnull=True,
-            funcionario__isnull=True
-        )
+        return buscar_pessoas_disponiveis(self.q)
+
+
+class ClienteAutocomplete(LeituraReplicaMixin, autocomplete.Select2QuerySetView):
+    """
+    Fornece uma view de autocomplete paginada para Clientes ativos, permitindo a busca por nome, celular ou CPF.
+    """
+
+    def get_queryset(self):
+        if not self.request.user.is_authenticated:
+            return Cliente.objects.none()
+
+        qs = Cliente.ativos.select_related('pessoa')
 
         if self.q:
             qs = qs.filter(
-                Q(nome_completo__icontains=self.q) |
-                Q(celular__icontains=self.q) |
-                Q(cpf__icontains=self.q)
+                Q(pessoa__nome_completo__icontains=self.q) |
+                Q(pessoa__celular__icontains=self.q) |
+                Q(pessoa__cpf__icontains=self.q)
             )
 
-        return qs
+        return qs.order_by('pessoa__nome_completo')
 
 
-class VagaDisponivelOrdenadaAutocomplete(autocomplete.Select2QuerySetView):
+class FuncionarioAutocomplete(LeituraReplicaMixin, autocomplete.Select2QuerySetView):
     """
-    Fornece uma view de autocomplete para Vagas de Atendimento (ServicoFuncionarioHorario) que estão ativas, disponíveis
-     e futuras. Permite a busca por data (formatos DD/MM e DD/MM/YYYY), nome de serviço ou nome de funcionário e ordena
-     data seguido do nome da pessoa.
+    Fornece uma view de autocomplete paginada para Funcionários ativos, permitindo a busca pelo nome. Usada pelo filtro
+    por funcionário do admin quando há funcionários demais para listar.
     """
 
     def get_queryset(self):
         if not self.request.user.is_authenticated:
-            return ServicoFuncionarioHorario.objects.none()
+            return Funcionario.objects.none()
 
-        qs = ServicoFuncionarioHorario.objects.filter(
-            ativo=True,
-            agendamento__isnull=True,
-            data_horario__data_horario__gte=timezone.now()
-        )
+        qs = Funcionario.ativos.select_related('pessoa')
 
         if self.q:
-            date_q = Q()
-            search_term = self.q.strip()
+            qs = qs.filter(pessoa__nome_completo__icontains=self.q)
+
+        return qs.order_by('pessoa__nome_completo')
+
 
-            formatos= [
-                '%d/%m/%Y',
-                '%d/%m',
-            ]
+class ServicoAutocomplete(LeituraReplicaMixin, autocomplete.Select2QuerySetView):
+    """
+    Fornece uma view de autocomplete paginada para Serviços ativos, permitindo a busca pelo nome. Quando o formulário
+    encaminha um 'funcionario', mostra apenas os serviços que ele executa.
+    """
 
-            for formato in formatos:
-                try:
-                    date_obj = datetime.datetime.strptime(search_term, formato)
+    def get_queryset(self):
+        if not self.request.user.is_authenticated:
+            return Servico.objects.none()
 
-                    if formato == '%d/%m':
-                        current_year = timezone.now().year
-                        date_obj = date_obj.replace(year=current_year)
+        qs = Servico.ativos.all()
 
-                    date_q = Q(data_horario__data_horario__date=date_obj.date())
+        funcionario = self.forwarded.get('funcionario')
+        if funcionario:
+            try:
+                qs = qs.filter(pk__in=servicos_por_funcionario().get(int(funcionario), []))
+            except ValueError:
+                return Servico.objects.none()
 
-                except ValueError:
-                    continue
+        if self.q:
+            qs = qs.filter(nome_servico__icontains=self.q)
 
-            qs = qs.filter(
-                Q(servico__nome_servico__icontains=self.q) |
-                Q(funcionario__pessoa__nome_completo__icontains=self.q) |
-                date_q
-            )
+        return qs.order_by('nome_servico')
+
+
+class VagaDisponivelOrdenadaAutocomplete(LeituraReplicaMixin, autocomplete.Select2QuerySetView):
+    """
+    Fornece uma view de autocomplete para Vagas de Atendimento (ServicoFuncionarioHorario) que estão ativas, disponíveis
+     e futuras. Permite a busca por data, horário, dia da semana, nome de serviço ou nome de funcionário e ordena por
+     data seguido do nome da pessoa.
+    """
+
+    def get_queryset(self):
+        if not self.request.user.is_authenticated:
+            return ServicoFuncionarioHorario.objects.none()
 
-        return qs.order_by('data_horario__data_horario', 'funcionario__pessoa__nome_completo')
+        return buscar_vagas_disponiveis(self.q)
 
 
-class DataOrdenadaAutocomplete(autocomplete.Select2QuerySetView):
+class DataOrdenadaAutocomplete(LeituraReplicaMixin, autocomplete.Select2QuerySetView):
     """
     Fornece uma view de autocomplete para Datas e Horários (DataHorario) que estão ativos e ainda estão por vir. Permite
-     a busca por data nos formatos DD/MM e DD/MM/YYYY.
+     a busca por data, horário e dia da semana.
     """
 
     def get_queryset(self):
         if not self.request.user.is_authenticated:
             return DataHorario.objects.none()
 
-        qs = DataHorario.objects.filter(
-            ativo=True,
-            data_horario__gte=timezone.now()
-        )
+        return buscar_datas_disponiveis(self.q)
 
-        if self.q:
-            date_q = Q()
-            search_term = self.q.strip()
 
-            formatos= [
-                '%d/%m/%Y',
-                '%d/%m',
-            ]
+class Select2AsyncView(View):
+    """
+    Base para views de autocomplete assíncronas, que respondem no mesmo formato JSON do django-autocomplete-light
+    (parâmetros 'q' e 'page') usando o ORM assíncrono, sem ocupar uma thread por requisição sob ASGI. Como as versões
+    síncronas, lê da réplica quando disponível.
+    """
 
-            for formato in formatos:
-                try:
-                    date_obj = datetime.datetime.strptime(search_term, formato)
+    model = None
+    paginate_by = 10
 
-                    if formato == '%d/%m':
-                        current_year = timezone.now().year
-                        date_obj = date_obj.replace(year=current_year)
+    def get_queryset(self, termo):
+        """
+        Retorna o queryset filtrado pelo termo digitado. Por padrão, como as views do django-autocomplete-light, todos
+        os objetos de 'model', sem filtro; as subclasses aplicam as suas buscas.
+        """
 
-                    date_q = Q(data_horario__date=date_obj.date())
+        return self.model._default_manager.all()
 
-                except ValueError:
-                    continue
+    async def get(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'results': [], 'pagination': {'more': False}})
+
+        try:
+            pagina = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            pagina = 1
+
+        inicio = (pagina - 1) * self.paginate_by
+        queryset = self.get_queryset(request.GET.get('q', ''))
+        banco = await sync_to_async(banco_para_leitura)(request)
+        with ler_de(banco):
+            objetos = [obj async for obj in queryset[inicio:inicio + self.paginate_by + 1]]
+
+        resultados = [
+            {'id': str(obj.pk), 'text': str(obj), 'selected_text': str(obj)}
+            for obj in objetos[:self.paginate_by]
+        ]
+
+        return JsonResponse({
+            'results': resultados,
+            'pagination': {'more': len(objetos) > self.paginate_by},
+        })
+
+
+class PessoaDisponivelAutocompleteAsync(Select2AsyncView):
+    """Versão assíncrona de PessoaDisponivelAutocomplete."""
+
+    def get_queryset(self, termo):
+        return buscar_pessoas_disponiveis(termo)
+
+
+class VagaDisponivelOrdenadaAutocompleteAsync(Select2AsyncView):
+    """Versão assíncrona de VagaDisponivelOrdenadaAutocomplete."""
+
+    def get_queryset(self, termo):
+        return buscar_vagas_disponiveis(termo)
 
-            qs = qs.filter(
-                date_q
-            )
 
-        return qs.order_by('data_horario')
+class DataOrdenadaAutocompleteAsync(Select2AsyncView):
+    """Versão assíncrona de DataOrdenadaAutocomplete."""
 
+    def get_queryset(self, termo):
+        return buscar_datas_disponiveis(termo)
 
 
 def gerar_relatorio_pdf(request):
     """
     Gera um relatório em PDF com o desempenho de agendamentos concluídos dentro de um intervalo de datas selecionadas
     pelo usuário. Acesso restrito a superusuários e membros do grupo 'Dono'. Exige que o filtro de data seja aplicado.
+    Com 'modo=detalhado', lista cada serviço concluído e envia o PDF ao navegador conforme as páginas são geradas.
+    Com 'posicao=dd/mm/aaaa', considera o status que os agendamentos tinham ao fim desse dia, segundo o histórico de
+    status, em vez do status atual.
     """
 
-    if not (request.user.is_superuser or request.user.groups.filter(name='Dono').exists()):
+    if not (request.user.is_superuser or pertence_ao_grupo(request.user, 'Dono')):
         messages.error(request, "Você não tem permissão para gerar este relatório.")
 
         return HttpResponseForbidden("Acesso Negado")
@@ -154,61 +324,69 @@ def gerar_relatorio_pdf(request):
         )
         return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
 
-    filters = {}
-
     start_date = datetime.datetime.strptime(data_inicio_str, '%d/%m/%Y').date()
     end_date = datetime.datetime.strptime(data_fim_str, '%d/%m/%Y')
 
-    filters['servico_funcionario_horario__data_horario__data_horario__gte'] = start_date
-    filters['servico_funcionario_horario__data_horario__data_horario__lte'] = end_date.replace(hour=23, minute=59,
-                                                                                               second=59)
     data_inicio_relatorio = start_date
     data_fim_relatorio = end_date.date()
 
-    # Encurta o caminho da query, evitando diversas buscas com joins
-    queryset = Agendamento.objects.filter(
-        status='CONCLUIDO',
-        **filters
-    ).select_related(
-        'servico_funcionario_horario__funcionario__pessoa',
-        'servico_funcionario_horario__data_horario'
-    ).prefetch_related('servico_funcionario_horario__servico')
-
-    total_geral_ganhos = 0
-    funcionarios_data = defaultdict(lambda: {'concluidos': 0, 'ganhos': 0})
-
-    # Faz a busca e insere a quantidade de concluídos e de ganhos por funcionário
-    for agendamento in queryset:
-        valor_agendamento = agendamento.servico_funcionario_horario.servico.all().aggregate(
-            total=Sum('valor')
-        )['total'] or 0
-        total_geral_ganhos += valor_agendamento
-        funcionario = agendamento.servico_funcionario_horario.funcionario
-        funcionarios_data[funcionario.pessoa.nome_completo]['concluidos'] += 1
-        funcionarios_data[funcionario.pessoa.nome_completo]['ganhos'] += valor_agendamento
-
-    total_concluidos = queryset.count()
+    data_posicao = None
+    em = None
+    if params.get('posicao'):
+        try:
+            data_posicao = datetime.datetime.strptime(params['posicao'], '%d/%m/%Y').date()
+        except ValueError:
+            messages.error(request, "Informe a data de posição do relatório no formato dd/mm/aaaa.")
+            return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
+        em = fim_do_dia(data_posicao)
+
+    # As consultas do relatório são as mais pesadas do sistema e toleram um pequeno atraso: vão à réplica, se houver
+    banco = banco_para_leitura(request)
+
+    if params.get('modo') == 'detalhado':
+        # As linhas vêm de um cursor no servidor e cada página é enviada assim que fica pronta
+        linhas = iterar_em(banco, buscar_linhas_detalhe(
+            start_date,
+            end_date.replace(hour=23, minute=59, second=59),
+            em=em
+        ))
+        renderizador = RenderizadorDetalhadoStreaming(
+            data_inicio_relatorio,
+            data_fim_relatorio,
+            datetime.date.today(),
+            data_posicao
+        )
+        response = StreamingHttpResponse(renderizador.gerar(linhas), content_type='application/pdf')
+        response['Content-Disposition'] = 'filename="relatorio_detalhado_{}.pdf"'.format(
+            datetime.date.today().strftime('%Y-%m-%d')
+        )
+        return response
+
+    # A busca traz apenas tuplas simples e a agregação por funcionário pode ser feita em série ou em paralelo
+    with ler_de(banco):
+        funcionarios_data, total_concluidos, total_geral_ganhos = calcular_relatorio(
+            start_date,
+            end_date.replace(hour=23, minute=59, second=59),
+            em=em
+        )
 
     context = {
         'total_concluidos': total_concluidos,
         'total_geral_ganhos': total_geral_ganhos,
-        'funcionarios_data': dict(funcionarios_data),
+        'funcionarios_data': funcionarios_data,
         'data_geracao': datetime.date.today(),
         'data_inicio': data_inicio_relatorio,
         'data_fim': data_fim_relatorio,
+        'data_posicao': data_posicao,
     }
 
-    template_path = 'agendamento/relatorio.html'
-    template = get_template(template_path)
-    html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'filename="relatorio_{}.pdf"'.format(
-            datetime.date.today().strftime('%Y-%m-%d')
-        )
-        return response
+    try:
+        pdf = obter_renderizador().renderizar(context)
+    except ErroRenderizacao as erro:
+        return HttpResponse('Erro ao gerar o PDF: %s' % erro)
 
-    return HttpResponse('Erro ao gerar o PDF: %s' % pdf.err)
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = 'filename="relatorio_{}.pdf"'.format(
+        datetime.date.today().strftime('%Y-%m-%d')
+    )
+    return response
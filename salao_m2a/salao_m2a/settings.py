@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,8 +53,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'agendamento.historico.identificar_usuario',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'agendamento.replica.fixar_primario_apos_escrita',
 ]
 
 ROOT_URLCONF = 'salao_m2a.urls'
@@ -77,12 +82,137 @@ WSGI_APPLICATION = 'salao_m2a.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# O banco é escolhido por variáveis de ambiente; sem elas, usa o SQLite em BASE_DIR/db.sqlite3.
+#
+# DB_ENGINE               'sqlite' (padrão) ou 'postgresql'
+# DB_NAME                 arquivo do SQLite ou nome do banco no PostgreSQL
+# DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+#                         conexão com o PostgreSQL
+# DB_CONN_MAX_AGE         segundos que cada conexão é reaproveitada entre requisições (padrão: 60; 0 reconecta a cada
+#                         requisição). As conexões reaproveitadas são testadas antes do uso (CONN_HEALTH_CHECKS).
+# DB_POOL                 '1' usa o pool de conexões do psycopg (pacote 'psycopg[pool]') no lugar das conexões
+#                         persistentes, com DB_POOL_MIN e DB_POOL_MAX conexões (padrão: 2 e 20)
+# DB_SQLITE_AJUSTES       '0' desliga os ajustes do SQLite para uso concorrente em um único servidor, aplicados a cada
+#                         conexão: WAL (leituras não esperam gravações), synchronous=NORMAL (seguro com WAL, sem fsync a
+#                         cada transação), espera de DB_SQLITE_ESPERA_MS (padrão: 20000) por um banco bloqueado em vez
+#                         de falhar, mmap de DB_SQLITE_MMAP bytes (padrão: 256 MiB) e transações que já começam
+#                         reservando a escrita (evita o erro "database is locked" ao passar de leitura a gravação)
+# DB_REPLICA_NAME, DB_REPLICA_HOST, DB_REPLICA_PORT
+#                         quando algum é informado, cria a conexão 'replica' (veja "Réplica de leitura" abaixo) com os
+#                         demais parâmetros iguais aos do banco principal
+
+
+def _variavel_booleana(nome, padrao):
+    return os.environ.get(nome, '1' if padrao else '0').strip().lower() in ('1', 'true', 'sim', 'yes', 'on')
+
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'postgresql':
+    DB_POOL = _variavel_booleana('DB_POOL', False)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'salao_m2a'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # O Django não aceita conexões persistentes junto com o pool: com o pool, cada requisição devolve a conexão
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX', 20)),
+                    'timeout': 10,
+                },
+            } if DB_POOL else {},
+        }
+    }
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA busy_timeout={int(os.environ.get('DB_SQLITE_ESPERA_MS', 20000))};"
+                    f"PRAGMA mmap_size={int(os.environ.get('DB_SQLITE_MMAP', 256 * 1024 * 1024))};"
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            } if _variavel_booleana('DB_SQLITE_AJUSTES', True) else {},
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE inválido: {DB_ENGINE!r} (use 'sqlite' ou 'postgresql').")
+
+if any(os.environ.get(nome) for nome in ('DB_REPLICA_NAME', 'DB_REPLICA_HOST', 'DB_REPLICA_PORT')):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_ENGINE == 'postgresql':
+        DATABASES['replica']['HOST'] = os.environ.get('DB_REPLICA_HOST', DATABASES['default']['HOST'])
+        DATABASES['replica']['PORT'] = os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT'])
+
+
+# Cache
+# CACHE_BACKEND escolhe onde ficam os dados em cache:
+#
+# 'memoria'  (padrão) na memória de cada processo; não é compartilhado entre processos, então uma alteração feita em um
+#            processo só chega aos demais quando o item expira
+# 'arquivo'  em arquivos no diretório CACHE_LOCATION (padrão: BASE_DIR/cache), compartilhado pelos processos do servidor
+# 'redis'    no servidor em CACHE_LOCATION (padrão: redis://127.0.0.1:6379/1), compartilhado entre servidores; requer o
+#            pacote 'redis' e aceita qualquer servidor compatível com o protocolo (Redis, Valkey, KeyDB). Em
+#            desenvolvimento, 'memoria' faz o mesmo papel sem servidor.
+#
+# CACHE_CONSULTAS_SEGUNDOS é a validade das consultas em cache do admin (catálogo de serviços, serviços de cada
+# funcionário e opções dos filtros). Elas são invalidadas por sinais a cada alteração; a validade limita o atraso nos
+# demais processos com o cache em memória e nas alterações feitas sem passar pelo ORM. Os grupos dos usuários, usados
+# nas verificações de permissão, nunca vão para o cache.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memoria')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': 'salao',
+        }
+    }
+elif CACHE_BACKEND == 'arquivo':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+            'KEY_PREFIX': 'salao',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+elif CACHE_BACKEND == 'memoria':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'KEY_PREFIX': 'salao',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
     }
-}
+else:
+    raise ImproperlyConfigured(f"CACHE_BACKEND inválido: {CACHE_BACKEND!r} (use 'memoria', 'arquivo' ou 'redis').")
+
+CACHE_CONSULTAS_SEGUNDOS = 300
+
+# Acima desta quantidade de opções, os filtros da barra lateral do admin (funcionário, serviço) deixam de listar todas
+# elas e passam a ser um campo de busca com autocomplete. O filtro por cliente é sempre um campo de busca.
+FILTRO_MAXIMO_OPCOES = 40
 
 
 # Password validation
@@ -125,3 +255,67 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Autocomplete
+# Quando True, os formulários do admin usam as versões assíncronas das views de autocomplete, indicadas quando o
+# projeto é servido via ASGI (salao_m2a.asgi).
+
+AUTOCOMPLETE_ASSINCRONO = False
+
+# Relatório de desempenho
+# RELATORIO_MODO define como os dados do relatório são agregados por funcionário: 'serial' (no próprio processo) ou
+# 'paralelo' (em um pool com RELATORIO_PROCESSOS processos; None usa a quantidade de CPUs). Abaixo de
+# RELATORIO_MINIMO_LINHAS_PARALELO linhas, o custo de iniciar os processos não compensa e a agregação é sempre serial.
+
+RELATORIO_MODO = 'serial'
+RELATORIO_PROCESSOS = None
+RELATORIO_MINIMO_LINHAS_PARALELO = 200000
+
+# Renderizador do PDF do relatório: 'xhtml2pdf' (template HTML em agendamento/relatorio.html) ou 'reportlab'
+# (desenho direto das tabelas, mais rápido para relatórios com muitos funcionários).
+
+RELATORIO_RENDERIZADOR = 'xhtml2pdf'
+
+# Painel de desempenho
+# As séries do painel são lidas do agregado DesempenhoDiario, atualizado incrementalmente no máximo uma vez a cada
+# DESEMPENHO_INTERVALO_ATUALIZACAO segundos (ou pelo comando 'atualizar_desempenho'). As respostas JSON ficam em cache
+# por DESEMPENHO_CACHE_SEGUNDOS e são invalidadas a cada atualização do agregado.
+
+DESEMPENHO_INTERVALO_ATUALIZACAO = 60
+DESEMPENHO_CACHE_SEGUNDOS = 300
+
+# Alterações de status em massa
+# As ações "Marcar como Concluído/Cancelado" do admin, a página "Fechar Agendamentos" e o comando 'fechar_agendamentos'
+# alteram os agendamentos em lotes de TRANSICAO_TAMANHO_LOTE, cada um em uma transação (veja agendamento/transicoes.py),
+# para não travar as gravações do banco durante toda a operação.
+
+TRANSICAO_TAMANHO_LOTE = 1000
+
+# Fechamento automático
+# O comando 'fechar_agendamentos' (uma vez, pelo cron, ou continuamente com --daemon) altera para
+# FECHAMENTO_AUTOMATICO_STATUS os agendamentos ainda "Agendado" cujo horário passou há mais de
+# FECHAMENTO_AUTOMATICO_HORAS horas: 'CONCLUIDO' presume que o atendimento aconteceu e 'CANCELADO' o trata como falta.
+# Com None, o fechamento só ocorre quando solicitado com --status ou pela página "Fechar Agendamentos" do admin. Cada
+# execução fica registrada em "Fechamentos de Agendamentos".
+
+FECHAMENTO_AUTOMATICO_STATUS = 'CONCLUIDO'
+FECHAMENTO_AUTOMATICO_HORAS = 12
+
+# Lista de espera
+# Cada vaga futura liberada por um cancelamento é ofertada ao pedido compatível de maior prioridade da lista de espera
+# (veja agendamento/lista_espera.py). A oferta vale por LISTA_ESPERA_VALIDADE_OFERTA_HORAS horas, ou até o horário da
+# vaga, se vier antes; vencida, o comando 'processar_lista_espera' oferta a vaga ao próximo da fila.
+
+LISTA_ESPERA_VALIDADE_OFERTA_HORAS = 24
+
+# Réplica de leitura
+# Com uma conexão 'replica' em DATABASES, relatórios, painel de desempenho, colunas de ganho do admin e autocompletes
+# leem da réplica (veja agendamento/replica.py); sem ela, tudo é lido do banco principal. Essas leituras voltam ao banco
+# principal quando o atraso estimado da réplica passa de REPLICA_ATRASO_TOLERADO segundos (medido no máximo a cada
+# REPLICA_VERIFICACAO_SEGUNDOS) e, pelo mesmo tempo, para quem acabou de gravar algo. A conexão é criada pelas variáveis
+# DB_REPLICA_* (veja "Database" acima); para testar localmente, uma cópia do banco feita com 'salvar_snapshot' pode
+# servir de réplica (DB_REPLICA_NAME=replica.sqlite3).
+
+DATABASE_ROUTERS = ['agendamento.replica.RoteadorReplica']
+REPLICA_ATRASO_TOLERADO = 30
+REPLICA_VERIFICACAO_SEGUNDOS = 5